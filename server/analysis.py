@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import re
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import astuple, dataclass
+from typing import TYPE_CHECKING
+
+from server.config import AnalyzerConfig
+
+if TYPE_CHECKING:
+    from server.kb import Entry
+
+FIELDS = ("title", "summary", "tags", "body")
+
+_WORD_RE = re.compile(r"\w+")
+_VOWEL_RE = re.compile(r"[aeiouy]")
+
+CACHE_SIZE = 1024
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all am an and any are as at be because
+    been before being below between both but by can did do does doing down
+    during each few for from further had has have having he her here hers
+    herself him himself his how i if in into is it its itself just me more
+    most my myself no nor not now of off on once only or other our ours
+    ourselves out over own same she should so some such than that the their
+    theirs them themselves then there these they this those through to too
+    under until up very was we were what when where which while who whom why
+    will with you your yours yourself yourselves
+    """.split()
+)
+
+_SUFFIXES = (
+    ("ational", "ate"),
+    ("ization", "ize"),
+    ("iveness", "ive"),
+    ("fulness", "ful"),
+    ("ousness", "ous"),
+    ("sses", "ss"),
+    ("ies", "y"),
+    ("ingly", ""),
+    ("edly", ""),
+    ("ing", ""),
+    ("ed", ""),
+    ("ly", ""),
+    ("s", ""),
+)
+
+
+def stem(token: str) -> str:
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    for suffix, replacement in _SUFFIXES:
+        if not token.endswith(suffix):
+            continue
+        if suffix == "s" and token.endswith(("ss", "us", "is")):
+            return token
+        base = token[: -len(suffix)]
+        if len(base) < 3 or not _VOWEL_RE.search(base):
+            return token
+        if not replacement and suffix in ("ing", "ed", "ingly", "edly"):
+            if len(base) > 3 and base[-1] == base[-2] and base[-1] not in "lsz":
+                base = base[:-1]
+        return base + replacement
+    return token
+
+
+@dataclass(slots=True)
+class FieldTokens:
+    title: list[str]
+    summary: list[str]
+    tags: list[str]
+    body: list[str]
+
+    def all(self) -> list[str]:
+        return self.title + self.summary + self.tags + self.body
+
+
+class Analyzer:
+    def __init__(self, config: AnalyzerConfig | None = None) -> None:
+        self.config = config or AnalyzerConfig()
+        self._cache: OrderedDict[str, FieldTokens] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        return {"config": self.config}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["config"])
+
+    @property
+    def signature(self) -> tuple:
+        return astuple(self.config)
+
+    def fold(self, text: str) -> str:
+        if self.config.normalize:
+            return unicodedata.normalize("NFKC", text).casefold()
+        return text.lower()
+
+    def lossy(self, text: str) -> bool:
+        if not self.config.strip_punctuation:
+            return False
+        text = self.fold(text)
+        return _WORD_RE.findall(text) != text.split()
+
+    def punctuated(self, text: str) -> list[str]:
+        if not self.config.strip_punctuation:
+            return []
+        return [
+            sys.intern(t) for t in self.fold(text).split() if _WORD_RE.fullmatch(t) is None
+        ]
+
+    def terms(self, text: str) -> list[str]:
+        config = self.config
+        text = self.fold(text)
+        tokens = _WORD_RE.findall(text) if config.strip_punctuation else text.split()
+        if config.stopwords:
+            tokens = [t for t in tokens if t not in STOPWORDS]
+        if config.stemming:
+            tokens = [stem(t) for t in tokens]
+        return [sys.intern(t) for t in tokens]
+
+    def analyze(self, entry: Entry) -> FieldTokens:
+        key = entry.content_hash
+        if key:
+            with self._lock:
+                tokens = self._cache.get(key)
+                if tokens is not None:
+                    self._cache.move_to_end(key)
+                    return tokens
+        tokens = FieldTokens(
+            title=self.terms(entry.title),
+            summary=self.terms(entry.summary),
+            tags=self.terms(" ".join(map(str, entry.tags))),
+            body=self.terms(entry.body),
+        )
+        if key:
+            with self._lock:
+                self._cache[key] = tokens
+                if len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return tokens
+
+    def forget(self, content_hash: str) -> None:
+        with self._lock:
+            self._cache.pop(content_hash, None)
+
+    def retain(self, entries: list[Entry]) -> None:
+        live = {e.content_hash for e in entries}
+        with self._lock:
+            self._cache = OrderedDict((k, v) for k, v in self._cache.items() if k in live)
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+
+class ANNIndex(Protocol):
+    version: int
+
+    def build(self, matrix: np.ndarray, rows: list[int]) -> None: ...
+    def add(self, matrix: np.ndarray, rows: list[int]) -> None: ...
+    def remove(self, rows: list[int]) -> None: ...
+    def search(
+        self, matrix: np.ndarray, query: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]: ...
+    def load(self) -> bool: ...
+    def save(self) -> None: ...
+
+
+class IVFIndex:
+    def __init__(self, path: Path, nprobe: int = 8, kmeans_iters: int = 10) -> None:
+        self._path = path
+        self._nprobe = nprobe
+        self._kmeans_iters = kmeans_iters
+        self._centroids = np.zeros((0, 0), dtype=np.float32)
+        self._assign: dict[int, int] = {}
+        self._lists: list[set[int]] = []
+        self._arrays: list[np.ndarray | None] = []
+        self._trained_size = 0
+        self.version = -1
+
+    def build(self, matrix: np.ndarray, rows: list[int]) -> None:
+        self._assign = {}
+        self._trained_size = len(rows)
+        if not rows:
+            self._centroids = np.zeros((0, 0), dtype=np.float32)
+            self._lists = []
+            self._arrays = []
+            return
+        vectors = np.asarray(matrix[rows], dtype=np.float32)
+        self._centroids = self._train(vectors)
+        self._lists = [set() for _ in range(len(self._centroids))]
+        self._arrays = [None] * len(self._centroids)
+        self._assign_rows(rows, vectors)
+
+    def _train(self, vectors: np.ndarray) -> np.ndarray:
+        nlist = max(1, int(math.sqrt(len(vectors))))
+        rng = np.random.default_rng(0)
+        sample = vectors
+        if len(vectors) > 256 * nlist:
+            sample = vectors[rng.choice(len(vectors), 256 * nlist, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self._kmeans_iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids /= norms
+        return centroids
+
+    def _assign_rows(self, rows: list[int], vectors: np.ndarray) -> None:
+        labels = np.argmax(vectors @ self._centroids.T, axis=1)
+        for row, label in zip(rows, labels.tolist()):
+            self._assign[row] = label
+            self._lists[label].add(row)
+            self._arrays[label] = None
+
+    def add(self, matrix: np.ndarray, rows: list[int]) -> None:
+        if not rows:
+            return
+        if not len(self._centroids) or len(self._assign) + len(rows) > 4 * max(self._trained_size, 1):
+            self.build(matrix, sorted(self._assign.keys() | set(rows)))
+            return
+        self.remove(rows)
+        self._assign_rows(rows, np.asarray(matrix[rows], dtype=np.float32))
+
+    def remove(self, rows: list[int]) -> None:
+        for row in rows:
+            label = self._assign.pop(row, None)
+            if label is not None:
+                self._lists[label].discard(row)
+                self._arrays[label] = None
+
+    def _list_array(self, label: int) -> np.ndarray:
+        arr = self._arrays[label]
+        if arr is None:
+            arr = np.fromiter(self._lists[label], dtype=np.int64, count=len(self._lists[label]))
+            self._arrays[label] = arr
+        return arr
+
+    def search(
+        self, matrix: np.ndarray, query: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if not self._assign:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        nprobe = min(self._nprobe, len(self._centroids))
+        probes = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        candidates = np.concatenate([self._list_array(int(p)) for p in probes])
+        candidates = candidates[candidates < len(matrix)]
+        scores = np.asarray(matrix[candidates] @ query, dtype=np.float32)
+        if k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        return candidates[top], scores[top]
+
+    def load(self) -> bool:
+        if not self._path.exists():
+            return False
+        with np.load(self._path) as data:
+            self._centroids = data["centroids"]
+            rows = data["rows"].tolist()
+            labels = data["labels"].tolist()
+            self._trained_size = int(data["trained_size"])
+            self.version = int(data["version"])
+        self._lists = [set() for _ in range(len(self._centroids))]
+        self._arrays = [None] * len(self._centroids)
+        self._assign = {}
+        for row, label in zip(rows, labels):
+            self._assign[row] = label
+            self._lists[label].add(row)
+        return True
+
+    def save(self) -> None:
+        tmp_path = self._path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            centroids=self._centroids,
+            rows=np.fromiter(self._assign.keys(), dtype=np.int64, count=len(self._assign)),
+            labels=np.fromiter(self._assign.values(), dtype=np.int64, count=len(self._assign)),
+            trained_size=self._trained_size,
+            version=self.version,
+        )
+        tmp_path.replace(self._path)
+
+
+class HNSWIndex:
+    def __init__(
+        self,
+        path: Path,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+    ) -> None:
+        try:
+            import hnswlib
+        except ImportError:
+            raise RuntimeError("hnswlib package not installed. Install with: uv pip install hnswlib")
+        self._hnswlib = hnswlib
+        self._path = path
+        self._meta_path = path.with_name(path.name + ".json")
+        self._m = m
+        self._ef_construction = ef_construction
+        self._ef_search = ef_search
+        self._index = None
+        self._labels: set[int] = set()
+        self._deleted: set[int] = set()
+        self.version = -1
+
+    def _new_index(self, dim: int, capacity: int):
+        index = self._hnswlib.Index(space="ip", dim=dim)
+        index.init_index(
+            max_elements=capacity,
+            M=self._m,
+            ef_construction=self._ef_construction,
+            allow_replace_deleted=True,
+        )
+        index.set_ef(self._ef_search)
+        return index
+
+    def build(self, matrix: np.ndarray, rows: list[int]) -> None:
+        self._labels = set()
+        self._deleted = set()
+        self._index = None
+        if rows:
+            self._index = self._new_index(matrix.shape[1], max(1024, 2 * len(rows)))
+            self._index.add_items(np.asarray(matrix[rows], dtype=np.float32), rows)
+            self._labels = set(rows)
+
+    def add(self, matrix: np.ndarray, rows: list[int]) -> None:
+        if not rows:
+            return
+        if self._index is None:
+            self.build(matrix, rows)
+            return
+        if len(self._deleted) > len(self._labels):
+            self.build(matrix, sorted(self._labels | set(rows)))
+            return
+        needed = self._index.get_current_count() + len(rows)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(2 * needed)
+        for row in rows:
+            if row in self._deleted:
+                self._index.unmark_deleted(row)
+                self._deleted.discard(row)
+        self._index.add_items(np.asarray(matrix[rows], dtype=np.float32), rows)
+        self._labels.update(rows)
+
+    def remove(self, rows: list[int]) -> None:
+        for row in rows:
+            if row in self._labels:
+                self._index.mark_deleted(row)
+                self._labels.discard(row)
+                self._deleted.add(row)
+
+    def search(
+        self, matrix: np.ndarray, query: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self._labels))
+        if self._index is None or k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        labels, distances = self._index.knn_query(query, k=k)
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def load(self) -> bool:
+        if not self._path.exists() or not self._meta_path.exists():
+            return False
+        meta = json.loads(self._meta_path.read_text())
+        index = self._hnswlib.Index(space="ip", dim=meta["dim"])
+        index.load_index(str(self._path), allow_replace_deleted=True)
+        index.set_ef(self._ef_search)
+        self._index = index
+        self._labels = set(meta["labels"])
+        self._deleted = set(meta["deleted"])
+        self.version = meta["version"]
+        return True
+
+    def save(self) -> None:
+        if self._index is None:
+            self._path.unlink(missing_ok=True)
+            self._meta_path.unlink(missing_ok=True)
+            return
+        tmp_path = self._path.with_suffix(".tmp")
+        self._index.save_index(str(tmp_path))
+        tmp_path.replace(self._path)
+        meta = {
+            "dim": self._index.dim,
+            "version": self.version,
+            "labels": sorted(self._labels),
+            "deleted": sorted(self._deleted),
+        }
+        tmp_meta = self._meta_path.with_suffix(".tmp")
+        tmp_meta.write_text(json.dumps(meta))
+        tmp_meta.replace(self._meta_path)
+
+
+def make_ann_index(
+    kind: str,
+    cache_path: Path,
+    nprobe: int = 8,
+    ef_search: int = 64,
+) -> ANNIndex | None:
+    if kind == "ivf":
+        return IVFIndex(cache_path.with_suffix(".ivf.npz"), nprobe=nprobe)
+    if kind == "hnsw":
+        return HNSWIndex(cache_path.with_suffix(".hnsw"), ef_search=ef_search)
+    return None
+
+
+def recall_at_k(exact: list[np.ndarray], approx: list[np.ndarray], k: int) -> float:
+    hits = 0
+    total = 0
+    for e, a in zip(exact, approx):
+        truth = set(e[:k].tolist())
+        hits += len(truth & set(a[:k].tolist()))
+        total += len(truth)
+    return hits / total if total else 1.0
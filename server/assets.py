@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+import httpx
+
+from server.git import blob_sha
+from server.github_client import CommitResult, GitHubClient, IMAGE_EXTENSIONS
+
+
+class AssetError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class Asset:
+    source: str
+    filename: str
+    content: bytes
+
+
+@dataclass(slots=True)
+class UploadPlan:
+    files: dict[str, bytes] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+    deduped: dict[str, str] = field(default_factory=dict)
+    links: dict[str, str] = field(default_factory=dict)
+    bytes_saved: int = 0
+
+
+def is_url(source: str) -> bool:
+    return source.startswith("http://") or source.startswith("https://")
+
+
+def asset_filename(source: str) -> str:
+    if is_url(source):
+        return PurePosixPath(source.split("?")[0]).name
+    return Path(source).name
+
+
+def check_source(source: str) -> str:
+    filename = asset_filename(source)
+    ext = PurePosixPath(filename).suffix.lower()
+    if ext not in IMAGE_EXTENSIONS:
+        raise AssetError(
+            f"Unsupported image type '{ext}' for {source}. "
+            f"Supported: {', '.join(sorted(IMAGE_EXTENSIONS))}"
+        )
+    return filename
+
+
+async def load_asset(source: str, http: httpx.AsyncClient) -> Asset:
+    filename = check_source(source)
+    if is_url(source):
+        try:
+            resp = await http.get(source)
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            raise AssetError(f"Failed to fetch {source}: {e}") from e
+        return Asset(source=source, filename=filename, content=resp.content)
+    path = Path(source).expanduser().resolve()
+    if not path.is_file():
+        raise AssetError(f"File not found: {source}")
+    content = await asyncio.to_thread(path.read_bytes)
+    return Asset(source=source, filename=filename, content=content)
+
+
+async def load_assets(
+    sources: list[str], http: httpx.AsyncClient
+) -> tuple[list[Asset], list[str]]:
+    results = await asyncio.gather(
+        *(load_asset(source, http) for source in sources), return_exceptions=True
+    )
+    assets: list[Asset] = []
+    errors: list[str] = []
+    names: dict[str, str] = {}
+    for source, result in zip(sources, results):
+        if isinstance(result, AssetError):
+            errors.append(str(result))
+        elif isinstance(result, BaseException):
+            raise result
+        elif result.filename in names:
+            errors.append(
+                f"Duplicate file name {result.filename} "
+                f"({names[result.filename]} and {source})"
+            )
+        else:
+            names[result.filename] = source
+            assets.append(result)
+    return assets, errors
+
+
+def plan_upload(
+    assets: list[Asset],
+    assets_dir: str,
+    remote_shas: dict[str, str],
+    dedupe: bool = False,
+) -> UploadPlan:
+    plan = UploadPlan()
+    stored: dict[str, str] = {}
+    for path, sha in sorted(remote_shas.items()):
+        stored.setdefault(sha, path)
+    for asset in assets:
+        path = f"{assets_dir}/{asset.filename}"
+        sha = blob_sha(asset.content)
+        if remote_shas.get(path) == sha:
+            plan.unchanged.append(path)
+            plan.links[path] = path
+            plan.bytes_saved += len(asset.content)
+        elif dedupe and sha in stored:
+            plan.deduped[path] = stored[sha]
+            plan.links[path] = stored[sha]
+            plan.bytes_saved += len(asset.content)
+        else:
+            plan.files[path] = asset.content
+            plan.links[path] = path
+            stored.setdefault(sha, path)
+    return plan
+
+
+async def upload_assets(
+    gh: GitHubClient,
+    assets: list[Asset],
+    assets_dir: str,
+    branch: str,
+    dedupe: bool = False,
+) -> tuple[UploadPlan, CommitResult | None]:
+    remote_shas = await gh.file_shas(assets_dir, branch)
+    plan = plan_upload(assets, assets_dir, remote_shas, dedupe)
+    if not plan.files:
+        return plan, None
+    result = await gh.upload_files(plan.files, branch, remote_shas=remote_shas)
+    return plan, result
+
+
+def describe_upload(plan: UploadPlan, result: CommitResult | None, branch: str) -> list[str]:
+    lines = [f"Uploaded: /{path}" for path in plan.files]
+    lines.extend(f"Unchanged: /{path}" for path in plan.unchanged)
+    lines.extend(f"Deduplicated: /{path} -> /{stored}" for path, stored in plan.deduped.items())
+    lines.append(f"Branch: {branch}")
+    if result and result.sha:
+        lines.append(f"Commit: {result.sha}")
+    if plan.bytes_saved:
+        lines.append(f"Bytes saved: {plan.bytes_saved}")
+    return lines
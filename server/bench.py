@@ -0,0 +1,527 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    pos = (len(ordered) - 1) * pct / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return (ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)) * 1000
+
+
+def _report(name: str, samples: list[float]) -> None:
+    print(
+        f"{name}: p50 {_percentile(samples, 50):.2f}ms  "
+        f"p99 {_percentile(samples, 99):.2f}ms  "
+        f"({len(samples)} calls)"
+    )
+
+
+def _clustered_vectors(
+    rng: np.random.Generator, n: int, dim: int, clusters: int
+) -> np.ndarray:
+    import numpy as np
+
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def cmd_ann(args: argparse.Namespace) -> None:
+    import numpy as np
+
+    from server.ann import make_ann_index, recall_at_k
+
+    rng = np.random.default_rng(args.seed)
+    matrix = _clustered_vectors(rng, args.entries, args.dim, args.clusters)
+    queries = _clustered_vectors(rng, args.queries, args.dim, args.clusters)
+    k = args.k
+
+    exact: list[np.ndarray] = []
+    flat_times: list[float] = []
+    for q in queries:
+        start = time.perf_counter()
+        scores = matrix @ q
+        top = np.argpartition(-scores, k)[:k]
+        exact.append(top[np.argsort(-scores[top])])
+        flat_times.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = make_ann_index(
+            args.index,
+            Path(tmp) / "embeddings.npy",
+            nprobe=args.nprobe,
+            ef_search=args.ef_search,
+        )
+        if index is None:
+            print(f"Unknown ANN index '{args.index}'")
+            return
+
+        start = time.perf_counter()
+        index.build(matrix, list(range(len(matrix))))
+        build_time = time.perf_counter() - start
+
+        approx: list[np.ndarray] = []
+        ann_times: list[float] = []
+        for q in queries:
+            start = time.perf_counter()
+            rows, scores = index.search(matrix, q, k)
+            approx.append(rows[np.argsort(-scores)])
+            ann_times.append(time.perf_counter() - start)
+
+        churn = rng.choice(len(matrix), len(matrix) // 10, replace=False).tolist()
+        index.remove(churn)
+        index.add(matrix, churn)
+        churned = [index.search(matrix, q, k) for q in queries]
+        churned_rows = [rows[np.argsort(-scores)] for rows, scores in churned]
+
+    print(f"Entries: {args.entries}  dim: {args.dim}  queries: {args.queries}  k: {k}")
+    print(f"{args.index} build: {build_time:.2f}s")
+    _report("flat search", flat_times)
+    _report(f"{args.index} search", ann_times)
+    print(f"recall@{k}: {recall_at_k(exact, approx, k):.4f}")
+    print(f"recall@{k} after 10% delete/re-insert: {recall_at_k(exact, churned_rows, k):.4f}")
+
+
+def _write_corpus(root: Path, entries: int, words: int, seed: int) -> list[Path]:
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+    kb_dir = root / "knowledge"
+    kb_dir.mkdir(parents=True)
+    paths = []
+    for i in range(entries):
+        edges = "\n".join(
+            f"  - path: /knowledge/e{rng.randrange(entries)}.md\n    label: {rng.choice(['uses', 'extends', 'related'])}"
+            for _ in range(3)
+        )
+        path = kb_dir / f"e{i}.md"
+        path.write_text(
+            f'---\ntitle: "Entry {i}"\ntype: {rng.choice(["concept", "note", "insight"])}\n'
+            f'summary: "Summary of entry {i}"\ntags: [t{i % 20}, t{i % 7}]\n'
+            f'created: "2026-01-{i % 28 + 1:02d}"\nedges:\n{edges}\n---\n'
+            + " ".join(rng.choices(vocab, k=words))
+            + "\n"
+        )
+        paths.append(path)
+    return paths
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f}MB"
+
+
+def cmd_memory(args: argparse.Namespace) -> None:
+    from server.kb import entry_text_cache, parse_entries
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = _write_corpus(root, args.entries, args.words, args.seed)
+        entry_text_cache.resize(args.body_cache_mb * 1024 * 1024)
+        entry_text_cache.clear()
+
+        tracemalloc.start()
+        entries, _ = parse_entries(paths, root, workers=1)
+        with_cache = tracemalloc.get_traced_memory()[0]
+        entry_text_cache.clear()
+        metadata = tracemalloc.get_traced_memory()[0]
+        texts = [(e.raw, e.body) for e in entries]
+        eager = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del texts
+
+        entry_text_cache.clear()
+        cold: list[float] = []
+        for entry in entries[: args.reads]:
+            start = time.perf_counter()
+            entry.body
+            cold.append(time.perf_counter() - start)
+        warm: list[float] = []
+        for entry in entries[: args.reads]:
+            start = time.perf_counter()
+            entry.body
+            warm.append(time.perf_counter() - start)
+
+    n = len(entries)
+    print(f"Entries: {n}  body words: {args.words}  body cache: {args.body_cache_mb}MB")
+    print(f"eager body+raw: {_mb(eager)} ({eager // n} B/entry)")
+    print(f"compact metadata: {_mb(metadata)} ({metadata // n} B/entry)")
+    print(f"compact + body cache: {_mb(with_cache)}")
+    _report("cold body read", cold)
+    _report("cached body read", warm)
+
+
+def cmd_stress(args: argparse.Namespace) -> None:
+    from server.config import load_config
+    from server.filters import EntryFilter
+    from server.kb import KnowledgeBase
+
+    class CountingKB(KnowledgeBase):
+        pulls = 0
+
+        async def _pull(self) -> None:
+            CountingKB.pulls += 1
+            await asyncio.sleep(0.05)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = _write_corpus(root, args.entries, args.words, args.seed)
+        config = load_config(root / "config.yaml", repo_root=root)
+        config.search.backend = args.backend
+        config.search.semantic.provider = "local"
+        config.search.semantic.model = "hashing"
+        config.knowledge.snapshot = False
+        config.sync.auto_pull = True
+        config.sync.pull_interval_seconds = 3600
+        kb = CountingKB(config)
+        kb._last_pull = time.time()
+
+        stop = threading.Event()
+        errors: list[str] = []
+        timings: dict[str, list[float]] = {"search": [], "list": [], "read": [], "neighbors": []}
+        vocab = [f"w{i}" for i in range(5000)]
+
+        def check(ok: bool, message: str) -> None:
+            if not ok:
+                errors.append(message)
+
+        def reader(seed: int) -> None:
+            rng = random.Random(seed)
+            while not stop.is_set():
+                path = f"/knowledge/e{rng.randrange(args.entries)}.md"
+                op = rng.choice(list(timings))
+                start = time.perf_counter()
+                try:
+                    if op == "search":
+                        kb.search(" ".join(rng.choices(vocab, k=2)), limit=10)
+                    elif op == "list":
+                        page = kb.list_page(EntryFilter(), limit=20)
+                        check(page.total >= args.entries, f"list saw {page.total} entries")
+                    elif op == "read":
+                        entry = kb.read_entry(path)
+                        check(entry is not None and bool(entry.body), f"read {path} failed")
+                    else:
+                        sub = kb.neighbors(path, depth=2)
+                        check(sub is not None and path in sub.depths, f"neighbors {path}")
+                except Exception as e:
+                    errors.append(f"{op}: {e!r}")
+                timings[op].append(time.perf_counter() - start)
+
+        refreshes = 0
+
+        def writer() -> None:
+            nonlocal refreshes
+            rng = random.Random(args.seed + 1)
+            kb_dir = root / "knowledge"
+            while not stop.is_set():
+                target = rng.choice(paths)
+                _, front, _ = target.read_text().split("---\n", 2)
+                body = " ".join(rng.choices(vocab, k=args.words))
+                target.write_text(f"---\n{front}---\n{body}\n")
+                scratch = kb_dir / f"x{rng.randrange(20)}.md"
+                if scratch.exists():
+                    scratch.unlink()
+                else:
+                    scratch.write_text(f'---\ntitle: "Scratch"\ntype: note\n---\n{body}\n')
+                try:
+                    if refreshes % 10 == 9:
+                        kb.refresh()
+                    else:
+                        kb.refresh_changed()
+                except Exception as e:
+                    errors.append(f"refresh: {e!r}")
+                refreshes += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        coalesced = 0
+        for _ in range(args.pull_rounds):
+            before = CountingKB.pulls
+            kb._last_pull = 0
+            barrier = threading.Barrier(args.readers)
+
+            def burst() -> None:
+                barrier.wait()
+                kb.try_pull()
+
+            burst_threads = [threading.Thread(target=burst) for _ in range(args.readers)]
+            for t in burst_threads:
+                t.start()
+            for t in burst_threads:
+                t.join()
+            coalesced += CountingKB.pulls - before == 1
+
+    print(
+        f"Entries: {args.entries}  backend: {args.backend}  readers: {args.readers}  "
+        f"duration: {args.seconds}s"
+    )
+    print(f"refreshes during reads: {refreshes}")
+    for op, samples in timings.items():
+        _report(op, samples)
+    print(f"try_pull bursts coalesced to one pull: {coalesced}/{args.pull_rounds}")
+    if errors or coalesced != args.pull_rounds:
+        for message in errors[:20]:
+            print(f"error: {message}")
+        print(f"FAILED: {len(errors)} errors")
+        sys.exit(1)
+    print("OK")
+
+
+def cmd_tools(args: argparse.Namespace) -> None:
+    from mcp.server.fastmcp import FastMCP
+
+    from server.config import load_config
+    from server.kb import KnowledgeBase
+    from server.tools import register_tools
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_corpus(root, args.entries, args.words, args.seed)
+        config = load_config(root / "config.yaml", repo_root=root)
+        config.search.backend = args.backend
+        config.search.semantic.provider = "local"
+        config.search.semantic.model = "hashing"
+        config.knowledge.snapshot = False
+        config.sync.auto_pull = False
+        kb = KnowledgeBase(config)
+        mcp = FastMCP("memex-bench")
+        register_tools(mcp, kb, config)
+
+        vocab = [f"w{i}" for i in range(5000)]
+        timings: dict[str, list[float]] = {
+            "kb_search": [], "kb_list": [], "kb_read": [], "kb_neighbors": []
+        }
+        lag: list[float] = []
+        errors: list[str] = []
+
+        def arguments(rng: random.Random, tool: str) -> dict:
+            path = f"/knowledge/e{rng.randrange(args.entries)}.md"
+            if tool == "kb_search":
+                return {"query": " ".join(rng.choices(vocab, k=2)), "limit": 10}
+            if tool == "kb_list":
+                return {"tags": [f"t{rng.randrange(20)}"], "limit": 20}
+            if tool == "kb_read":
+                return {"path": path}
+            return {"path": path, "depth": 2}
+
+        async def client(seed: int, deadline: float) -> None:
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                tool = rng.choice(list(timings))
+                start = time.perf_counter()
+                try:
+                    await mcp.call_tool(tool, arguments(rng, tool))
+                except Exception as e:
+                    errors.append(f"{tool}: {e!r}")
+                timings[tool].append(time.perf_counter() - start)
+
+        async def heartbeat(deadline: float) -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lag.append(time.perf_counter() - start - 0.005)
+
+        async def run() -> float:
+            start = time.perf_counter()
+            deadline = start + args.seconds
+            await asyncio.gather(
+                heartbeat(deadline),
+                *(client(args.seed + i, deadline) for i in range(args.clients)),
+            )
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(run())
+
+    calls = sum(len(samples) for samples in timings.values())
+    print(
+        f"Entries: {args.entries}  backend: {args.backend}  clients: {args.clients}  "
+        f"duration: {elapsed:.1f}s"
+    )
+    print(f"throughput: {calls / elapsed:.0f} calls/s")
+    _report("all tools", [t for samples in timings.values() for t in samples])
+    for tool, samples in timings.items():
+        _report(tool, samples)
+    _report("event loop lag", lag)
+    if errors:
+        for message in errors[:20]:
+            print(f"error: {message}")
+        print(f"FAILED: {len(errors)} errors")
+        sys.exit(1)
+
+
+async def _stub_api(handshake_ms: float, connections: list[int]) -> asyncio.Server:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connections.append(1)
+        fresh = True
+        try:
+            while line := await reader.readline():
+                length = 0
+                while (header := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = header.decode().partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                if fresh and handshake_ms:
+                    await asyncio.sleep(handshake_ms / 1000)
+                fresh = False
+                target = line.decode().split(" ")[1]
+                body = b"[]" if "/contents/" in target else b'{"id": "a1", "status": "RUNNING"}'
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def cmd_http(args: argparse.Namespace) -> None:
+    from server.config import HttpConfig
+    from server.cursor_client import CursorClient
+    from server.github_client import GitHubClient
+
+    http = HttpConfig(
+        http2=False,
+        max_connections=args.max_connections,
+        max_keepalive_connections=args.max_keepalive,
+    )
+
+    async def run() -> dict[str, tuple[int, list[float]]]:
+        connections: list[int] = []
+        server = await _stub_api(args.handshake_ms, connections)
+        base = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+        def make_clients() -> tuple[GitHubClient, CursorClient]:
+            return (
+                GitHubClient("token", "owner", "repo", http=http, base_url=base),
+                CursorClient("key", http=http, base_url=f"{base}/v0/agents"),
+            )
+
+        async def call(gh: GitHubClient, cursor: CursorClient, i: int) -> None:
+            if i % 2:
+                await cursor.get_status("a1")
+            else:
+                await gh.list_directory("knowledge/assets", "main")
+
+        results = {}
+        for mode in ("per-call", "pooled"):
+            connections.clear()
+            samples: list[float] = []
+            pooled = make_clients() if mode == "pooled" else None
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one(i: int) -> None:
+                async with semaphore:
+                    start = time.perf_counter()
+                    gh, cursor = pooled or make_clients()
+                    try:
+                        await call(gh, cursor, i)
+                    finally:
+                        if pooled is None:
+                            await gh.close()
+                            await cursor.close()
+                    samples.append(time.perf_counter() - start)
+
+            await asyncio.gather(*(one(i) for i in range(args.calls)))
+            if pooled:
+                for client in pooled:
+                    await client.close()
+            results[mode] = (len(connections), samples)
+        server.close()
+        await server.wait_closed()
+        return results
+
+    results = asyncio.run(run())
+    print(
+        f"calls: {args.calls}  concurrency: {args.concurrency}  "
+        f"simulated handshake: {args.handshake_ms}ms"
+    )
+    for mode, (opened, samples) in results.items():
+        _report(f"{mode} ({opened} connections)", samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="memex-bench")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ann = sub.add_parser("ann")
+    p_ann.add_argument("--index", default="ivf", choices=["ivf", "hnsw"])
+    p_ann.add_argument("--entries", type=int, default=100_000)
+    p_ann.add_argument("--dim", type=int, default=256)
+    p_ann.add_argument("--clusters", type=int, default=200)
+    p_ann.add_argument("--queries", type=int, default=200)
+    p_ann.add_argument("--k", type=int, default=10)
+    p_ann.add_argument("--nprobe", type=int, default=8)
+    p_ann.add_argument("--ef-search", type=int, default=64)
+    p_ann.add_argument("--seed", type=int, default=0)
+    p_ann.set_defaults(func=cmd_ann)
+
+    p_memory = sub.add_parser("memory")
+    p_memory.add_argument("--entries", type=int, default=10_000)
+    p_memory.add_argument("--words", type=int, default=400)
+    p_memory.add_argument("--body-cache-mb", type=int, default=64)
+    p_memory.add_argument("--reads", type=int, default=500)
+    p_memory.add_argument("--seed", type=int, default=0)
+    p_memory.set_defaults(func=cmd_memory)
+
+    p_stress = sub.add_parser("stress")
+    p_stress.add_argument("--backend", default="bm25-inverted")
+    p_stress.add_argument("--entries", type=int, default=1000)
+    p_stress.add_argument("--words", type=int, default=100)
+    p_stress.add_argument("--readers", type=int, default=8)
+    p_stress.add_argument("--seconds", type=float, default=10)
+    p_stress.add_argument("--pull-rounds", type=int, default=20)
+    p_stress.add_argument("--seed", type=int, default=0)
+    p_stress.set_defaults(func=cmd_stress)
+
+    p_tools = sub.add_parser("tools")
+    p_tools.add_argument("--backend", default="bm25-inverted")
+    p_tools.add_argument("--entries", type=int, default=2000)
+    p_tools.add_argument("--words", type=int, default=100)
+    p_tools.add_argument("--clients", type=int, default=32)
+    p_tools.add_argument("--seconds", type=float, default=10)
+    p_tools.add_argument("--seed", type=int, default=0)
+    p_tools.set_defaults(func=cmd_tools)
+
+    p_http = sub.add_parser("http")
+    p_http.add_argument("--calls", type=int, default=500)
+    p_http.add_argument("--concurrency", type=int, default=8)
+    p_http.add_argument("--handshake-ms", type=float, default=20)
+    p_http.add_argument("--max-connections", type=int, default=20)
+    p_http.add_argument("--max-keepalive", type=int, default=10)
+    p_http.set_defaults(func=cmd_http)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
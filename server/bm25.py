@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from server.analysis import FIELDS, Analyzer
+from server.kb import Entry, SearchResult
+
+
+def _new_posting() -> tuple[array, ...]:
+    return tuple(array("I") for _ in range(2 + len(FIELDS)))
+
+
+class InvertedBM25Backend:
+    def __init__(
+        self,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+        analyzer: Analyzer | None = None,
+        field_weights: dict[str, float] | None = None,
+        field_b: dict[str, float] | None = None,
+    ) -> None:
+        self._analyzer = analyzer or Analyzer()
+        self._k1 = k1
+        self._b = b
+        self._epsilon = epsilon
+        self._field_weights = (
+            [field_weights.get(f, 0.0) for f in FIELDS] if field_weights else None
+        )
+        self._field_b = [(field_b or {}).get(f, b) for f in FIELDS]
+        self._docs: list[Entry | None] = []
+        self._doc_ids: dict[str, int] = {}
+        self._doc_terms: list[tuple[str, ...]] | None = []
+        self._lengths = array("I")
+        self._field_lengths = [array("I") for _ in FIELDS]
+        self._postings: dict[str, tuple[array, ...]] = {}
+        self._total_length = 0
+        self._field_totals = [0] * len(FIELDS)
+        self._norms: array | None = None
+        self._field_norms: list[array] | None = None
+        self._idf: dict[str, float] | None = None
+        self._backlink_counts: dict[str, int] = {}
+        self._prior: dict[str, float] = {}
+        self._shared = False
+
+    def set_backlink_counts(self, counts: dict[str, int]) -> None:
+        self._backlink_counts = counts
+
+    def set_rank_prior(self, prior: dict[str, float]) -> None:
+        self._prior = prior
+
+    def fork(self) -> InvertedBM25Backend:
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        self._shared = clone._shared = True
+        return clone
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_doc_terms"] = None
+        state["_shared"] = False
+        return state
+
+    def _rebuild_doc_terms(self) -> None:
+        doc_terms: list[list[str]] = [[] for _ in self._docs]
+        for term, posting in self._postings.items():
+            for doc_id in posting[0]:
+                doc_terms[doc_id].append(term)
+        self._doc_terms = [tuple(terms) for terms in doc_terms]
+
+    def _own(self) -> None:
+        self._docs = list(self._docs)
+        self._doc_ids = dict(self._doc_ids)
+        self._doc_terms = list(self._doc_terms)
+        self._lengths = array("I", self._lengths)
+        self._field_lengths = [array("I", lengths) for lengths in self._field_lengths]
+        self._field_totals = list(self._field_totals)
+        self._postings = {
+            term: tuple(array("I", column) for column in posting)
+            for term, posting in self._postings.items()
+        }
+        self._shared = False
+
+    def _analyze(self, entry: Entry) -> tuple[Counter, list[Counter], list[int]]:
+        fields = self._analyzer.analyze(entry)
+        field_tokens = [getattr(fields, f) for f in FIELDS]
+        tf: Counter = Counter()
+        field_tfs = []
+        for tokens in field_tokens:
+            counts = Counter(tokens)
+            tf.update(counts)
+            field_tfs.append(counts)
+        return tf, field_tfs, [len(tokens) for tokens in field_tokens]
+
+    def _set_lengths(self, doc_id: int, lengths: list[int], append: bool) -> None:
+        total = sum(lengths)
+        if append:
+            self._lengths.append(total)
+        else:
+            self._lengths[doc_id] = total
+        self._total_length += total
+        for i, length in enumerate(lengths):
+            if append:
+                self._field_lengths[i].append(length)
+            else:
+                self._field_lengths[i][doc_id] = length
+            self._field_totals[i] += length
+
+    def index(self, entries: list[Entry]) -> None:
+        self._shared = False
+        self._docs = []
+        self._doc_ids = {}
+        self._doc_terms = []
+        self._lengths = array("I")
+        self._field_lengths = [array("I") for _ in FIELDS]
+        self._total_length = 0
+        self._field_totals = [0] * len(FIELDS)
+        postings: dict[str, tuple[array, ...]] = defaultdict(_new_posting)
+        for entry in entries:
+            if entry.path in self._doc_ids:
+                continue
+            doc_id = len(self._docs)
+            tf, field_tfs, lengths = self._analyze(entry)
+            for term, count in tf.items():
+                posting = postings[term]
+                posting[0].append(doc_id)
+                posting[1].append(count)
+                for column, counts in zip(posting[2:], field_tfs):
+                    column.append(counts.get(term, 0))
+            self._docs.append(entry)
+            self._doc_ids[entry.path] = doc_id
+            self._doc_terms.append(tuple(tf))
+            self._set_lengths(doc_id, lengths, append=True)
+        self._postings = dict(postings)
+        self._analyzer.retain(entries)
+        self._invalidate()
+
+    def update(self, entries: list[Entry], removed: list[str]) -> None:
+        if self._doc_terms is None:
+            self._rebuild_doc_terms()
+        if self._shared:
+            self._own()
+        for path in removed:
+            self._remove(path)
+        for entry in entries:
+            doc_id = self._remove(entry.path, entry.content_hash)
+            tf, field_tfs, lengths = self._analyze(entry)
+            append = doc_id is None
+            if append:
+                doc_id = len(self._docs)
+                self._docs.append(entry)
+                self._doc_terms.append(tuple(tf))
+            else:
+                self._docs[doc_id] = entry
+                self._doc_terms[doc_id] = tuple(tf)
+            self._doc_ids[entry.path] = doc_id
+            self._set_lengths(doc_id, lengths, append)
+            for term, count in tf.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = _new_posting()
+                pos = bisect_left(posting[0], doc_id)
+                posting[0].insert(pos, doc_id)
+                posting[1].insert(pos, count)
+                for column, counts in zip(posting[2:], field_tfs):
+                    column.insert(pos, counts.get(term, 0))
+
+        if len(self._docs) > 2 * max(len(self._doc_ids), 1):
+            self.index([e for e in self._docs if e is not None])
+        else:
+            self._invalidate()
+
+    def _remove(self, path: str, new_hash: str = "") -> int | None:
+        doc_id = self._doc_ids.get(path)
+        if doc_id is None:
+            return None
+        old_hash = self._docs[doc_id].content_hash
+        if old_hash != new_hash:
+            self._analyzer.forget(old_hash)
+        for term in self._doc_terms[doc_id]:
+            posting = self._postings[term]
+            pos = bisect_left(posting[0], doc_id)
+            for column in posting:
+                del column[pos]
+            if not posting[0]:
+                del self._postings[term]
+        self._total_length -= self._lengths[doc_id]
+        self._lengths[doc_id] = 0
+        for i, lengths in enumerate(self._field_lengths):
+            self._field_totals[i] -= lengths[doc_id]
+            lengths[doc_id] = 0
+        self._docs[doc_id] = None
+        self._doc_terms[doc_id] = ()
+        del self._doc_ids[path]
+        return doc_id
+
+    def _invalidate(self) -> None:
+        self._norms = None
+        self._field_norms = None
+        self._idf = None
+
+    def _prepare_idf(self) -> dict[str, float]:
+        if self._idf is None:
+            n_docs = len(self._doc_ids)
+            idf: dict[str, float] = {}
+            negative: list[str] = []
+            for term, posting in self._postings.items():
+                df = len(posting[0])
+                value = math.log(n_docs - df + 0.5) - math.log(df + 0.5)
+                idf[term] = value
+                if value < 0:
+                    negative.append(term)
+            eps = self._epsilon * (sum(idf.values()) / len(idf)) if idf else 0.0
+            for term in negative:
+                idf[term] = eps
+            self._idf = idf
+        return self._idf
+
+    def _prepare_norms(self) -> array:
+        if self._norms is None:
+            avgdl = self._total_length / len(self._doc_ids)
+            k1, b = self._k1, self._b
+            self._norms = array(
+                "d", (k1 * (1 - b + b * dl / avgdl) for dl in self._lengths)
+            )
+        return self._norms
+
+    def _prepare_field_norms(self) -> list[array]:
+        if self._field_norms is None:
+            n_docs = len(self._doc_ids)
+            norms = []
+            for weight, b, lengths, total in zip(
+                self._field_weights, self._field_b, self._field_lengths, self._field_totals
+            ):
+                avg = total / n_docs or 1.0
+                norms.append(
+                    array(
+                        "d",
+                        (
+                            weight / (1 - b + b * length / avg) if length else 0.0
+                            for length in lengths
+                        ),
+                    )
+                )
+            self._field_norms = norms
+        return self._field_norms
+
+    def _score_bm25(
+        self, terms: list[str], allowed: set[int] | None = None
+    ) -> dict[int, float]:
+        norms = self._prepare_norms()
+        idf = self._prepare_idf()
+        k1 = self._k1
+        scores: dict[int, float] = defaultdict(float)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            weight = idf[term]
+            for doc_id, tf in zip(posting[0], posting[1]):
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                scores[doc_id] += weight * (tf * (k1 + 1) / (tf + norms[doc_id]))
+        return scores
+
+    def _score_bm25f(
+        self, terms: list[str], allowed: set[int] | None = None
+    ) -> dict[int, float]:
+        field_norms = self._prepare_field_norms()
+        idf = self._prepare_idf()
+        k1 = self._k1
+        active = [i for i, weight in enumerate(self._field_weights) if weight]
+        scores: dict[int, float] = defaultdict(float)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            pseudo: dict[int, float] = defaultdict(float)
+            ids = posting[0]
+            for i in active:
+                norms = field_norms[i]
+                for doc_id, tf in zip(ids, posting[2 + i]):
+                    if tf and (allowed is None or doc_id in allowed):
+                        pseudo[doc_id] += tf * norms[doc_id]
+            weight = idf[term]
+            for doc_id, tf in pseudo.items():
+                scores[doc_id] += weight * (tf * (k1 + 1) / (tf + k1))
+        return scores
+
+    def search(
+        self, query: str, limit: int = 20, allowed: set[str] | None = None
+    ) -> list[SearchResult]:
+        if not self._doc_ids:
+            return []
+        ids = None
+        if allowed is not None:
+            ids = {self._doc_ids[p] for p in allowed if p in self._doc_ids}
+            if not ids:
+                return []
+        terms = self._analyzer.terms(query)
+        if self._field_weights:
+            scores = self._score_bm25f(terms, ids)
+        else:
+            scores = self._score_bm25(terms, ids)
+        if self._prior:
+            prior, docs = self._prior, self._docs
+            for doc_id in scores:
+                scores[doc_id] *= prior.get(docs[doc_id].path, 1.0)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda x: (x[1], -x[0]))
+        results = []
+        for doc_id, score in top:
+            entry = self._docs[doc_id]
+            results.append(
+                SearchResult(
+                    path=entry.path,
+                    title=entry.title,
+                    type=entry.type,
+                    tags=entry.tags,
+                    summary=entry.summary,
+                    score=round(score, 4),
+                    backlink_count=self._backlink_counts.get(entry.path, 0),
+                )
+            )
+        return results
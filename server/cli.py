@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import sys
-from pathlib import Path, PurePosixPath
 
-import httpx
-
-from server.config import load_config
-from server.github_client import GitHubClient, GitHubClientError, IMAGE_EXTENSIONS
+from server.assets import describe_upload, load_assets, upload_assets
+from server.config import Config, load_config
+from server.filters import EntryFilter, InvalidCursorError
+from server.github_client import GitHubClient, GitHubClientError
+from server.graph import DIRECTIONS
+from server.http import async_client
 from server.kb import KnowledgeBase
 
 
@@ -19,7 +21,18 @@ def _make_kb() -> KnowledgeBase:
 
 def cmd_search(args: argparse.Namespace) -> None:
     kb = _make_kb()
-    results = kb.search(args.query, limit=args.limit)
+    flt = EntryFilter(
+        type=args.type,
+        tags=tuple(args.tag or ()),
+        match_any=args.any,
+        created_from=args.created_from,
+        created_to=args.created_to,
+    )
+    if args.facets:
+        page = kb.search_page(args.query, limit=args.limit, flt=flt)
+        results, facets = page.results, page.facets
+    else:
+        results, facets = kb.search(args.query, limit=args.limit, flt=flt), {}
     if not results:
         print("No results found.")
         return
@@ -30,18 +43,32 @@ def cmd_search(args: argparse.Namespace) -> None:
         print(f"  summary: {r.summary}")
         print(f"  score: {r.score}  backlinks: {r.backlink_count}")
         print()
+    if args.facets:
+        for name, counts in facets.items():
+            print(f"{name}: {', '.join(f'{v} ({c})' for v, c in counts.items())}")
+    if args.timings:
+        for stage, ms in kb.search_timings().items():
+            print(f"{stage}: {ms:.1f}")
 
 
 def cmd_list(args: argparse.Namespace) -> None:
     kb = _make_kb()
-    entries = kb.list_entries(
-        type_filter=args.type,
-        tag_filter=args.tag,
+    flt = EntryFilter(
+        type=args.type,
+        tags=tuple(args.tag or ()),
+        match_any=args.any,
+        created_from=args.created_from,
+        created_to=args.created_to,
     )
-    if not entries:
+    try:
+        page = kb.list_page(flt, limit=args.limit, cursor=args.cursor)
+    except InvalidCursorError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not page.entries:
         print("No entries found.")
         return
-    for e in entries:
+    for e in page.entries:
         bl = kb.get_backlink_count(e.path)
         print(f"[{e.type}] {e.title}")
         print(f"  path: {e.path}")
@@ -49,6 +76,9 @@ def cmd_list(args: argparse.Namespace) -> None:
         print(f"  summary: {e.summary}")
         print(f"  edges: {len(e.edges)}  backlinks: {bl}")
         print()
+    if page.next_cursor:
+        print(f"Showing {len(page.entries)} of {page.total}.")
+        print(f"Next page: --cursor {page.next_cursor}")
 
 
 def cmd_read(args: argparse.Namespace) -> None:
@@ -98,6 +128,15 @@ def cmd_stats(args: argparse.Namespace) -> None:
     print(f"\nBy tag:")
     for t, c in sorted(tg.items(), key=lambda x: x[1], reverse=True):
         print(f"  {t}: {c}")
+    errors = kb.parse_errors()
+    if errors:
+        print(f"\nParse errors:")
+        for path, error in sorted(errors.items()):
+            print(f"  {path}: {error}")
+    qc = kb.query_cache_stats()
+    if qc is not None:
+        print(f"\nQuery embedding cache:")
+        print(f"  size: {qc['size']}  hits: {qc['hits']}  misses: {qc['misses']}")
 
 
 def cmd_upload(args: argparse.Namespace) -> None:
@@ -109,52 +148,62 @@ def cmd_upload(args: argparse.Namespace) -> None:
         print("Error: GitHub repository not configured in config.yaml", file=sys.stderr)
         sys.exit(1)
 
+    asyncio.run(_upload(args, config))
+
+
+async def _upload(args: argparse.Namespace, config: Config) -> None:
     branch = args.branch or config.github.default_branch
 
-    gh = GitHubClient(config.memex_git_token, config.github.owner, config.github.repo)
+    gh = GitHubClient(
+        config.memex_git_token, config.github.owner, config.github.repo, http=config.http
+    )
+    http = async_client(config.http, follow_redirects=True)
     try:
+        assets, errors = await load_assets(args.sources, http)
+        for error in errors:
+            print(f"Skipping: {error}", file=sys.stderr)
+        if not assets:
+            sys.exit(1)
+
         if args.branch:
-            gh.ensure_branch(branch, config.github.default_branch)
-
-        for source in args.sources:
-            is_url = source.startswith("http://") or source.startswith("https://")
-
-            if is_url:
-                filename = PurePosixPath(source.split("?")[0]).name
-            else:
-                filename = Path(source).name
-
-            ext = PurePosixPath(filename).suffix.lower()
-            if ext not in IMAGE_EXTENSIONS:
-                print(
-                    f"Skipping {filename}: unsupported type '{ext}'",
-                    file=sys.stderr,
-                )
-                continue
-
-            if is_url:
-                try:
-                    resp = httpx.get(source, timeout=30, follow_redirects=True)
-                    resp.raise_for_status()
-                    content = resp.content
-                except httpx.HTTPError as e:
-                    print(f"Error fetching {source}: {e}", file=sys.stderr)
-                    continue
-            else:
-                p = Path(source).expanduser().resolve()
-                if not p.exists():
-                    print(f"File not found: {source}", file=sys.stderr)
-                    continue
-                content = p.read_bytes()
-
-            repo_path = f"{config.knowledge.assets_dir}/{filename}"
-            result = gh.upload_file(repo_path, content, branch)
-            print(f"Uploaded: /{result.path}  (branch: {result.branch})")
+            await gh.ensure_branch(branch, config.github.default_branch)
+        plan, result = await upload_assets(
+            gh,
+            assets,
+            config.knowledge.assets_dir,
+            branch,
+            dedupe=args.dedupe or config.knowledge.dedupe_assets,
+        )
+        for line in describe_upload(plan, result, branch):
+            print(line)
     except GitHubClientError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
     finally:
-        gh.close()
+        await http.aclose()
+        await gh.close()
+
+
+def cmd_graph(args: argparse.Namespace) -> None:
+    kb = _make_kb()
+    try:
+        sub = kb.neighbors(args.path, args.depth, args.label, args.direction, args.max_nodes)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if sub is None:
+        print(f"Entry not found: {args.path}")
+        sys.exit(1)
+    for node, hop in sub.depths.items():
+        entry = kb.read_entry(node)
+        title = f"({entry.type}) {entry.title}" if entry else "(missing)"
+        print(f"[{hop}] {node} {title}")
+    if sub.edges:
+        print()
+        for edge in sub.edges:
+            print(f"{edge.source} -[{edge.label}]-> {edge.target}")
+    if sub.truncated:
+        print(f"\nTruncated at {args.max_nodes} entries.")
 
 
 def main() -> None:
@@ -164,23 +213,44 @@ def main() -> None:
     p_search = sub.add_parser("search")
     p_search.add_argument("query")
     p_search.add_argument("--limit", type=int, default=20)
+    p_search.add_argument("--type", default=None)
+    p_search.add_argument("--tag", action="append", default=None)
+    p_search.add_argument("--any", action="store_true")
+    p_search.add_argument("--from", dest="created_from", default=None)
+    p_search.add_argument("--to", dest="created_to", default=None)
+    p_search.add_argument("--facets", action="store_true")
+    p_search.add_argument("--timings", action="store_true")
     p_search.set_defaults(func=cmd_search)
 
     p_list = sub.add_parser("list")
     p_list.add_argument("--type", default=None)
-    p_list.add_argument("--tag", default=None)
+    p_list.add_argument("--tag", action="append", default=None)
+    p_list.add_argument("--any", action="store_true")
+    p_list.add_argument("--from", dest="created_from", default=None)
+    p_list.add_argument("--to", dest="created_to", default=None)
+    p_list.add_argument("--limit", type=int, default=None)
+    p_list.add_argument("--cursor", default=None)
     p_list.set_defaults(func=cmd_list)
 
     p_read = sub.add_parser("read")
     p_read.add_argument("path")
     p_read.set_defaults(func=cmd_read)
 
+    p_graph = sub.add_parser("graph")
+    p_graph.add_argument("path")
+    p_graph.add_argument("--depth", type=int, default=1)
+    p_graph.add_argument("--label", action="append", default=None)
+    p_graph.add_argument("--direction", choices=DIRECTIONS, default="both")
+    p_graph.add_argument("--max-nodes", type=int, default=100)
+    p_graph.set_defaults(func=cmd_graph)
+
     p_stats = sub.add_parser("stats")
     p_stats.set_defaults(func=cmd_stats)
 
     p_upload = sub.add_parser("upload")
     p_upload.add_argument("sources", nargs="+")
     p_upload.add_argument("--branch", default=None)
+    p_upload.add_argument("--dedupe", action="store_true")
     p_upload.set_defaults(func=cmd_upload)
 
     args = parser.parse_args()
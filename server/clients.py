@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from server.config import Config
+from server.cursor_client import CursorClient
+from server.github_client import GitHubClient
+from server.http import async_client
+
+
+class ApiClients:
+    def __init__(self, config: Config) -> None:
+        self._config = config
+        self._github: GitHubClient | None = None
+        self._cursor: CursorClient | None = None
+        self._web: httpx.AsyncClient | None = None
+        self._tools: ThreadPoolExecutor | None = None
+
+    @property
+    def github(self) -> GitHubClient:
+        if self._github is None:
+            config = self._config
+            self._github = GitHubClient(
+                config.memex_git_token,
+                config.github.owner,
+                config.github.repo,
+                http=config.http,
+            )
+        return self._github
+
+    @property
+    def cursor(self) -> CursorClient:
+        if self._cursor is None:
+            self._cursor = CursorClient(self._config.cursor_api_key, http=self._config.http)
+        return self._cursor
+
+    @property
+    def web(self) -> httpx.AsyncClient:
+        if self._web is None:
+            self._web = async_client(self._config.http, follow_redirects=True)
+        return self._web
+
+    @property
+    def tools(self) -> ThreadPoolExecutor:
+        if self._tools is None:
+            self._tools = ThreadPoolExecutor(
+                max_workers=self._config.server.tool_workers, thread_name_prefix="memex-tools"
+            )
+        return self._tools
+
+    async def close(self) -> None:
+        github, cursor, web, tools = self._github, self._cursor, self._web, self._tools
+        self._github = self._cursor = self._web = self._tools = None
+        if tools:
+            tools.shutdown(wait=False, cancel_futures=True)
+        if github:
+            await github.close()
+        if cursor:
+            await cursor.close()
+        if web:
+            await web.aclose()
@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 class ServerConfig:
     host: str = "0.0.0.0"
     port: int = 8787
+    tool_workers: int = 4
 
 
 @dataclass
@@ -31,24 +32,88 @@ class KnowledgeConfig:
     recommended_tags: list[str] = field(
         default_factory=lambda: ["ml", "systems", "math", "programming"]
     )
+    snapshot: bool = True
+    parse_workers: int = 0
+    body_cache_mb: int = 64
+    dedupe_assets: bool = False
+    list_limit: int = 50
 
 
 @dataclass
 class SemanticConfig:
     provider: str = "openai"
     model: str = "text-embedding-3-small"
+    cache_dtype: str = "float32"
+    index: str = "flat"
+    nprobe: int = 8
+    ef_search: int = 64
+    dim: int = 512
+    batch_size: int = 100
+    workers: int = 4
+    concurrency: int = 4
+    max_batch_tokens: int = 100000
+    max_retries: int = 5
+    query_cache_size: int = 1024
+    query_cache_ttl_seconds: int = 3600
+    query_cache_persist: bool = False
+
+
+@dataclass
+class HybridConfig:
+    lexical: str = "bm25"
+    fusion: str = "rrf"
+    rrf_k: int = 60
+    lexical_weight: float = 1.0
+    semantic_weight: float = 1.0
+    backlink_boost: float = 0.0
+    candidates: int = 50
+
+
+@dataclass
+class AnalyzerConfig:
+    normalize: bool = True
+    strip_punctuation: bool = True
+    stemming: bool = False
+    stopwords: bool = False
+
+
+@dataclass
+class BM25FConfig:
+    k1: float = 1.2
+    weights: dict[str, float] = field(
+        default_factory=lambda: {"title": 3.0, "summary": 2.0, "tags": 2.0, "body": 1.0}
+    )
+    b: dict[str, float] = field(
+        default_factory=lambda: {"title": 0.5, "summary": 0.5, "tags": 0.3, "body": 0.75}
+    )
 
 
 @dataclass
 class SearchConfig:
     backend: str = "bm25"
+    limit: int = 20
+    prompt_related: int = 5
+    pagerank_weight: float = 0.0
+    analyzer: AnalyzerConfig = field(default_factory=AnalyzerConfig)
+    bm25f: BM25FConfig = field(default_factory=BM25FConfig)
     semantic: SemanticConfig = field(default_factory=SemanticConfig)
+    hybrid: HybridConfig = field(default_factory=HybridConfig)
+
+
+@dataclass
+class HttpConfig:
+    http2: bool = True
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    timeout: float = 30.0
 
 
 @dataclass
 class SyncConfig:
     auto_pull: bool = True
     pull_interval_seconds: int = 60
+    incremental: bool = True
 
 
 @dataclass
@@ -58,6 +123,7 @@ class Config:
     knowledge: KnowledgeConfig = field(default_factory=KnowledgeConfig)
     search: SearchConfig = field(default_factory=SearchConfig)
     sync: SyncConfig = field(default_factory=SyncConfig)
+    http: HttpConfig = field(default_factory=HttpConfig)
 
     cursor_api_key: str = ""
     openai_api_key: str = ""
@@ -84,12 +150,19 @@ def load_config(config_path: Path | None = None, repo_root: Path | None = None)
     knowledge_raw = raw.get("knowledge", {})
     search_raw = raw.get("search", {})
     semantic_raw = search_raw.get("semantic", {})
+    hybrid_raw = search_raw.get("hybrid", {})
+    analyzer_raw = search_raw.get("analyzer", {})
+    bm25f_raw = search_raw.get("bm25f", {})
+    bm25f_defaults = BM25FConfig()
     sync_raw = raw.get("sync", {})
+    http_raw = raw.get("http", {})
+    provider = semantic_raw.get("provider", "openai")
 
     return Config(
         server=ServerConfig(
             host=server_raw.get("host", "0.0.0.0"),
             port=server_raw.get("port", 8787),
+            tool_workers=server_raw.get("tool_workers", 4),
         ),
         github=GitHubConfig(
             owner=github_raw.get("owner", ""),
@@ -105,17 +178,69 @@ def load_config(config_path: Path | None = None, repo_root: Path | None = None)
             recommended_tags=knowledge_raw.get(
                 "recommended_tags", ["ml", "systems", "math", "programming"]
             ),
+            snapshot=knowledge_raw.get("snapshot", True),
+            parse_workers=knowledge_raw.get("parse_workers", 0),
+            list_limit=knowledge_raw.get("list_limit", 50),
+            body_cache_mb=knowledge_raw.get("body_cache_mb", 64),
+            dedupe_assets=knowledge_raw.get("dedupe_assets", False),
         ),
         search=SearchConfig(
             backend=search_raw.get("backend", "bm25"),
+            limit=search_raw.get("limit", 20),
+            prompt_related=search_raw.get("prompt_related", 5),
+            pagerank_weight=search_raw.get("pagerank_weight", 0.0),
+            analyzer=AnalyzerConfig(
+                normalize=analyzer_raw.get("normalize", True),
+                strip_punctuation=analyzer_raw.get("strip_punctuation", True),
+                stemming=analyzer_raw.get("stemming", False),
+                stopwords=analyzer_raw.get("stopwords", False),
+            ),
+            bm25f=BM25FConfig(
+                k1=bm25f_raw.get("k1", bm25f_defaults.k1),
+                weights={**bm25f_defaults.weights, **bm25f_raw.get("weights", {})},
+                b={**bm25f_defaults.b, **bm25f_raw.get("b", {})},
+            ),
             semantic=SemanticConfig(
-                provider=semantic_raw.get("provider", "openai"),
-                model=semantic_raw.get("model", "text-embedding-3-small"),
+                provider=provider,
+                model=semantic_raw.get(
+                    "model",
+                    "hashing" if provider == "local" else "text-embedding-3-small",
+                ),
+                cache_dtype=semantic_raw.get("cache_dtype", "float32"),
+                index=semantic_raw.get("index", "flat"),
+                nprobe=semantic_raw.get("nprobe", 8),
+                ef_search=semantic_raw.get("ef_search", 64),
+                dim=semantic_raw.get("dim", 512),
+                batch_size=semantic_raw.get("batch_size", 100),
+                workers=semantic_raw.get("workers", 4),
+                concurrency=semantic_raw.get("concurrency", 4),
+                max_batch_tokens=semantic_raw.get("max_batch_tokens", 100000),
+                max_retries=semantic_raw.get("max_retries", 5),
+                query_cache_size=semantic_raw.get("query_cache_size", 1024),
+                query_cache_ttl_seconds=semantic_raw.get("query_cache_ttl_seconds", 3600),
+                query_cache_persist=semantic_raw.get("query_cache_persist", False),
+            ),
+            hybrid=HybridConfig(
+                lexical=hybrid_raw.get("lexical", "bm25"),
+                fusion=hybrid_raw.get("fusion", "rrf"),
+                rrf_k=hybrid_raw.get("rrf_k", 60),
+                lexical_weight=hybrid_raw.get("lexical_weight", 1.0),
+                semantic_weight=hybrid_raw.get("semantic_weight", 1.0),
+                backlink_boost=hybrid_raw.get("backlink_boost", 0.0),
+                candidates=hybrid_raw.get("candidates", 50),
             ),
         ),
         sync=SyncConfig(
             auto_pull=sync_raw.get("auto_pull", True),
             pull_interval_seconds=sync_raw.get("pull_interval_seconds", 60),
+            incremental=sync_raw.get("incremental", True),
+        ),
+        http=HttpConfig(
+            http2=http_raw.get("http2", True),
+            max_connections=http_raw.get("max_connections", 20),
+            max_keepalive_connections=http_raw.get("max_keepalive_connections", 10),
+            keepalive_expiry=http_raw.get("keepalive_expiry", 30.0),
+            timeout=http_raw.get("timeout", 30.0),
         ),
         cursor_api_key=os.getenv("CURSOR_API_KEY", ""),
         openai_api_key=os.getenv("OPENAI_API_KEY", ""),
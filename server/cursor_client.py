@@ -4,6 +4,9 @@ from dataclasses import dataclass
 
 import httpx
 
+from server.config import HttpConfig
+from server.http import async_client
+
 API_BASE = "https://api.cursor.com/v0/agents"
 
 
@@ -25,17 +28,23 @@ class CursorClientError(Exception):
 
 
 class CursorClient:
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        http: HttpConfig | None = None,
+        base_url: str = API_BASE,
+    ) -> None:
         self._api_key = api_key
-        self._http = httpx.Client(
+        self._base_url = base_url
+        self._http = async_client(
+            http,
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json",
             },
-            timeout=30,
         )
 
-    def launch_agent(
+    async def launch_agent(
         self,
         prompt: str,
         repository: str,
@@ -52,7 +61,7 @@ class CursorClient:
             },
         }
         try:
-            resp = self._http.post(API_BASE, json=payload)
+            resp = await self._http.post(self._base_url, json=payload)
         except httpx.RequestError as e:
             raise CursorClientError(f"Failed to reach Cloud Agents API: {e}")
 
@@ -74,9 +83,9 @@ class CursorClient:
             agent_url=f"https://cursor.com/agents/{agent_id}",
         )
 
-    def get_status(self, agent_id: str) -> AgentStatus:
+    async def get_status(self, agent_id: str) -> AgentStatus:
         try:
-            resp = self._http.get(f"{API_BASE}/{agent_id}")
+            resp = await self._http.get(f"{self._base_url}/{agent_id}")
         except httpx.RequestError as e:
             raise CursorClientError(f"Failed to reach Cloud Agents API: {e}")
 
@@ -103,5 +112,5 @@ class CursorClient:
             pr_url=pr_url,
         )
 
-    def close(self) -> None:
-        self._http.close()
+    async def close(self) -> None:
+        await self._http.aclose()
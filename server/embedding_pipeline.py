@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Callable, Coroutine, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+import numpy as np
+
+from server.embeddings import EmbeddingProvider
+
+logger = logging.getLogger("memex.semantic")
+
+T = TypeVar("T")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _status_code(exc: Exception) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def _is_rate_limit(exc: Exception) -> bool:
+    return _status_code(exc) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def _is_transient(exc: Exception) -> bool:
+    status = _status_code(exc)
+    return status is None or status == 429 or status >= 500
+
+
+def _retry_after(exc: Exception) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class EmbeddingPipeline:
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        concurrency: int = 4,
+        max_batch_tokens: int = 100_000,
+        max_batch_items: int = 100,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self._provider = provider
+        self._concurrency = concurrency
+        self._max_batch_tokens = max_batch_tokens
+        self._max_batch_items = max_batch_items
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+
+    def batches(self, items: Sequence[tuple[T, str]]) -> list[list[tuple[T, str]]]:
+        batches: list[list[tuple[T, str]]] = []
+        current: list[tuple[T, str]] = []
+        tokens = 0
+        for item in items:
+            cost = estimate_tokens(item[1])
+            if current and (
+                tokens + cost > self._max_batch_tokens
+                or len(current) >= self._max_batch_items
+            ):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(item)
+            tokens += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def run(
+        self,
+        items: Sequence[tuple[T, str]],
+        on_batch: Callable[[list[T], np.ndarray], None],
+        on_progress: Callable[[int, int], None] | None = None,
+    ) -> list[T]:
+        return run_sync(self._run(items, on_batch, on_progress))
+
+    async def _run(
+        self,
+        items: Sequence[tuple[T, str]],
+        on_batch: Callable[[list[T], np.ndarray], None],
+        on_progress: Callable[[int, int], None] | None,
+    ) -> list[T]:
+        async_client = getattr(self._provider, "async_client", None)
+        if async_client is None:
+            return await self._run_with(None, items, on_batch, on_progress)
+        async with async_client() as client:
+            return await self._run_with(client, items, on_batch, on_progress)
+
+    async def _run_with(
+        self,
+        client: Any,
+        items: Sequence[tuple[T, str]],
+        on_batch: Callable[[list[T], np.ndarray], None],
+        on_progress: Callable[[int, int], None] | None,
+    ) -> list[T]:
+        semaphore = asyncio.Semaphore(self._concurrency)
+        total = len(items)
+        done = 0
+        failed: list[T] = []
+
+        async def embed(batch: list[tuple[T, str]]) -> None:
+            nonlocal done
+            keys = [key for key, _ in batch]
+            try:
+                vectors = await self._embed_with_retry(
+                    semaphore, client, [t for _, t in batch]
+                )
+            except Exception as e:
+                if len(batch) > 1 and not _is_transient(e):
+                    mid = len(batch) // 2
+                    await asyncio.gather(embed(batch[:mid]), embed(batch[mid:]))
+                    return
+                logger.warning("Failed to embed %d entries: %s", len(batch), e)
+                failed.extend(keys)
+                return
+            on_batch(keys, vectors)
+            done += len(batch)
+            if on_progress:
+                on_progress(done, total)
+
+        await asyncio.gather(*(embed(batch) for batch in self.batches(items)))
+        return failed
+
+    async def _embed_with_retry(
+        self, semaphore: asyncio.Semaphore, client: Any, texts: list[str]
+    ) -> np.ndarray:
+        attempt = 0
+        while True:
+            async with semaphore:
+                try:
+                    return await self._embed(client, texts)
+                except Exception as e:
+                    if attempt >= self._max_retries or not _is_transient(e):
+                        raise
+                    delay = _retry_after(e) if _is_rate_limit(e) else None
+                    if delay is None:
+                        delay = min(self._max_delay, self._base_delay * 2 ** attempt)
+                        delay *= 0.5 + random.random()
+                    logger.info("Embedding batch failed (%s), retrying in %.1fs", e, delay)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _embed(self, client: Any, texts: list[str]) -> np.ndarray:
+        if client is not None:
+            return await self._provider.aembed(client, texts)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._provider.embed, texts)
+
+
+class ProgressLogger:
+    def __init__(self, interval_seconds: float = 5.0) -> None:
+        self._interval = interval_seconds
+        self._last = 0.0
+
+    def __call__(self, done: int, total: int) -> None:
+        now = time.monotonic()
+        if done == total or now - self._last >= self._interval:
+            self._last = now
+            logger.info("Embedded %d/%d entries", done, total)
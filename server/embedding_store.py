@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger("memex.semantic")
+
+
+class EmbeddingStore:
+    def __init__(self, path: Path, model: str, dtype: str = "float32") -> None:
+        self._path = path
+        self._model = model
+        self._meta_path = path.with_suffix(".meta.json")
+        self._legacy_path = path.with_suffix(".json")
+        self._dtype = np.dtype(dtype)
+        self._generation = 0
+        self.version = 0
+        self._matrix: np.ndarray | None = None
+        self._size = 0
+        self._obsolete: list[Path] = []
+        self.rows: dict[str, int] = {}
+        self.hashes: dict[str, str] = {}
+        self.text_hashes: dict[str, str] = {}
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[: self._size]
+
+    def _data_path(self, generation: int) -> Path:
+        return self._path.with_name(f"{self._path.stem}.{generation}{self._path.suffix}")
+
+    def load(self) -> None:
+        if self._meta_path.exists():
+            try:
+                self._load_binary()
+                return
+            except Exception:
+                logger.warning("Failed to load embeddings cache, starting fresh")
+                self._reset()
+        if self._legacy_path.exists():
+            self._migrate_json()
+
+    def _reset(self) -> None:
+        self._matrix = None
+        self._size = 0
+        self.rows = {}
+        self.hashes = {}
+        self.text_hashes = {}
+
+    def _load_binary(self) -> None:
+        meta = json.loads(self._meta_path.read_text())
+        self._generation = meta["generation"]
+        self.version = meta["version"]
+        if meta["model"] != self._model:
+            logger.info("Embedding model changed, re-embedding all entries")
+            self._obsolete.append(self._data_path(self._generation))
+            return
+        self._size = meta["size"]
+        self.rows = meta["rows"]
+        self.hashes = meta["hashes"]
+        self.text_hashes = meta.get("text_hashes", {})
+        if self._size:
+            self._matrix = np.load(self._data_path(self._generation), mmap_mode="r+")
+            if self._matrix.dtype != self._dtype:
+                self._rewrite(len(self._matrix))
+                self.save()
+
+    def _migrate_json(self) -> None:
+        try:
+            data = json.loads(self._legacy_path.read_text())
+        except Exception:
+            logger.warning("Failed to read legacy embeddings cache, starting fresh")
+            return
+        self.hashes = data.get("hashes", {})
+        embeddings = data.get("embeddings", {})
+        for path, vec in embeddings.items():
+            arr = np.asarray(vec, dtype=np.float32)
+            norm = np.linalg.norm(arr)
+            self.put(path, arr / norm if norm else arr)
+        self.save()
+        self._legacy_path.unlink()
+        logger.info("Migrated %d embeddings from %s", len(embeddings), self._legacy_path.name)
+
+    def get(self, path: str) -> np.ndarray | None:
+        row = self.rows.get(path)
+        if row is None or self._matrix is None:
+            return None
+        return self._matrix[row]
+
+    def put(self, path: str, vector: np.ndarray) -> None:
+        row = self._allocate(len(vector))
+        self._matrix[row] = vector
+        self.rows[path] = row
+
+    def remove(self, path: str) -> None:
+        self.rows.pop(path, None)
+        self.hashes.pop(path, None)
+
+    def _allocate(self, dim: int) -> int:
+        if self._matrix is None:
+            self._matrix = np.zeros((0, dim), dtype=self._dtype)
+        if self._size == len(self._matrix):
+            self._rewrite(max(64, 2 * len(self._matrix)))
+        self._size += 1
+        return self._size - 1
+
+    def _rewrite(self, capacity: int) -> None:
+        old_path = self._data_path(self._generation)
+        self._generation += 1
+        new_path = self._data_path(self._generation)
+        new_path.parent.mkdir(parents=True, exist_ok=True)
+        matrix = np.lib.format.open_memmap(
+            new_path,
+            mode="w+",
+            dtype=self._dtype,
+            shape=(capacity, self._matrix.shape[1]),
+        )
+        matrix[: self._size] = self._matrix[: self._size]
+        matrix.flush()
+        self._matrix = matrix
+        if old_path not in self._obsolete:
+            self._obsolete.append(old_path)
+
+    def compact(self) -> None:
+        if self._matrix is None or not self.rows:
+            return
+        live = sorted(self.rows.items(), key=lambda item: item[1])
+        source = self._matrix
+        self._size = 0
+        self._rewrite(max(64, len(live)))
+        for new_row, (path, old_row) in enumerate(live):
+            self._matrix[new_row] = source[old_row]
+            self.rows[path] = new_row
+        self._size = len(live)
+
+    def save(self) -> bool:
+        compacted = self._size - len(self.rows) > self._size // 2
+        if compacted:
+            self.compact()
+        self.version += 1
+        if self._matrix is not None and isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        self._meta_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "model": self._model,
+            "generation": self._generation,
+            "version": self.version,
+            "size": self._size,
+            "dtype": self._dtype.name,
+            "rows": self.rows,
+            "hashes": self.hashes,
+            "text_hashes": self.text_hashes,
+        }
+        tmp_path = self._meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self._meta_path)
+
+        for path in self._obsolete:
+            if path != self._data_path(self._generation):
+                path.unlink(missing_ok=True)
+        self._obsolete = []
+        return compacted
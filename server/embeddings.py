@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import math
+import re
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+from server.config import Config
+
+logger = logging.getLogger("memex.semantic")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class EmbeddingProvider(Protocol):
+    model: str
+
+    def embed(self, texts: list[str]) -> np.ndarray: ...
+
+
+class OpenAIProvider:
+    def __init__(self, api_key: str, model: str = "text-embedding-3-small") -> None:
+        self.model = model
+        self._api_key = api_key
+        self._client: object | None = None
+
+    def _get_client(self):
+        if self._client is None:
+            try:
+                from openai import OpenAI
+                self._client = OpenAI(api_key=self._api_key)
+            except ImportError:
+                raise RuntimeError("openai package not installed. Install with: uv pip install openai")
+        return self._client
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        client = self._get_client()
+        response = client.embeddings.create(input=texts, model=self.model)
+        return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
+    def async_client(self):
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise RuntimeError("openai package not installed. Install with: uv pip install openai")
+        return AsyncOpenAI(api_key=self._api_key, max_retries=0)
+
+    async def aembed(self, client, texts: list[str]) -> np.ndarray:
+        response = await client.embeddings.create(input=texts, model=self.model)
+        return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
+
+class _PooledProvider(ABC):
+    model: str
+
+    def __init__(self, batch_size: int, workers: int) -> None:
+        self._batch_size = batch_size
+        self._workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+
+    @abstractmethod
+    def _embed_batch(self, texts: list[str]) -> np.ndarray: ...
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if len(texts) <= self._batch_size or self._workers <= 1:
+            return self._embed_batch(texts)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="memex-embed"
+            )
+        batches = [
+            texts[i : i + self._batch_size]
+            for i in range(0, len(texts), self._batch_size)
+        ]
+        return np.concatenate(list(self._executor.map(self._embed_batch, batches)))
+
+
+class HashingProvider(_PooledProvider):
+    def __init__(self, dim: int = 512, batch_size: int = 100, workers: int = 4) -> None:
+        super().__init__(batch_size, workers)
+        self.model = f"hashing-{dim}"
+        self._dim = dim
+
+    def _features(self, text: str) -> Counter:
+        words = _WORD_RE.findall(text.lower())
+        features = Counter(words)
+        features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            if len(word) > 3:
+                padded = f"<{word}>"
+                features.update(padded[i : i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self._dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vec = out[row]
+            for feature, count in self._features(text).items():
+                h = zlib.crc32(feature.encode())
+                weight = 1.0 + math.log(count)
+                vec[h % self._dim] += -weight if h & 0x80000000 else weight
+        return out
+
+
+class SentenceTransformerProvider(_PooledProvider):
+    def __init__(self, model_path: str, batch_size: int = 32, workers: int = 1) -> None:
+        super().__init__(batch_size, workers)
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError(
+                "sentence-transformers package not installed. "
+                "Install with: uv pip install sentence-transformers"
+            )
+        self.model = model_path
+        self._model = SentenceTransformer(model_path, device="cpu")
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        return self._model.encode(
+            texts, batch_size=self._batch_size, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+class QueryEmbeddingCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: float = 3600,
+        path: Path | None = None,
+        save_interval_seconds: float = 30,
+    ) -> None:
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._path = path
+        self._save_interval = save_interval_seconds
+        self._items: OrderedDict[tuple[str, str], tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.time()
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load()
+            atexit.register(self.save)
+
+    @staticmethod
+    def _key(model: str, text: str) -> tuple[str, str]:
+        return model, " ".join(text.lower().split())
+
+    def get(self, model: str, text: str) -> np.ndarray | None:
+        key = self._key(model, text)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.time() - item[0] > self._ttl:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, model: str, text: str, vector: np.ndarray) -> None:
+        if self._max_size <= 0:
+            return
+        with self._lock:
+            key = self._key(model, text)
+            self._items[key] = (time.time(), vector)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+            self._dirty = True
+        if self._path is not None and time.time() - self._last_save > self._save_interval:
+            self.save()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+    def load(self) -> None:
+        if self._path is None or not self._path.exists():
+            return
+        try:
+            with np.load(self._path) as data:
+                models = data["models"].tolist()
+                texts = data["texts"].tolist()
+                times = data["times"].tolist()
+                vectors = data["vectors"]
+        except Exception:
+            logger.warning("Failed to load query embedding cache, starting fresh")
+            return
+        now = time.time()
+        with self._lock:
+            for model, text, ts, vec in zip(models, texts, times, vectors):
+                if now - ts <= self._ttl:
+                    self._items[(model, text)] = (ts, vec)
+
+    def save(self) -> None:
+        if self._path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            items = list(self._items.items())
+            self._dirty = False
+            self._last_save = time.time()
+        if items:
+            dim = len(items[-1][1][1])
+            items = [item for item in items if len(item[1][1]) == dim]
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_suffix(".tmp.npz")
+            np.savez(
+                tmp_path,
+                models=np.array([key[0] for key, _ in items], dtype=str),
+                texts=np.array([key[1] for key, _ in items], dtype=str),
+                times=np.array([ts for _, (ts, _) in items], dtype=np.float64),
+                vectors=np.array([vec for _, (_, vec) in items], dtype=np.float32),
+            )
+            tmp_path.replace(self._path)
+        except OSError as e:
+            logger.warning("Failed to save query embedding cache: %s", e)
+
+
+def make_provider(config: Config) -> EmbeddingProvider | None:
+    semantic = config.search.semantic
+    if semantic.provider == "local":
+        if semantic.model == "hashing":
+            return HashingProvider(
+                dim=semantic.dim,
+                batch_size=semantic.batch_size,
+                workers=semantic.workers,
+            )
+        return SentenceTransformerProvider(
+            semantic.model,
+            batch_size=semantic.batch_size,
+            workers=semantic.workers,
+        )
+    if semantic.provider == "openai" and config.openai_api_key:
+        return OpenAIProvider(config.openai_api_key, semantic.model)
+    return None
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import base64
+import copy
+import heapq
+import json
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from server.kb import Entry, SearchResult
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class EntryFilter:
+    type: str | None = None
+    tags: tuple[str, ...] = ()
+    match_any: bool = False
+    created_from: str | None = None
+    created_to: str | None = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.type or self.tags or self.created_from or self.created_to)
+
+
+def encode_cursor(key: tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created, path = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    return str(created), str(path)
+
+
+def facet_counts(results: list[SearchResult]) -> dict[str, dict[str, int]]:
+    types = Counter(r.type for r in results)
+    tags = Counter(tag for r in results for tag in dict.fromkeys(map(str, r.tags)))
+    return {"type": dict(types.most_common()), "tags": dict(tags.most_common())}
+
+
+class FilterIndex:
+    def __init__(self) -> None:
+        self._by_type: dict[str, set[str]] = {}
+        self._by_tag: dict[str, set[str]] = {}
+        self._created: list[tuple[str, str]] = []
+        self._created_by_path: dict[str, str] = {}
+        self._shared = False
+
+    def fork(self) -> FilterIndex:
+        clone = copy.copy(self)
+        self._shared = clone._shared = True
+        return clone
+
+    def _own(self) -> None:
+        self._by_type = {k: set(v) for k, v in self._by_type.items()}
+        self._by_tag = {k: set(v) for k, v in self._by_tag.items()}
+        self._created = list(self._created)
+        self._created_by_path = dict(self._created_by_path)
+        self._shared = False
+
+    def index(self, entries: list[Entry]) -> None:
+        self._shared = False
+        self._by_type = {}
+        self._by_tag = {}
+        self._created_by_path = {}
+        for entry in entries:
+            self._add_sets(entry)
+            self._created_by_path[entry.path] = entry.created
+        self._created = sorted((c, p) for p, c in self._created_by_path.items())
+
+    def update(self, entries: list[Entry], removed: list[Entry]) -> None:
+        if self._shared:
+            self._own()
+        for entry in removed:
+            self._remove(entry)
+        for entry in entries:
+            self._add_sets(entry)
+            self._created_by_path[entry.path] = entry.created
+            insort(self._created, (entry.created, entry.path))
+
+    def _add_sets(self, entry: Entry) -> None:
+        self._by_type.setdefault(entry.type, set()).add(entry.path)
+        for tag in entry.tags:
+            self._by_tag.setdefault(str(tag), set()).add(entry.path)
+
+    def _remove(self, entry: Entry) -> None:
+        path = entry.path
+        _discard(self._by_type, entry.type, path)
+        for tag in entry.tags:
+            _discard(self._by_tag, str(tag), path)
+        created = self._created_by_path.pop(path, None)
+        if created is not None:
+            pos = bisect_left(self._created, (created, path))
+            del self._created[pos]
+
+    def type_counts(self) -> dict[str, int]:
+        return {k: len(v) for k, v in self._by_type.items()}
+
+    def tag_counts(self) -> dict[str, int]:
+        return {k: len(v) for k, v in self._by_tag.items()}
+
+    def _bounds(self, flt: EntryFilter) -> tuple[int, int]:
+        lo = bisect_left(self._created, (flt.created_from,)) if flt.created_from else 0
+        hi = (
+            bisect_right(self._created, (flt.created_to + "\uffff",))
+            if flt.created_to
+            else len(self._created)
+        )
+        return lo, hi
+
+    def _select(self, flt: EntryFilter) -> set[str] | None:
+        sets: list[set[str]] = []
+        if flt.type:
+            sets.append(self._by_type.get(flt.type, set()))
+        if flt.tags:
+            tag_sets = [self._by_tag.get(tag, set()) for tag in flt.tags]
+            if flt.match_any:
+                sets.append(set().union(*tag_sets))
+            else:
+                sets.extend(tag_sets)
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def paths(self, flt: EntryFilter) -> set[str] | None:
+        if not flt.active:
+            return None
+        selected = self._select(flt)
+        if not (flt.created_from or flt.created_to):
+            return selected
+        lo, hi = self._bounds(flt)
+        if selected is None:
+            return {path for _, path in self._created[lo:hi]}
+        return {p for p in selected if self._in_range(p, flt)}
+
+    def _in_range(self, path: str, flt: EntryFilter) -> bool:
+        created = self._created_by_path[path]
+        if flt.created_from and created < flt.created_from:
+            return False
+        return not flt.created_to or created < flt.created_to + "\uffff"
+
+    def page(
+        self,
+        flt: EntryFilter,
+        limit: int | None = None,
+        cursor: tuple[str, str] | None = None,
+    ) -> tuple[list[str], int, tuple[str, str] | None]:
+        lo, hi = self._bounds(flt)
+        selected = self._select(flt)
+        sparse = selected is not None and len(selected) < hi - lo
+        if selected is None:
+            total = max(hi - lo, 0)
+        elif sparse:
+            selected = {p for p in selected if self._in_range(p, flt)}
+            total = len(selected)
+        else:
+            total = sum(1 for _, p in self._created[lo:hi] if p in selected)
+        if cursor is not None:
+            hi = min(hi, bisect_left(self._created, cursor))
+        want = total if limit is None else limit + 1
+
+        if selected is None:
+            keys = self._created[max(lo, hi - want) : hi][::-1]
+        elif sparse:
+            keys = heapq.nlargest(
+                want,
+                (
+                    key
+                    for key in ((self._created_by_path[p], p) for p in selected)
+                    if cursor is None or key < cursor
+                ),
+            )
+        else:
+            keys = []
+            for i in range(hi - 1, lo - 1, -1):
+                key = self._created[i]
+                if key[1] in selected:
+                    keys.append(key)
+                    if len(keys) == want:
+                        break
+
+        next_cursor = None
+        if limit is not None and len(keys) > limit:
+            keys = keys[:limit]
+            next_cursor = keys[-1] if keys else None
+        return [path for _, path in keys], total, next_cursor
+
+
+def _discard(index: dict[str, set[str]], key: str, path: str) -> None:
+    paths = index.get(key)
+    if paths is None:
+        return
+    paths.discard(path)
+    if not paths:
+        del index[key]
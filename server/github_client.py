@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import base64
-import time
 from dataclasses import dataclass
 from pathlib import PurePosixPath
 
 import httpx
 
+from server.config import HttpConfig
+from server.git import blob_sha
+from server.http import async_client
+
 API_BASE = "https://api.github.com"
 
 IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg"}
@@ -17,6 +21,14 @@ class UploadResult:
     path: str
     branch: str
     sha: str
+    commit: str = ""
+
+
+@dataclass
+class CommitResult:
+    paths: list[str]
+    branch: str
+    sha: str
 
 
 class GitHubClientError(Exception):
@@ -24,23 +36,31 @@ class GitHubClientError(Exception):
 
 
 class GitHubClient:
-    def __init__(self, token: str, owner: str, repo: str) -> None:
+    def __init__(
+        self,
+        token: str,
+        owner: str,
+        repo: str,
+        http: HttpConfig | None = None,
+        base_url: str = API_BASE,
+    ) -> None:
         self._owner = owner
         self._repo = repo
-        self._http = httpx.Client(
+        self._base_url = base_url
+        self._http = async_client(
+            http,
             headers={
                 "Authorization": f"Bearer {token}",
                 "Accept": "application/vnd.github+json",
                 "X-GitHub-Api-Version": "2022-11-28",
             },
-            timeout=30,
         )
 
     @property
     def _repo_prefix(self) -> str:
-        return f"{API_BASE}/repos/{self._owner}/{self._repo}"
+        return f"{self._base_url}/repos/{self._owner}/{self._repo}"
 
-    def _request(
+    async def _request(
         self,
         method: str,
         url: str,
@@ -48,23 +68,23 @@ class GitHubClient:
         **kwargs,
     ) -> httpx.Response:
         for attempt in range(max_retries + 1):
-            resp = self._http.request(method, url, **kwargs)
+            resp = await self._http.request(method, url, **kwargs)
             if resp.status_code != 429:
                 return resp
             if attempt == max_retries:
                 return resp
             retry_after = int(resp.headers.get("Retry-After", "5"))
-            time.sleep(min(retry_after, 60))
+            await asyncio.sleep(min(retry_after, 60))
         return resp
 
-    def ensure_branch(self, branch: str, base: str = "main") -> str:
-        resp = self._request(
+    async def ensure_branch(self, branch: str, base: str = "main") -> str:
+        resp = await self._request(
             "GET", f"{self._repo_prefix}/git/ref/heads/{branch}"
         )
         if resp.status_code == 200:
             return resp.json()["object"]["sha"]
 
-        base_resp = self._request(
+        base_resp = await self._request(
             "GET", f"{self._repo_prefix}/git/ref/heads/{base}"
         )
         if base_resp.status_code != 200:
@@ -73,7 +93,7 @@ class GitHubClient:
             )
         base_sha = base_resp.json()["object"]["sha"]
 
-        create_resp = self._request(
+        create_resp = await self._request(
             "POST", f"{self._repo_prefix}/git/refs",
             json={"ref": f"refs/heads/{branch}", "sha": base_sha},
         )
@@ -84,20 +104,25 @@ class GitHubClient:
             )
         return base_sha
 
-    def upload_file(
+    async def upload_file(
         self,
         repo_path: str,
         content: bytes,
         branch: str,
         message: str = "",
+        existing_sha: str | None = None,
+        check_existing: bool = True,
     ) -> UploadResult:
         if not message:
             filename = PurePosixPath(repo_path).name
             message = f"upload {filename}"
 
-        encoded = base64.b64encode(content).decode()
+        if existing_sha is None and check_existing:
+            existing_sha = await self._get_file_sha(repo_path, branch)
+        if existing_sha == blob_sha(content):
+            return UploadResult(path=repo_path, branch=branch, sha=existing_sha)
 
-        existing_sha = self._get_file_sha(repo_path, branch)
+        encoded = base64.b64encode(content).decode()
 
         payload: dict = {
             "message": message,
@@ -107,7 +132,7 @@ class GitHubClient:
         if existing_sha:
             payload["sha"] = existing_sha
 
-        resp = self._request(
+        resp = await self._request(
             "PUT", f"{self._repo_prefix}/contents/{repo_path}",
             json=payload,
         )
@@ -122,26 +147,133 @@ class GitHubClient:
             path=repo_path,
             branch=branch,
             sha=data["content"]["sha"],
+            commit=data.get("commit", {}).get("sha", ""),
         )
 
-    def list_directory(self, dir_path: str, branch: str) -> list[str]:
-        resp = self._request(
+    async def upload_files(
+        self,
+        files: dict[str, bytes],
+        branch: str,
+        message: str = "",
+        concurrency: int = 8,
+        max_attempts: int = 3,
+        remote_shas: dict[str, str] | None = None,
+    ) -> CommitResult:
+        if not files:
+            raise GitHubClientError("No files to upload")
+        if len(files) == 1:
+            [(repo_path, content)] = files.items()
+            result = await self.upload_file(
+                repo_path,
+                content,
+                branch,
+                message,
+                existing_sha=remote_shas.get(repo_path) if remote_shas is not None else None,
+                check_existing=remote_shas is None,
+            )
+            return CommitResult(paths=[result.path], branch=branch, sha=result.commit)
+        if not message:
+            names = [PurePosixPath(path).name for path in files]
+            if len(names) > 3:
+                message = f"upload {len(names)} files"
+            else:
+                message = f"upload {', '.join(names)}"
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create_blob(content: bytes) -> str:
+            async with semaphore:
+                resp = await self._request(
+                    "POST", f"{self._repo_prefix}/git/blobs",
+                    json={"content": base64.b64encode(content).decode(), "encoding": "base64"},
+                )
+            if resp.status_code != 201:
+                raise GitHubClientError(
+                    f"Failed to create blob: {resp.status_code} {resp.text}"
+                )
+            return resp.json()["sha"]
+
+        shas = await asyncio.gather(*(create_blob(content) for content in files.values()))
+        tree = [
+            {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+            for path, sha in zip(files, shas)
+        ]
+
+        for attempt in range(max_attempts):
+            head = await self._get_ref(branch)
+            base_tree = await self._get_commit_tree(head)
+
+            tree_resp = await self._request(
+                "POST", f"{self._repo_prefix}/git/trees",
+                json={"base_tree": base_tree, "tree": tree},
+            )
+            if tree_resp.status_code != 201:
+                raise GitHubClientError(
+                    f"Failed to create tree: {tree_resp.status_code} {tree_resp.text}"
+                )
+
+            commit_resp = await self._request(
+                "POST", f"{self._repo_prefix}/git/commits",
+                json={
+                    "message": message,
+                    "tree": tree_resp.json()["sha"],
+                    "parents": [head],
+                },
+            )
+            if commit_resp.status_code != 201:
+                raise GitHubClientError(
+                    f"Failed to create commit: {commit_resp.status_code} {commit_resp.text}"
+                )
+            commit_sha = commit_resp.json()["sha"]
+
+            ref_resp = await self._request(
+                "PATCH", f"{self._repo_prefix}/git/refs/heads/{branch}",
+                json={"sha": commit_sha, "force": False},
+            )
+            if ref_resp.status_code == 200:
+                return CommitResult(paths=list(files), branch=branch, sha=commit_sha)
+            if ref_resp.status_code != 422 or attempt == max_attempts - 1:
+                raise GitHubClientError(
+                    f"Failed to update branch '{branch}': "
+                    f"{ref_resp.status_code} {ref_resp.text}"
+                )
+        raise GitHubClientError(f"Failed to update branch '{branch}'")
+
+    async def _get_ref(self, branch: str) -> str:
+        resp = await self._request("GET", f"{self._repo_prefix}/git/ref/heads/{branch}")
+        if resp.status_code != 200:
+            raise GitHubClientError(f"Branch '{branch}' not found: {resp.status_code}")
+        return resp.json()["object"]["sha"]
+
+    async def _get_commit_tree(self, commit_sha: str) -> str:
+        resp = await self._request("GET", f"{self._repo_prefix}/git/commits/{commit_sha}")
+        if resp.status_code != 200:
+            raise GitHubClientError(
+                f"Failed to read commit {commit_sha}: {resp.status_code}"
+            )
+        return resp.json()["tree"]["sha"]
+
+    async def list_directory(self, dir_path: str, branch: str) -> list[str]:
+        return list(await self.file_shas(dir_path, branch))
+
+    async def file_shas(self, dir_path: str, branch: str) -> dict[str, str]:
+        resp = await self._request(
             "GET", f"{self._repo_prefix}/contents/{dir_path}",
             params={"ref": branch},
         )
         if resp.status_code == 404:
-            return []
+            return {}
         if resp.status_code != 200:
             raise GitHubClientError(
                 f"Failed to list '{dir_path}': {resp.status_code}"
             )
         data = resp.json()
         if not isinstance(data, list):
-            return []
-        return [item["path"] for item in data if item["type"] == "file"]
+            return {}
+        return {item["path"]: item["sha"] for item in data if item["type"] == "file"}
 
-    def _get_file_sha(self, repo_path: str, branch: str) -> str | None:
-        resp = self._request(
+    async def _get_file_sha(self, repo_path: str, branch: str) -> str | None:
+        resp = await self._request(
             "GET", f"{self._repo_prefix}/contents/{repo_path}",
             params={"ref": branch},
         )
@@ -149,5 +281,5 @@ class GitHubClient:
             return resp.json().get("sha")
         return None
 
-    def close(self) -> None:
-        self._http.close()
+    async def close(self) -> None:
+        await self._http.aclose()
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from server.kb import Entry
+
+DIRECTIONS = ("out", "in", "both")
+
+
+@dataclass(slots=True)
+class GraphEdge:
+    source: str
+    target: str
+    label: str
+
+
+@dataclass(slots=True)
+class Subgraph:
+    root: str
+    depths: dict[str, int] = field(default_factory=dict)
+    edges: list[GraphEdge] = field(default_factory=list)
+    truncated: bool = False
+
+
+def _csr(
+    n_nodes: int, edges: list[tuple[int, int, int]], key: int, other: int
+) -> tuple[array, array, array]:
+    offsets = array("I", bytes(4 * (n_nodes + 1)))
+    for edge in edges:
+        offsets[edge[key] + 1] += 1
+    for i in range(n_nodes):
+        offsets[i + 1] += offsets[i]
+    cursor = array("I", offsets[:-1])
+    nodes = array("I", bytes(4 * len(edges)))
+    labels = array("I", bytes(4 * len(edges)))
+    for edge in edges:
+        pos = cursor[edge[key]]
+        nodes[pos] = edge[other]
+        labels[pos] = edge[2]
+        cursor[edge[key]] += 1
+    return offsets, nodes, labels
+
+
+class GraphIndex:
+    def __init__(self, entries: dict[str, Entry]) -> None:
+        self._ids: dict[str, int] = {}
+        self._paths: list[str] = []
+        self._label_ids: dict[str, int] = {}
+        self._labels: list[str] = []
+        for path in entries:
+            self._node(path)
+        edges = [
+            (self._ids[entry.path], self._node(edge.path), self._label(edge.label))
+            for entry in entries.values()
+            for edge in entry.edges
+        ]
+        n_nodes = len(self._paths)
+        self._out = _csr(n_nodes, edges, 0, 1)
+        self._in = _csr(n_nodes, edges, 1, 0)
+
+    def update(self, entries: dict[str, Entry], changed: list[str]) -> GraphIndex:
+        graph = object.__new__(GraphIndex)
+        graph._ids = dict(self._ids)
+        graph._paths = list(self._paths)
+        graph._label_ids = dict(self._label_ids)
+        graph._labels = list(self._labels)
+        changed_ids = {self._ids[path] for path in changed if path in self._ids}
+        offsets, targets, labels = self._out
+        edges = [
+            (source, targets[pos], labels[pos])
+            for source in range(len(self._paths))
+            if source not in changed_ids
+            for pos in range(offsets[source], offsets[source + 1])
+        ]
+        for path in changed:
+            entry = entries.get(path)
+            if entry is None:
+                continue
+            source = graph._node(path)
+            edges.extend(
+                (source, graph._node(edge.path), graph._label(edge.label))
+                for edge in entry.edges
+            )
+        linked = {edge[1] for edge in edges}
+        live = [
+            node for node, path in enumerate(graph._paths) if path in entries or node in linked
+        ]
+        if len(live) < len(graph._paths):
+            remap = {old: new for new, old in enumerate(live)}
+            graph._paths = [graph._paths[node] for node in live]
+            graph._ids = {path: node for node, path in enumerate(graph._paths)}
+            edges = [(remap[a], remap[b], label) for a, b, label in edges]
+        n_nodes = len(graph._paths)
+        graph._out = _csr(n_nodes, edges, 0, 1)
+        graph._in = _csr(n_nodes, edges, 1, 0)
+        return graph
+
+    def _node(self, path: str) -> int:
+        node = self._ids.get(path)
+        if node is None:
+            node = self._ids[path] = len(self._paths)
+            self._paths.append(path)
+        return node
+
+    def _label(self, label: str) -> int:
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self._labels)
+            self._labels.append(label)
+        return label_id
+
+    def pagerank(
+        self,
+        damping: float = 0.85,
+        tol: float = 1e-6,
+        max_iter: int = 100,
+        initial: dict[str, float] | None = None,
+    ) -> dict[str, float]:
+        n = len(self._paths)
+        if not n:
+            return {}
+        offsets, targets, _ = self._out
+        spans = [(offsets[i], offsets[i + 1]) for i in range(n)]
+        if initial:
+            rank = [initial.get(path, 1.0 / n) for path in self._paths]
+            total = sum(rank)
+            rank = [r / total for r in rank]
+        else:
+            rank = [1.0 / n] * n
+        for _ in range(max_iter):
+            dangling = 0.0
+            new = [0.0] * n
+            for r, (start, end) in zip(rank, spans):
+                if start == end:
+                    dangling += r
+                    continue
+                share = damping * r / (end - start)
+                for pos in range(start, end):
+                    new[targets[pos]] += share
+            base = (1 - damping + damping * dangling) / n
+            new = [base + r for r in new]
+            delta = sum(abs(a - b) for a, b in zip(new, rank))
+            rank = new
+            if delta < n * tol:
+                break
+        return dict(zip(self._paths, rank))
+
+    def neighbors(
+        self,
+        path: str,
+        depth: int = 1,
+        labels: list[str] | None = None,
+        direction: str = "both",
+        max_nodes: int = 100,
+    ) -> Subgraph | None:
+        root = self._ids.get(path)
+        if root is None:
+            return None
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+        allowed = (
+            {self._label_ids[label] for label in labels if label in self._label_ids}
+            if labels
+            else None
+        )
+        adjacency = []
+        if direction in ("out", "both"):
+            adjacency.append((self._out, False))
+        if direction in ("in", "both"):
+            adjacency.append((self._in, True))
+
+        depths = {root: 0}
+        seen_edges: set[tuple[int, int, int]] = set()
+        edges: list[GraphEdge] = []
+        truncated = False
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            hop = depths[node]
+            if hop >= depth:
+                continue
+            for (offsets, others, edge_labels), reverse in adjacency:
+                for pos in range(offsets[node], offsets[node + 1]):
+                    label = edge_labels[pos]
+                    if allowed is not None and label not in allowed:
+                        continue
+                    other = others[pos]
+                    if other not in depths:
+                        if len(depths) >= max_nodes:
+                            truncated = True
+                            continue
+                        depths[other] = hop + 1
+                        queue.append(other)
+                    key = (other, node, label) if reverse else (node, other, label)
+                    if key in seen_edges:
+                        continue
+                    seen_edges.add(key)
+                    edges.append(
+                        GraphEdge(
+                            source=self._paths[key[0]],
+                            target=self._paths[key[1]],
+                            label=self._labels[label],
+                        )
+                    )
+        return Subgraph(
+            root=path,
+            depths={self._paths[n]: d for n, d in depths.items()},
+            edges=edges,
+            truncated=truncated,
+        )
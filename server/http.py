@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+
+import httpx
+
+from server.config import HttpConfig
+
+logger = logging.getLogger("memex.http")
+
+_warned_http2 = False
+
+
+def _http2_available() -> bool:
+    global _warned_http2
+    if importlib.util.find_spec("h2") is not None:
+        return True
+    if not _warned_http2:
+        logger.warning(
+            "HTTP/2 requested but h2 is not installed, using HTTP/1.1. "
+            "Install with: uv pip install 'httpx[http2]'"
+        )
+        _warned_http2 = True
+    return False
+
+
+def async_client(
+    config: HttpConfig | None = None,
+    headers: dict[str, str] | None = None,
+    **kwargs,
+) -> httpx.AsyncClient:
+    config = config or HttpConfig()
+    return httpx.AsyncClient(
+        headers=headers,
+        http2=config.http2 and _http2_available(),
+        timeout=config.timeout,
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        **kwargs,
+    )
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import copy
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from server.config import HybridConfig
+from server.kb import Entry, SearchBackend, SearchResult
+
+logger = logging.getLogger("memex.search")
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memex-hybrid")
+
+
+class HybridBackend:
+    def __init__(
+        self,
+        lexical: SearchBackend,
+        semantic: SearchBackend | None,
+        config: HybridConfig,
+    ) -> None:
+        self._lexical = lexical
+        self._semantic = semantic
+        self._config = config
+        self._backlink_counts: dict[str, int] = {}
+        self._prior: dict[str, float] = {}
+        self.last_timings: dict[str, float] = {}
+
+    @property
+    def lexical(self) -> SearchBackend:
+        return self._lexical
+
+    @property
+    def semantic(self) -> SearchBackend | None:
+        return self._semantic
+
+    def fork(self) -> HybridBackend:
+        clone = copy.copy(self)
+        clone._lexical = self._lexical.fork()
+        clone._semantic = self._semantic.fork() if self._semantic else None
+        return clone
+
+    def set_backlink_counts(self, counts: dict[str, int]) -> None:
+        self._backlink_counts = counts
+        self._lexical.set_backlink_counts(counts)
+        if self._semantic:
+            self._semantic.set_backlink_counts(counts)
+
+    def set_rank_prior(self, prior: dict[str, float]) -> None:
+        self._prior = prior
+
+    def index(self, entries: list[Entry]) -> None:
+        self._lexical.index(entries)
+        if self._semantic:
+            try:
+                self._semantic.index(entries)
+            except Exception as e:
+                logger.warning("Semantic indexing failed: %s", e)
+
+    def update(self, entries: list[Entry], removed: list[str]) -> None:
+        self._lexical.update(entries, removed)
+        if self._semantic:
+            try:
+                self._semantic.update(entries, removed)
+            except Exception as e:
+                logger.warning("Semantic indexing failed: %s", e)
+
+    def _timed_semantic(
+        self, query: str, depth: int, allowed: set[str] | None
+    ) -> tuple[list[SearchResult], float]:
+        start = time.perf_counter()
+        try:
+            results = self._semantic.search(query, depth, allowed)
+        except Exception as e:
+            logger.warning("Semantic search failed: %s", e)
+            results = []
+        return results, time.perf_counter() - start
+
+    def search(
+        self, query: str, limit: int = 20, allowed: set[str] | None = None
+    ) -> list[SearchResult]:
+        start = time.perf_counter()
+        depth = max(limit, self._config.candidates)
+
+        future = None
+        if self._semantic:
+            future = _executor.submit(self._timed_semantic, query, depth, allowed)
+
+        lexical = self._lexical.search(query, depth, allowed)
+        lexical_time = time.perf_counter() - start
+
+        semantic: list[SearchResult] = []
+        semantic_time = 0.0
+        if future is not None:
+            semantic, semantic_time = future.result()
+
+        fuse_start = time.perf_counter()
+        results = self._fuse(lexical, semantic)[:limit]
+        end = time.perf_counter()
+
+        self.last_timings = {
+            "lexical_ms": lexical_time * 1000,
+            "semantic_ms": semantic_time * 1000,
+            "fusion_ms": (end - fuse_start) * 1000,
+            "total_ms": (end - start) * 1000,
+        }
+        logger.debug(
+            "hybrid search: lexical %.1fms semantic %.1fms fusion %.1fms total %.1fms",
+            *self.last_timings.values(),
+        )
+        return results
+
+    def _fuse(
+        self, lexical: list[SearchResult], semantic: list[SearchResult]
+    ) -> list[SearchResult]:
+        cfg = self._config
+        scores: dict[str, float] = {}
+        by_path: dict[str, SearchResult] = {}
+
+        for results, weight in ((lexical, cfg.lexical_weight), (semantic, cfg.semantic_weight)):
+            if not results:
+                continue
+            if cfg.fusion == "weighted":
+                top = max(r.score for r in results)
+                bottom = min(r.score for r in results)
+                span = top - bottom
+                for r in results:
+                    norm = (r.score - bottom) / span if span else 1.0
+                    scores[r.path] = scores.get(r.path, 0.0) + weight * norm
+                    by_path.setdefault(r.path, r)
+            else:
+                for rank, r in enumerate(results, start=1):
+                    scores[r.path] = scores.get(r.path, 0.0) + weight / (cfg.rrf_k + rank)
+                    by_path.setdefault(r.path, r)
+
+        if cfg.backlink_boost:
+            for path in scores:
+                count = self._backlink_counts.get(path, 0)
+                scores[path] *= 1 + cfg.backlink_boost * math.log1p(count)
+
+        if self._prior:
+            for path in scores:
+                scores[path] *= self._prior.get(path, 1.0)
+
+        fused = []
+        for path, score in sorted(scores.items(), key=lambda x: x[1], reverse=True):
+            r = by_path[path]
+            fused.append(
+                SearchResult(
+                    path=r.path,
+                    title=r.title,
+                    type=r.type,
+                    tags=r.tags,
+                    summary=r.summary,
+                    score=round(score, 4),
+                    backlink_count=self._backlink_counts.get(path, 0),
+                )
+            )
+        return fused
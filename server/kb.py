@@ -1,33 +1,111 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import logging
+import math
+import os
+import pickle
 import re
 import subprocess
+import sys
+import threading
 import time
-from collections import defaultdict
-from dataclasses import dataclass, field
+from array import array
+from collections import OrderedDict, defaultdict
+from dataclasses import astuple, dataclass, field
 from pathlib import Path
 from typing import Protocol
 
 import yaml
 from rank_bm25 import BM25Okapi
 
+from server.analysis import FIELDS, Analyzer, FieldTokens
 from server.config import Config
+from server.filters import (
+    EntryFilter,
+    FilterIndex,
+    decode_cursor,
+    encode_cursor,
+    facet_counts,
+)
+from server.git import run_git
+from server.graph import GraphIndex, Subgraph
 
+logger = logging.getLogger("memex")
 
-@dataclass
+_SNAPSHOT_VERSION = 9
+
+
+class _TextCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self._max_bytes = max_bytes
+        self._items: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def _evict(self) -> None:
+        while self._size > self._max_bytes and self._items:
+            _, (_, text) = self._items.popitem(last=False)
+            self._size -= len(text)
+
+    def put(self, file: str, content_hash: str, text: str) -> None:
+        if len(text) > self._max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(file, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._items[file] = (content_hash, text)
+            self._size += len(text)
+            self._evict()
+
+    def get(self, file: str, content_hash: str) -> str:
+        with self._lock:
+            item = self._items.get(file)
+            if item is not None and item[0] == content_hash:
+                self._items.move_to_end(file)
+                return item[1]
+        try:
+            text = Path(file).read_text(encoding="utf-8")
+        except OSError as e:
+            logger.warning("Failed to read %s: %s", file, e)
+            return ""
+        actual = _content_hash(text)
+        if content_hash and actual != content_hash:
+            logger.info("%s changed on disk since it was indexed, serving current text", file)
+        self.put(file, actual, text)
+        return text
+
+
+entry_text_cache = _TextCache()
+
+
+@dataclass(slots=True)
 class Edge:
     path: str
     label: str
     description: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Source:
     url: str
     title: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Entry:
     path: str
     slug: str
@@ -39,11 +117,21 @@ class Entry:
     updated: str
     edges: list[Edge]
     sources: list[Source]
-    body: str
-    raw: str
+    file: str = ""
+    content_hash: str = ""
 
+    @property
+    def raw(self) -> str:
+        return entry_text_cache.get(self.file, self.content_hash)
 
-@dataclass
+    @property
+    def body(self) -> str:
+        raw = self.raw
+        m = _FRONTMATTER_RE.match(raw)
+        return raw[m.end():] if m else raw
+
+
+@dataclass(slots=True)
 class Backlink:
     path: str
     title: str
@@ -51,7 +139,7 @@ class Backlink:
     description: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResult:
     path: str
     title: str
@@ -62,44 +150,127 @@ class SearchResult:
     backlink_count: int
 
 
+@dataclass(slots=True)
+class EntryPage:
+    entries: list[Entry]
+    total: int
+    next_cursor: str | None = None
+
+
+@dataclass(slots=True)
+class SearchPage:
+    results: list[SearchResult]
+    facets: dict[str, dict[str, int]]
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
 class SearchBackend(Protocol):
     def index(self, entries: list[Entry]) -> None: ...
-    def search(self, query: str, limit: int = 20) -> list[SearchResult]: ...
+    def update(self, entries: list[Entry], removed: list[str]) -> None: ...
+    def search(
+        self, query: str, limit: int = 20, allowed: set[str] | None = None
+    ) -> list[SearchResult]: ...
+    def set_backlink_counts(self, counts: dict[str, int]) -> None: ...
+    def set_rank_prior(self, prior: dict[str, float]) -> None: ...
+    def fork(self) -> SearchBackend: ...
 
 
 class BM25Backend:
-    def __init__(self) -> None:
+    def __init__(self, analyzer: Analyzer | None = None) -> None:
+        self._analyzer = analyzer or Analyzer()
         self._entries: list[Entry] = []
+        self._by_path: dict[str, Entry] = {}
+        self._tokens: dict[str, list[str]] = {}
         self._bm25: BM25Okapi | None = None
+        self._positions: dict[str, int] = {}
         self._backlink_counts: dict[str, int] = {}
+        self._prior: dict[str, float] = {}
+        self._weights: list[float] | None = None
 
     def set_backlink_counts(self, counts: dict[str, int]) -> None:
         self._backlink_counts = counts
 
+    def set_rank_prior(self, prior: dict[str, float]) -> None:
+        self._prior = prior
+        self._weights = None
+
+    def _prior_weights(self) -> list[float]:
+        if self._weights is None:
+            prior = self._prior
+            self._weights = [prior.get(e.path, 1.0) for e in self._entries]
+        return self._weights
+
+    def fork(self) -> BM25Backend:
+        clone = copy.copy(self)
+        clone._by_path = dict(self._by_path)
+        clone._tokens = dict(self._tokens)
+        return clone
+
     def index(self, entries: list[Entry]) -> None:
-        self._entries = entries
-        corpus = []
+        self._by_path = {e.path: e for e in entries}
+        self._tokens = {
+            path: self._analyzer.analyze(e).all() for path, e in self._by_path.items()
+        }
+        self._analyzer.retain(entries)
+        self._rebuild()
+
+    def update(self, entries: list[Entry], removed: list[str]) -> None:
+        for path in removed:
+            old = self._by_path.pop(path, None)
+            if old is not None:
+                self._analyzer.forget(old.content_hash)
+            self._tokens.pop(path, None)
         for e in entries:
-            text = f"{e.title} {e.summary} {' '.join(e.tags)} {e.body}"
-            corpus.append(text.lower().split())
+            old = self._by_path.get(e.path)
+            if old is not None and old.content_hash != e.content_hash:
+                self._analyzer.forget(old.content_hash)
+            self._by_path[e.path] = e
+            self._tokens[e.path] = self._analyzer.analyze(e).all()
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._entries = list(self._by_path.values())
+        self._positions = {e.path: i for i, e in enumerate(self._entries)}
+        self._weights = None
+        corpus = [self._tokens[e.path] for e in self._entries]
         if corpus:
             self._bm25 = BM25Okapi(corpus)
         else:
             self._bm25 = None
 
-    def search(self, query: str, limit: int = 20) -> list[SearchResult]:
+    def search(
+        self, query: str, limit: int = 20, allowed: set[str] | None = None
+    ) -> list[SearchResult]:
         if not self._bm25 or not self._entries:
             return []
-        tokens = query.lower().split()
-        scores = self._bm25.get_scores(tokens)
-        scored = sorted(
-            zip(self._entries, scores), key=lambda x: x[1], reverse=True
-        )
+        tokens = self._analyzer.terms(query)
+        if allowed is None:
+            scores = self._bm25.get_scores(tokens)
+            if self._prior:
+                scores = scores * self._prior_weights()
+            scored = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)
+        else:
+            ids = sorted(self._positions[p] for p in allowed if p in self._positions)
+            if not ids:
+                return []
+            scores = self._bm25.get_batch_scores(tokens, ids)
+            if self._prior:
+                weights = self._prior_weights()
+                scores = [score * weights[i] for i, score in zip(ids, scores)]
+            scored = sorted(zip(ids, scores), key=lambda x: x[1], reverse=True)
+        doc_freqs = self._bm25.doc_freqs
         results = []
-        for entry, score in scored[:limit]:
-            text = f"{entry.title} {entry.summary} {' '.join(entry.tags)} {entry.body}".lower()
-            if not any(t in text for t in tokens):
+        for i, score in scored[:limit]:
+            if not any(t in doc_freqs[i] for t in tokens):
                 continue
+            entry = self._entries[i]
             results.append(
                 SearchResult(
                     path=entry.path,
@@ -114,61 +285,272 @@ class BM25Backend:
         return results
 
 
-class SubstringBackend:
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+
+
+def _trigrams(term: str) -> set[str]:
+    return {term[i : i + 3] for i in range(len(term) - 2)}
+
+
+def _contains(tokens: array, phrase: array) -> bool:
+    first, size = phrase[0], len(phrase)
+    start = 0
+    while True:
+        try:
+            start = tokens.index(first, start)
+        except ValueError:
+            return False
+        if tokens[start : start + size] == phrase:
+            return True
+        start += 1
+
+
+_FIELD_BREAK = 0xFFFFFFFF
+
+
+class _TermIndex:
     def __init__(self) -> None:
-        self._entries: list[Entry] = []
+        self.doc_terms: dict[str, tuple[str, ...]] = {}
+        self.postings: dict[str, set[str]] = {}
+        self.grams: dict[str, set[str]] = {}
+
+    def copy(self) -> _TermIndex:
+        clone = _TermIndex()
+        clone.doc_terms = dict(self.doc_terms)
+        clone.postings = {term: set(paths) for term, paths in self.postings.items()}
+        clone.grams = {gram: set(terms) for gram, terms in self.grams.items()}
+        return clone
+
+    def add(self, path: str, terms: list[str]) -> None:
+        unique = tuple(dict.fromkeys(terms))
+        if not unique:
+            return
+        self.doc_terms[path] = unique
+        for term in unique:
+            paths = self.postings.get(term)
+            if paths is None:
+                paths = self.postings[term] = set()
+                for gram in _trigrams(term):
+                    self.grams.setdefault(gram, set()).add(term)
+            paths.add(path)
+
+    def remove(self, path: str) -> None:
+        for term in self.doc_terms.pop(path, ()):
+            paths = self.postings[term]
+            paths.discard(path)
+            if not paths:
+                del self.postings[term]
+                for gram in _trigrams(term):
+                    terms = self.grams[gram]
+                    terms.discard(term)
+                    if not terms:
+                        del self.grams[gram]
+
+    def vocabulary(self, term: str) -> list[str]:
+        grams = _trigrams(term)
+        if not grams:
+            return [t for t in self.postings if term in t]
+        candidates = sorted((self.grams.get(g, ()) for g in grams), key=len)
+        if not candidates[0]:
+            return []
+        terms = set(candidates[0]).intersection(*candidates[1:])
+        return [t for t in terms if term in t]
+
+    def matching(self, term: str) -> set[str]:
+        paths: set[str] = set()
+        for vocab_term in self.vocabulary(term):
+            paths |= self.postings[vocab_term]
+        return paths
+
+
+class SubstringBackend:
+    def __init__(self, analyzer: Analyzer | None = None) -> None:
+        self._analyzer = analyzer or Analyzer()
+        self._by_path: dict[str, Entry] = {}
+        self._order: dict[str, int] = {}
+        self._terms = _TermIndex()
+        self._raw = _TermIndex()
+        self._term_ids: dict[str, int] = {}
+        self._sequences: dict[str, array] = {}
+        self._next_order = 0
         self._backlink_counts: dict[str, int] = {}
+        self._prior: dict[str, float] = {}
+        self._shared = False
 
     def set_backlink_counts(self, counts: dict[str, int]) -> None:
         self._backlink_counts = counts
 
+    def set_rank_prior(self, prior: dict[str, float]) -> None:
+        self._prior = prior
+
+    def fork(self) -> SubstringBackend:
+        clone = copy.copy(self)
+        self._shared = clone._shared = True
+        return clone
+
+    def _own(self) -> None:
+        self._by_path = dict(self._by_path)
+        self._order = dict(self._order)
+        self._terms = self._terms.copy()
+        self._raw = self._raw.copy()
+        self._sequences = dict(self._sequences)
+        self._shared = False
+
     def index(self, entries: list[Entry]) -> None:
-        self._entries = entries
+        self._shared = False
+        self._by_path = {}
+        self._order = {}
+        self._terms = _TermIndex()
+        self._raw = _TermIndex()
+        self._term_ids = {}
+        self._sequences = {}
+        self._next_order = 0
+        self._add(entries)
+        self._analyzer.retain(entries)
+
+    def update(self, entries: list[Entry], removed: list[str]) -> None:
+        if self._shared:
+            self._own()
+        removed_set = set(removed)
+        for path in removed_set | {e.path for e in entries}:
+            old = self._by_path.get(path)
+            if old is None:
+                continue
+            self._terms.remove(path)
+            self._raw.remove(path)
+            del self._sequences[path]
+            if path in removed_set:
+                del self._by_path[path]
+                del self._order[path]
+            self._analyzer.forget(old.content_hash)
+        self._add(entries)
+
+    def _add(self, entries: list[Entry]) -> None:
+        analyzer = self._analyzer
+        for e in entries:
+            if e.path not in self._order:
+                self._order[e.path] = self._next_order
+                self._next_order += 1
+            self._by_path[e.path] = e
+            fields = analyzer.analyze(e)
+            self._terms.add(e.path, fields.all())
+            self._sequences[e.path] = self._sequence(fields)
+            raw = f"{e.title} {e.summary} {' '.join(map(str, e.tags))} {e.body}"
+            self._raw.add(e.path, analyzer.punctuated(raw))
+
+    def _sequence(self, fields: FieldTokens) -> array:
+        term_ids = self._term_ids
+        sequence = array("I")
+        for name in FIELDS:
+            for term in getattr(fields, name):
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(term_ids)
+                sequence.append(term_id)
+            sequence.append(_FIELD_BREAK)
+        return sequence
+
+    def _phrase(self, terms: list[str], allowed: set[str] | None = None) -> set[str]:
+        postings = [self._terms.postings.get(t, set()) for t in terms]
+        if allowed is not None:
+            postings.append(allowed)
+        postings.sort(key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = postings[0].intersection(*postings[1:])
+        if len(terms) == 1:
+            return candidates
+        needle = array("I", (self._term_ids[t] for t in terms))
+        return {path for path in candidates if _contains(self._sequences[path], needle)}
 
-    def search(self, query: str, limit: int = 20) -> list[SearchResult]:
-        terms = query.lower().split()
+    def _punctuated(self, text: str, candidates: set[str] | None) -> set[str]:
+        analyzer = self._analyzer
+        for word in analyzer.fold(text).split():
+            if not analyzer.lossy(word):
+                continue
+            paths = self._raw.matching(word)
+            candidates = paths if candidates is None else candidates & paths
+        return candidates if candidates is not None else set()
+
+    def search(
+        self, query: str, limit: int = 20, allowed: set[str] | None = None
+    ) -> list[SearchResult]:
+        scores: dict[str, int] = defaultdict(int)
+        matches: list[set[str]] = []
+        analyzer = self._analyzer
+        for phrase in _PHRASE_RE.findall(query):
+            terms = analyzer.terms(phrase)
+            if analyzer.lossy(phrase):
+                candidates = self._phrase(terms, allowed) if terms else allowed
+                matches.append(self._punctuated(phrase, candidates))
+            elif terms:
+                matches.append(self._phrase(terms, allowed))
+        for word in _PHRASE_RE.sub(" ", query).split():
+            if analyzer.lossy(word):
+                matches.append(self._punctuated(word, allowed))
+                continue
+            for term in analyzer.terms(word):
+                paths = self._terms.matching(term)
+                matches.append(paths if allowed is None else paths & allowed)
+        for paths in matches:
+            for path in paths:
+                scores[path] += 1
+        if self._prior:
+            prior = self._prior
+            scores = {path: score * prior.get(path, 1.0) for path, score in scores.items()}
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], self._order[x[0]]))
         results = []
-        for entry in self._entries:
-            text = f"{entry.title} {entry.summary} {' '.join(entry.tags)} {entry.body}".lower()
-            score = sum(1 for t in terms if t in text)
-            if score > 0:
-                results.append(
-                    SearchResult(
-                        path=entry.path,
-                        title=entry.title,
-                        type=entry.type,
-                        tags=entry.tags,
-                        summary=entry.summary,
-                        score=float(score),
-                        backlink_count=self._backlink_counts.get(entry.path, 0),
-                    )
+        for path, score in ranked[:limit]:
+            entry = self._by_path[path]
+            results.append(
+                SearchResult(
+                    path=entry.path,
+                    title=entry.title,
+                    type=entry.type,
+                    tags=entry.tags,
+                    summary=entry.summary,
+                    score=round(float(score), 4),
+                    backlink_count=self._backlink_counts.get(entry.path, 0),
                 )
-        results.sort(key=lambda r: r.score, reverse=True)
-        return results[:limit]
+            )
+        return results
 
 
 _FRONTMATTER_RE = re.compile(r"^---\s*\n(.*?)\n---\s*\n", re.DOTALL)
 
 
-def parse_entry(path: Path, repo_root: Path) -> Entry | None:
+def entry_path(path: Path, repo_root: Path) -> str:
+    return "/" + str(path.relative_to(repo_root))
+
+
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_PARALLEL_PARSE_MIN = 256
+
+
+class EntryParseError(ValueError):
+    pass
+
+
+def load_entry(path: Path, repo_root: Path, cache: bool = True) -> Entry:
     try:
         raw = path.read_text(encoding="utf-8")
-    except Exception:
-        return None
+    except Exception as e:
+        raise EntryParseError(f"unreadable: {e}")
 
     m = _FRONTMATTER_RE.match(raw)
     if not m:
-        return None
+        raise EntryParseError("missing frontmatter")
 
     try:
-        fm = yaml.safe_load(m.group(1)) or {}
-    except yaml.YAMLError:
-        return None
+        fm = yaml.load(m.group(1), Loader=_YAML_LOADER) or {}
+    except yaml.YAMLError as e:
+        raise EntryParseError("invalid YAML: " + " ".join(str(e).split()))
 
     if not isinstance(fm, dict) or "title" not in fm:
-        return None
+        raise EntryParseError("frontmatter has no title")
 
-    rel_path = "/" + str(path.relative_to(repo_root))
+    rel_path = sys.intern(entry_path(path, repo_root))
     slug = path.stem
 
     edges_raw = fm.get("edges", []) or []
@@ -176,8 +558,8 @@ def parse_entry(path: Path, repo_root: Path) -> Entry | None:
     for e in edges_raw:
         if isinstance(e, dict) and "path" in e and "label" in e:
             edges.append(Edge(
-                path=e["path"],
-                label=e["label"],
+                path=_intern(e["path"]),
+                label=_intern(e["label"]),
                 description=e.get("description", ""),
             ))
 
@@ -187,91 +569,599 @@ def parse_entry(path: Path, repo_root: Path) -> Entry | None:
         if isinstance(s, dict) and "url" in s:
             sources.append(Source(url=s["url"], title=s.get("title", "")))
 
-    body = raw[m.end():]
+    tags = fm.get("tags", []) or []
+    if isinstance(tags, list):
+        tags = [_intern(t) for t in tags]
+
+    content_hash = _content_hash(raw)
+    if cache:
+        entry_text_cache.put(str(path), content_hash, raw)
 
     return Entry(
         path=rel_path,
         slug=slug,
         title=fm.get("title", ""),
-        type=fm.get("type", "note"),
+        type=_intern(fm.get("type", "note")),
         summary=fm.get("summary", ""),
-        tags=fm.get("tags", []) or [],
-        created=str(fm.get("created", "")),
-        updated=str(fm.get("updated", "")),
+        tags=tags,
+        created=_intern(str(fm.get("created", ""))),
+        updated=_intern(str(fm.get("updated", ""))),
         edges=edges,
         sources=sources,
-        body=body,
-        raw=raw,
+        file=str(path),
+        content_hash=content_hash,
     )
 
 
+def parse_entry(path: Path, repo_root: Path) -> Entry | None:
+    try:
+        return load_entry(path, repo_root)
+    except EntryParseError:
+        return None
+
+
+def _parse_chunk(
+    paths: list[Path], repo_root: Path, cache: bool = True
+) -> list[tuple[Entry | None, str | None]]:
+    results: list[tuple[Entry | None, str | None]] = []
+    for path in paths:
+        try:
+            results.append((load_entry(path, repo_root, cache), None))
+        except EntryParseError as e:
+            results.append((None, str(e)))
+    return results
+
+
+def parse_entries(
+    paths: list[Path], repo_root: Path, workers: int = 0
+) -> tuple[list[Entry | None], dict[Path, str]]:
+    workers = workers or getattr(os, "process_cpu_count", os.cpu_count)() or 1
+    if workers <= 1 or len(paths) < _PARALLEL_PARSE_MIN:
+        results = _parse_chunk(paths, repo_root)
+    else:
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            results = _parse_parallel(paths, repo_root, workers)
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning("Parse worker pool failed, parsing serially: %s", e)
+            results = _parse_chunk(paths, repo_root)
+    entries = [entry for entry, _ in results]
+    errors = {path: error for path, (_, error) in zip(paths, results) if error}
+    return entries, errors
+
+
+def _parse_parallel(
+    paths: list[Path], repo_root: Path, workers: int
+) -> list[tuple[Entry | None, str | None]]:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    chunk_size = max(32, math.ceil(len(paths) / (workers * 4)))
+    chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context(method),
+    ) as pool:
+        return [
+            result
+            for chunk in pool.map(
+                _parse_chunk, chunks, [repo_root] * len(chunks), [False] * len(chunks)
+            )
+            for result in chunk
+        ]
+
+
+def _make_lexical_backend(name: str, config: Config) -> SearchBackend:
+    analyzer = Analyzer(config.search.analyzer)
+    if name == "substring":
+        return SubstringBackend(analyzer)
+    if name == "bm25-inverted":
+        from server.bm25 import InvertedBM25Backend
+        return InvertedBM25Backend(analyzer=analyzer)
+    if name == "bm25f":
+        from server.bm25 import InvertedBM25Backend
+        bm25f = config.search.bm25f
+        return InvertedBM25Backend(
+            k1=bm25f.k1,
+            analyzer=analyzer,
+            field_weights=bm25f.weights,
+            field_b=bm25f.b,
+        )
+    return BM25Backend(analyzer)
+
+
+def state_dir(config: Config) -> Path:
+    path = config.repo_root / ".memex"
+    ignore = path / ".gitignore"
+    if not ignore.exists():
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            ignore.write_text("*\n")
+        except OSError as e:
+            logger.warning("Failed to create %s: %s", ignore, e)
+    return path
+
+
+def _make_semantic_backend(config: Config):
+    try:
+        from server.embedding_pipeline import EmbeddingPipeline
+        from server.embeddings import QueryEmbeddingCache, make_provider
+        from server.semantic import SemanticBackend
+        provider = make_provider(config)
+        if not provider:
+            return None
+        semantic = config.search.semantic
+        memex_dir = state_dir(config)
+        query_cache = QueryEmbeddingCache(
+            max_size=semantic.query_cache_size,
+            ttl_seconds=semantic.query_cache_ttl_seconds,
+            path=memex_dir / "query_cache.npz" if semantic.query_cache_persist else None,
+        )
+        return SemanticBackend(
+            provider,
+            cache_path=memex_dir / "embeddings.npy",
+            cache_dtype=semantic.cache_dtype,
+            index=semantic.index,
+            nprobe=semantic.nprobe,
+            ef_search=semantic.ef_search,
+            query_cache=query_cache,
+            pipeline=EmbeddingPipeline(
+                provider,
+                concurrency=semantic.concurrency,
+                max_batch_tokens=semantic.max_batch_tokens,
+                max_batch_items=semantic.batch_size,
+                max_retries=semantic.max_retries,
+            ),
+        )
+    except Exception:
+        return None
+
+
+def _stat_key(path: Path) -> tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _file_hash(path: Path, entry: Entry | None) -> str:
+    if entry is not None:
+        return entry.content_hash
+    try:
+        return _content_hash(path.read_text(encoding="utf-8"))
+    except Exception:
+        return ""
+
+
+@dataclass
+class _Snapshot:
+    entries: dict[str, Entry] = field(default_factory=dict)
+    backlinks: dict[str, list[Backlink]] = field(default_factory=dict)
+    backlink_counts: dict[str, int] = field(default_factory=dict)
+    file_stats: dict[str, tuple[int, int]] = field(default_factory=dict)
+    file_hashes: dict[str, str] = field(default_factory=dict)
+    parse_errors: dict[str, str] = field(default_factory=dict)
+    filters: FilterIndex = field(default_factory=FilterIndex)
+    search_backend: SearchBackend | None = None
+    semantic_backend: SearchBackend | None = None
+    graph: GraphIndex | None = None
+    ranks: dict[str, float] = field(default_factory=dict)
+    ranked: list[str] = field(default_factory=list)
+    prior: dict[str, float] = field(default_factory=dict)
+
+    def fork(self) -> _Snapshot:
+        snapshot = _Snapshot(
+            entries=dict(self.entries),
+            backlinks=dict(self.backlinks),
+            backlink_counts=dict(self.backlink_counts),
+            file_stats=dict(self.file_stats),
+            file_hashes=dict(self.file_hashes),
+            parse_errors=dict(self.parse_errors),
+            filters=self.filters.fork(),
+            search_backend=self.search_backend.fork() if self.search_backend else None,
+            semantic_backend=self.semantic_backend.fork() if self.semantic_backend else None,
+            graph=self.graph,
+            ranks=self.ranks,
+            ranked=self.ranked,
+            prior=self.prior,
+        )
+        snapshot.share_backlink_counts()
+        snapshot.share_rank_prior()
+        return snapshot
+
+    @property
+    def lexical_backend(self) -> SearchBackend | None:
+        return getattr(self.search_backend, "lexical", self.search_backend)
+
+    @property
+    def embedding_backend(self) -> SearchBackend | None:
+        return self.semantic_backend or getattr(self.search_backend, "semantic", None)
+
+    def share_backlink_counts(self) -> None:
+        if self.search_backend:
+            self.search_backend.set_backlink_counts(self.backlink_counts)
+        if self.semantic_backend:
+            self.semantic_backend.set_backlink_counts(self.backlink_counts)
+
+    def share_rank_prior(self) -> None:
+        if self.search_backend:
+            self.search_backend.set_rank_prior(self.prior)
+        if self.semantic_backend:
+            self.semantic_backend.set_rank_prior(self.prior)
+
+
 class KnowledgeBase:
-    def __init__(self, config: Config) -> None:
+    def __init__(self, config: Config, background: bool = False) -> None:
         self._config = config
-        self._entries: dict[str, Entry] = {}
-        self._backlinks: dict[str, list[Backlink]] = defaultdict(list)
-        self._backlink_counts: dict[str, int] = {}
-        self._search_backend: BM25Backend | SubstringBackend
-        self._semantic_backend = None
+        entry_text_cache.resize(config.knowledge.body_cache_mb * 1024 * 1024)
+        self._background = background
+        self._snapshot = _Snapshot()
+        self._ready = threading.Event()
+        self._write_lock = threading.RLock()
+        self._pull_lock = threading.Lock()
         self._last_pull: float = 0
 
-        if config.search.backend == "substring":
-            self._search_backend = SubstringBackend()
+        if not background:
+            self.refresh()
+
+    @property
+    def knowledge_dir(self) -> Path:
+        return self._config.repo_root / self._config.knowledge.root_dir
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def snapshot_path(self) -> Path:
+        return state_dir(self._config) / "snapshot.pkl"
+
+    def _tracked_by_git(self, path: Path) -> bool:
+        try:
+            result = subprocess.run(
+                ["git", "ls-files", "--error-unmatch", "--", str(path)],
+                cwd=self._config.repo_root,
+                capture_output=True,
+                timeout=10,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return result.returncode == 0
+
+    def _lexical_name(self) -> str:
+        search = self._config.search
+        return search.hybrid.lexical if search.backend == "hybrid" else search.backend
+
+    def _make_backends(
+        self, lexical: SearchBackend | None = None
+    ) -> tuple[SearchBackend, SearchBackend | None]:
+        config = self._config
+        backend = config.search.backend
+        lexical = lexical or _make_lexical_backend(self._lexical_name(), config)
+        if backend == "hybrid":
+            from server.hybrid import HybridBackend
+            return HybridBackend(
+                lexical,
+                _make_semantic_backend(config),
+                config.search.hybrid,
+            ), None
+        semantic = _make_semantic_backend(config) if backend == "semantic" else None
+        return lexical, semantic
+
+    def refresh(self) -> None:
+        with self._write_lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        base = self._snapshot
+        if base.search_backend is None and self._restore():
+            return
+        if base.search_backend is None:
+            search_backend, semantic_backend = self._make_backends()
         else:
-            self._search_backend = BM25Backend()
+            search_backend = base.search_backend.fork()
+            semantic_backend = base.semantic_backend.fork() if base.semantic_backend else None
+        snapshot = _Snapshot(search_backend=search_backend, semantic_backend=semantic_backend)
+
+        kb_dir = self.knowledge_dir
+        if kb_dir.exists():
+            parsed = self._parse_files(snapshot, list(kb_dir.glob("*.md")))
+            for entry in parsed.values():
+                if entry:
+                    snapshot.entries[entry.path] = entry
+
+        snapshot.backlinks = self._build_backlinks(snapshot.entries)
+        snapshot.backlink_counts = {
+            path: len(bls) for path, bls in snapshot.backlinks.items()
+        }
+        snapshot.share_backlink_counts()
+        self._rank(snapshot, base.ranks)
 
-        if config.search.backend == "semantic" and config.openai_api_key:
+        all_entries = list(snapshot.entries.values())
+        snapshot.filters.index(all_entries)
+        search_backend.index(all_entries)
+        if semantic_backend:
             try:
-                from server.semantic import SemanticBackend
-                cache_path = config.repo_root / ".memex" / "embeddings.json"
-                self._semantic_backend = SemanticBackend(
-                    api_key=config.openai_api_key,
-                    model=config.search.semantic.model,
-                    cache_path=cache_path,
-                )
+                semantic_backend.index(all_entries)
             except Exception:
                 pass
 
-        self.refresh()
-
-    @property
-    def knowledge_dir(self) -> Path:
-        return self._config.repo_root / self._config.knowledge.root_dir
+        self._snapshot = snapshot
+        self._ready.set()
+        self._persist(snapshot)
 
-    def refresh(self) -> None:
-        self._entries.clear()
-        self._backlinks.clear()
+    def _restore(self) -> bool:
+        snapshot = self._load_snapshot()
+        if snapshot is None:
+            return False
 
+        repo_root = self._config.repo_root
         kb_dir = self.knowledge_dir
-        if not kb_dir.exists():
+        seen: set[str] = set()
+        changed: list[Path] = []
+        dirty = False
+        if kb_dir.exists():
+            for md_path in kb_dir.glob("*.md"):
+                rel = entry_path(md_path, repo_root)
+                seen.add(rel)
+                stat = _stat_key(md_path)
+                if snapshot.file_stats.get(rel) == stat:
+                    continue
+                if snapshot.file_hashes.get(rel) == _file_hash(md_path, None):
+                    snapshot.file_stats[rel] = stat
+                    dirty = True
+                else:
+                    changed.append(md_path)
+        for rel in snapshot.file_stats.keys() - seen:
+            changed.append(repo_root / rel.lstrip("/"))
+
+        if changed:
+            self._update_paths(snapshot, changed)
+        if snapshot.embedding_backend:
+            try:
+                snapshot.embedding_backend.index(list(snapshot.entries.values()))
+            except Exception:
+                pass
+
+        self._snapshot = snapshot
+        self._ready.set()
+        if changed or dirty:
+            self._persist(snapshot)
+        return True
+
+    def _snapshot_key(self) -> tuple:
+        return (
+            _SNAPSHOT_VERSION,
+            self._lexical_name(),
+            Analyzer(self._config.search.analyzer).signature,
+            astuple(self._config.search.bm25f),
+            str(self.knowledge_dir),
+        )
+
+    def _load_snapshot(self) -> _Snapshot | None:
+        if not self._config.knowledge.snapshot or not self.snapshot_path.exists():
+            return None
+        if self._tracked_by_git(self.snapshot_path):
+            logger.warning(
+                "Refusing to load index snapshot tracked by git: %s", self.snapshot_path
+            )
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                if pickle.load(f) != self._snapshot_key():
+                    return None
+                data = pickle.load(f)
+        except Exception as e:
+            logger.warning("Failed to load index snapshot, rebuilding: %s", e)
+            return None
+        search_backend, semantic_backend = self._make_backends(data["lexical"])
+        snapshot = _Snapshot(
+            entries=data["entries"],
+            backlinks=data["backlinks"],
+            backlink_counts=data["backlink_counts"],
+            file_stats=data["file_stats"],
+            file_hashes=data["file_hashes"],
+            parse_errors=data["parse_errors"],
+            search_backend=search_backend,
+            semantic_backend=semantic_backend,
+        )
+        snapshot.filters.index(list(snapshot.entries.values()))
+        snapshot.share_backlink_counts()
+        self._set_ranks(snapshot, data["ranks"])
+        return snapshot
+
+    def _persist(self, snapshot: _Snapshot) -> None:
+        if not self._config.knowledge.snapshot:
             return
+        data = {
+            "entries": snapshot.entries,
+            "backlinks": snapshot.backlinks,
+            "backlink_counts": snapshot.backlink_counts,
+            "file_stats": snapshot.file_stats,
+            "file_hashes": snapshot.file_hashes,
+            "parse_errors": snapshot.parse_errors,
+            "ranks": snapshot.ranks,
+            "lexical": snapshot.lexical_backend,
+        }
+        path = self.snapshot_path
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(self._snapshot_key(), f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning("Failed to save index snapshot: %s", e)
+
+    def changed_paths(self) -> list[Path]:
+        file_stats = self._snapshot.file_stats
+        kb_dir = self.knowledge_dir
+        repo_root = self._config.repo_root
+        seen: set[str] = set()
+        changed: list[Path] = []
+        if kb_dir.exists():
+            for md_path in kb_dir.glob("*.md"):
+                rel = entry_path(md_path, repo_root)
+                seen.add(rel)
+                if file_stats.get(rel) != _stat_key(md_path):
+                    changed.append(md_path)
+        for rel in file_stats.keys() - seen:
+            changed.append(repo_root / rel.lstrip("/"))
+        return changed
+
+    def refresh_changed(self) -> None:
+        self.refresh_paths(self.changed_paths())
 
-        for md_path in kb_dir.glob("*.md"):
-            entry = parse_entry(md_path, self._config.repo_root)
+    def refresh_paths(self, paths: list[Path]) -> None:
+        with self._write_lock:
+            if self._snapshot.search_backend is None:
+                self._refresh()
+                return
+            snapshot = self._snapshot.fork()
+            changed = self._update_paths(snapshot, paths)
+            self._snapshot = snapshot
+            if changed:
+                self._persist(snapshot)
+
+    def _update_paths(self, snapshot: _Snapshot, paths: list[Path]) -> bool:
+        repo_root = self._config.repo_root
+        upserted: dict[str, Entry] = {}
+        removed: set[str] = set()
+
+        paths = [
+            md_path for md_path in dict.fromkeys(paths)
+            if md_path.parent == self.knowledge_dir and md_path.suffix == ".md"
+        ]
+        parsed = self._parse_files(snapshot, [p for p in paths if p.exists()])
+
+        for md_path in paths:
+            rel = entry_path(md_path, repo_root)
+            if rel in parsed:
+                entry = parsed[rel]
+            else:
+                entry = None
+                snapshot.file_stats.pop(rel, None)
+                snapshot.file_hashes.pop(rel, None)
+                snapshot.parse_errors.pop(rel, None)
             if entry:
-                self._entries[entry.path] = entry
+                upserted[rel] = entry
+                removed.discard(rel)
+            elif rel in snapshot.entries:
+                removed.add(rel)
 
-        self._build_backlinks()
+        if upserted or removed:
+            self._apply_changes(snapshot, list(upserted.values()), sorted(removed))
+            return True
+        return False
 
-        self._backlink_counts = {
-            path: len(bls) for path, bls in self._backlinks.items()
-        }
-        all_entries = list(self._entries.values())
-        self._search_backend.set_backlink_counts(self._backlink_counts)
-        self._search_backend.index(all_entries)
+    def _parse_files(
+        self, snapshot: _Snapshot, paths: list[Path]
+    ) -> dict[str, Entry | None]:
+        repo_root = self._config.repo_root
+        entries, errors = parse_entries(
+            paths, repo_root, workers=self._config.knowledge.parse_workers
+        )
+        parsed: dict[str, Entry | None] = {}
+        for md_path, entry in zip(paths, entries):
+            rel = entry_path(md_path, repo_root)
+            snapshot.file_stats[rel] = _stat_key(md_path)
+            snapshot.file_hashes[rel] = _file_hash(md_path, entry)
+            error = errors.get(md_path)
+            if error:
+                snapshot.parse_errors[rel] = error
+                logger.warning("Skipping %s: %s", rel, error)
+            else:
+                snapshot.parse_errors.pop(rel, None)
+            parsed[rel] = entry
+        return parsed
+
+    def _apply_changes(
+        self, snapshot: _Snapshot, upserted: list[Entry], removed: list[str]
+    ) -> None:
+        entries = snapshot.entries
+        backlinks = snapshot.backlinks
+        touched: set[str] = set()
+        replaced: list[Entry] = []
+
+        for path in [e.path for e in upserted] + removed:
+            old = entries.pop(path, None)
+            if old is None:
+                continue
+            replaced.append(old)
+            for edge in old.edges:
+                touched.add(edge.path)
+                backlinks[edge.path] = [
+                    bl for bl in backlinks.get(edge.path, []) if bl.path != path
+                ]
 
-        if self._semantic_backend:
-            self._semantic_backend.set_backlink_counts(self._backlink_counts)
+        for entry in upserted:
+            entries[entry.path] = entry
+            for edge in entry.edges:
+                touched.add(edge.path)
+                backlinks[edge.path] = backlinks.get(edge.path, []) + [
+                    Backlink(
+                        path=entry.path,
+                        title=entry.title,
+                        label=edge.label,
+                        description=edge.description,
+                    )
+                ]
+
+        for target in touched:
+            bls = backlinks.get(target)
+            if bls:
+                snapshot.backlink_counts[target] = len(bls)
+            else:
+                backlinks.pop(target, None)
+                snapshot.backlink_counts.pop(target, None)
+
+        snapshot.filters.update(upserted, replaced)
+        old_edges = {e.path: [(edge.path, edge.label) for edge in e.edges] for e in replaced}
+        if any(path in old_edges for path in removed) or any(
+            old_edges.get(e.path) != [(edge.path, edge.label) for edge in e.edges]
+            for e in upserted
+        ):
+            self._rank(snapshot, snapshot.ranks, [e.path for e in upserted] + removed)
+        snapshot.search_backend.update(upserted, removed)
+
+        if snapshot.semantic_backend:
             try:
-                self._semantic_backend.index(all_entries)
+                snapshot.semantic_backend.update(upserted, removed)
             except Exception:
                 pass
 
-    def _build_backlinks(self) -> None:
-        self._backlinks.clear()
-        for entry in self._entries.values():
+    def _rank(
+        self,
+        snapshot: _Snapshot,
+        initial: dict[str, float] | None = None,
+        changed: list[str] | None = None,
+    ) -> None:
+        if snapshot.graph is None or changed is None:
+            snapshot.graph = GraphIndex(snapshot.entries)
+        else:
+            snapshot.graph = snapshot.graph.update(snapshot.entries, changed)
+        ranks = snapshot.graph.pagerank(initial=initial)
+        self._set_ranks(snapshot, {path: ranks[path] for path in snapshot.entries})
+
+    def _set_ranks(self, snapshot: _Snapshot, ranks: dict[str, float]) -> None:
+        snapshot.ranks = ranks
+        snapshot.ranked = sorted(ranks, key=lambda path: (-ranks[path], path))
+        weight = self._config.search.pagerank_weight
+        n_entries = len(ranks)
+        snapshot.prior = (
+            {path: 1 + weight * math.log1p(n_entries * r) for path, r in ranks.items()}
+            if weight
+            else {}
+        )
+        snapshot.share_rank_prior()
+
+    @staticmethod
+    def _build_backlinks(entries: dict[str, Entry]) -> dict[str, list[Backlink]]:
+        backlinks: dict[str, list[Backlink]] = defaultdict(list)
+        for entry in entries.values():
             for edge in entry.edges:
-                self._backlinks[edge.path].append(
+                backlinks[edge.path].append(
                     Backlink(
                         path=entry.path,
                         title=entry.title,
@@ -279,79 +1169,173 @@ class KnowledgeBase:
                         description=edge.description,
                     )
                 )
+        return dict(backlinks)
 
     def try_pull(self) -> None:
-        if not self._config.sync.auto_pull:
+        if not self._config.sync.auto_pull or self._background:
             return
-        now = time.time()
-        if now - self._last_pull < self._config.sync.pull_interval_seconds:
+        interval = self._config.sync.pull_interval_seconds
+        if time.time() - self._last_pull < interval:
+            return
+        if not self._pull_lock.acquire(blocking=False):
             return
-        self._last_pull = now
         try:
-            result = subprocess.run(
-                ["git", "pull", "--ff-only"],
-                cwd=self._config.repo_root,
-                capture_output=True,
-                text=True,
-                timeout=30,
+            if time.time() - self._last_pull < interval:
+                return
+            self._last_pull = time.time()
+            asyncio.run(self._pull())
+        finally:
+            self._pull_lock.release()
+
+    async def pull_async(self) -> None:
+        if not self._pull_lock.acquire(blocking=False):
+            return
+        try:
+            await self._pull()
+        finally:
+            self._pull_lock.release()
+
+    async def _pull(self) -> None:
+        try:
+            before = await self._git_head()
+            result = await run_git("pull", "--ff-only", cwd=self._config.repo_root, timeout=30)
+            if result.returncode != 0 or "Already up to date" in result.stdout:
+                return
+            if not self._config.sync.incremental:
+                await asyncio.to_thread(self.refresh)
+                return
+            after = await self._git_head()
+            changed = (
+                await self._git_changed_paths(before, after) if before and after else None
             )
-            if result.returncode == 0 and "Already up to date" not in result.stdout:
-                self.refresh()
+            if changed is None:
+                await asyncio.to_thread(self.refresh_changed)
+            else:
+                await asyncio.to_thread(self.refresh_paths, changed)
         except Exception:
             pass
 
+    async def _git_head(self) -> str | None:
+        result = await run_git("rev-parse", "HEAD", cwd=self._config.repo_root, timeout=10)
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    async def _git_changed_paths(self, old: str, new: str) -> list[Path] | None:
+        result = await run_git(
+            "diff", "--name-status", f"{old}..{new}",
+            "--", self._config.knowledge.root_dir,
+            cwd=self._config.repo_root,
+            timeout=30,
+        )
+        if result.returncode != 0:
+            return None
+        paths: list[Path] = []
+        for line in result.stdout.splitlines():
+            for name in line.split("\t")[1:]:
+                paths.append(self._config.repo_root / name)
+        return paths
+
     def list_entries(
         self,
         type_filter: str | None = None,
         tag_filter: str | None = None,
     ) -> list[Entry]:
+        flt = EntryFilter(type=type_filter, tags=(tag_filter,) if tag_filter else ())
+        return self.list_page(flt).entries
+
+    def list_page(
+        self,
+        flt: EntryFilter,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> EntryPage:
         self.try_pull()
-        results = []
-        for entry in self._entries.values():
-            if type_filter and entry.type != type_filter:
-                continue
-            if tag_filter and tag_filter not in entry.tags:
-                continue
-            results.append(entry)
-        results.sort(key=lambda e: e.created, reverse=True)
-        return results
+        snapshot = self._snapshot
+        after = decode_cursor(cursor) if cursor else None
+        paths, total, last = snapshot.filters.page(flt, limit, after)
+        return EntryPage(
+            entries=[snapshot.entries[p] for p in paths],
+            total=total,
+            next_cursor=encode_cursor(last) if last else None,
+        )
 
     def read_entry(self, path: str) -> Entry | None:
         self.try_pull()
-        return self._entries.get(path)
+        return self._snapshot.entries.get(path)
 
     def get_backlinks(self, path: str) -> list[Backlink]:
-        return self._backlinks.get(path, [])
+        return self._snapshot.backlinks.get(path, [])
 
     def get_backlink_count(self, path: str) -> int:
-        return self._backlink_counts.get(path, 0)
+        return self._snapshot.backlink_counts.get(path, 0)
 
-    def search(self, query: str, limit: int = 20) -> list[SearchResult]:
+    def graph(self) -> GraphIndex:
+        snapshot = self._snapshot
+        if snapshot.graph is None:
+            snapshot.graph = GraphIndex(snapshot.entries)
+        return snapshot.graph
+
+    def neighbors(
+        self,
+        path: str,
+        depth: int = 1,
+        labels: list[str] | None = None,
+        direction: str = "both",
+        max_nodes: int = 100,
+    ) -> Subgraph | None:
         self.try_pull()
-        if self._semantic_backend:
+        return self.graph().neighbors(path, depth, labels, direction, max_nodes)
+
+    def top_ranked(self, limit: int) -> list[Entry]:
+        snapshot = self._snapshot
+        return [snapshot.entries[path] for path in snapshot.ranked[:limit]]
+
+    def search(
+        self, query: str, limit: int = 20, flt: EntryFilter | None = None
+    ) -> list[SearchResult]:
+        self.try_pull()
+        snapshot = self._snapshot
+        allowed = snapshot.filters.paths(flt) if flt else None
+        if allowed is not None and not allowed:
+            return []
+        if snapshot.semantic_backend:
             try:
-                results = self._semantic_backend.search(query, limit)
+                results = snapshot.semantic_backend.search(query, limit, allowed)
                 if results:
                     return results
             except Exception:
                 pass
-        return self._search_backend.search(query, limit)
+        if snapshot.search_backend is None:
+            return []
+        return snapshot.search_backend.search(query, limit, allowed)
+
+    def search_page(
+        self, query: str, limit: int = 20, flt: EntryFilter | None = None
+    ) -> SearchPage:
+        matches = self.search(query, limit=max(self.entry_count(), limit), flt=flt)
+        return SearchPage(results=matches[:limit], facets=facet_counts(matches))
+
+    def query_cache_stats(self) -> dict[str, int] | None:
+        semantic = self._snapshot.embedding_backend
+        if semantic is None:
+            return None
+        return semantic.query_cache_stats()
+
+    def search_timings(self) -> dict[str, float]:
+        return getattr(self._snapshot.search_backend, "last_timings", {})
+
+    def parse_errors(self) -> dict[str, str]:
+        return dict(self._snapshot.parse_errors)
 
     def all_entries(self) -> list[Entry]:
-        return list(self._entries.values())
+        return list(self._snapshot.entries.values())
 
     def entry_count(self) -> int:
-        return len(self._entries)
+        return len(self._snapshot.entries)
 
     def tag_counts(self) -> dict[str, int]:
-        counts: dict[str, int] = defaultdict(int)
-        for entry in self._entries.values():
-            for tag in entry.tags:
-                counts[tag] += 1
-        return dict(counts)
+        return self._snapshot.filters.tag_counts()
 
     def type_counts(self) -> dict[str, int]:
-        counts: dict[str, int] = defaultdict(int)
-        for entry in self._entries.values():
-            counts[entry.type] += 1
-        return dict(counts)
+        return self._snapshot.filters.type_counts()
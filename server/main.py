@@ -2,29 +2,31 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import subprocess
 import time
+from functools import partial
 from pathlib import Path
 
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
+from server.clients import ApiClients
 from server.config import Config, load_config
+from server.git import run_git
 from server.kb import KnowledgeBase
+from server.sync import SyncWorker
 from server.tools import register_tools
 
 logger = logging.getLogger("memex")
 
+_REPO_DIR = Path("/tmp/memex-repo")
 
-def _clone_repo(config: Config) -> Path:
-    work_dir = Path("/tmp/memex-repo")
+
+async def _clone_repo(config: Config) -> Path:
+    work_dir = _REPO_DIR
     if work_dir.exists():
         logger.info("Repo already cloned at %s, pulling...", work_dir)
-        subprocess.run(
-            ["git", "pull", "--ff-only"],
-            cwd=work_dir,
-            capture_output=True,
-            timeout=60,
-        )
+        await run_git("pull", "--ff-only", cwd=work_dir, timeout=60)
         return work_dir
 
     clone_url = config.memex_git_url
@@ -35,24 +37,25 @@ def _clone_repo(config: Config) -> Path:
         )
 
     logger.info("Cloning %s...", config.memex_git_url)
-    subprocess.run(
-        ["git", "clone", "--depth=1", clone_url, str(work_dir)],
-        capture_output=True,
-        timeout=120,
-        check=True,
-    )
+    result = await run_git("clone", "--depth=1", clone_url, str(work_dir), timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"git clone failed with exit code {result.returncode}")
     return work_dir
 
 
-def create_server(config: Config | None = None) -> FastMCP:
+def create_server(
+    config: Config | None = None, clients: ApiClients | None = None
+) -> FastMCP:
     if config is None:
         config = load_config()
 
+    prepare = None
     if config.memex_git_url:
-        repo_root = _clone_repo(config)
-        config.repo_root = repo_root
+        config.repo_root = _REPO_DIR
+        prepare = partial(_clone_repo, config)
 
-    kb = KnowledgeBase(config)
+    kb = KnowledgeBase(config, background=True)
+    SyncWorker(kb, config.sync, prepare=prepare).start()
 
     mcp = FastMCP(
         "memex",
@@ -61,7 +64,14 @@ def create_server(config: Config | None = None) -> FastMCP:
         stateless_http=True,
     )
 
-    register_tools(mcp, kb, config)
+    @mcp.custom_route("/ready", methods=["GET"])
+    async def ready(request: Request) -> JSONResponse:
+        return JSONResponse(
+            {"ready": kb.ready, "entries": kb.entry_count()},
+            status_code=200 if kb.ready else 503,
+        )
+
+    register_tools(mcp, kb, config, clients)
 
     return mcp
 
@@ -69,13 +79,21 @@ def create_server(config: Config | None = None) -> FastMCP:
 def run() -> None:
     logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     config = load_config()
-    mcp = create_server(config)
+    clients = ApiClients(config)
+    mcp = create_server(config, clients)
     logger.info(
         "Starting Memex MCP server on %s:%s",
         config.server.host,
         config.server.port,
     )
-    mcp.run(transport="streamable-http")
+    asyncio.run(_serve(mcp, clients))
+
+
+async def _serve(mcp: FastMCP, clients: ApiClients) -> None:
+    try:
+        await mcp.run_streamable_http_async()
+    finally:
+        await clients.close()
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ def build_prompt(
     summary: str,
     kb: KnowledgeBase,
     images: list[str] | None = None,
+    related: int = 5,
 ) -> str:
     parts: list[str] = []
 
@@ -15,7 +16,7 @@ def build_prompt(
     parts.append(summary)
     parts.append("")
 
-    results = kb.search(summary, limit=5)
+    results = kb.search(summary, limit=related)
     if results:
         parts.append("## Potentially Related Entries\n")
         for r in results:
@@ -34,11 +35,7 @@ def build_prompt(
                 tags = ", ".join(e.tags)
                 parts.append(f"{e.path} | {e.title} | {e.type} | {tags} | {e.summary}")
         else:
-            top_entries = sorted(
-                entries,
-                key=lambda e: len(e.edges) + kb.get_backlink_count(e.path),
-                reverse=True,
-            )[:50]
+            top_entries = kb.top_ranked(50)
             related_paths = {r.path for r in results}
             relevant = [e for e in entries if e.path in related_paths]
             combined = {e.path: e for e in top_entries + relevant}
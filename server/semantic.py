@@ -1,23 +1,39 @@
 from __future__ import annotations
 
+import copy
 import hashlib
-import json
 import logging
-import math
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 
+import numpy as np
+
+from server.ann import make_ann_index
+from server.embedding_pipeline import EmbeddingPipeline, ProgressLogger
+from server.embedding_store import EmbeddingStore
+from server.embeddings import EmbeddingProvider, QueryEmbeddingCache
 from server.kb import Entry, SearchResult
 
 logger = logging.getLogger("memex.semantic")
 
 
-def _cosine_similarity(a: list[float], b: list[float]) -> float:
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = math.sqrt(sum(x * x for x in a))
-    norm_b = math.sqrt(sum(x * x for x in b))
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
+def _normalize(vectors) -> np.ndarray:
+    arr = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if k < len(scores):
+        idx = np.argpartition(-scores, k)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
 
 
 def _entry_text(entry: Entry) -> str:
@@ -28,117 +44,341 @@ def _entry_hash(entry: Entry) -> str:
     return hashlib.md5(_entry_text(entry).encode()).hexdigest()
 
 
+class _ReadWriteLock:
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writers = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writing or self._writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._writers += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
 class SemanticBackend:
     def __init__(
         self,
-        api_key: str,
-        model: str = "text-embedding-3-small",
+        provider: EmbeddingProvider,
         cache_path: Path | None = None,
+        cache_dtype: str = "float32",
+        index: str = "flat",
+        nprobe: int = 8,
+        ef_search: int = 64,
+        query_cache: QueryEmbeddingCache | None = None,
+        pipeline: EmbeddingPipeline | None = None,
+        checkpoint_seconds: float = 30,
     ) -> None:
-        self._api_key = api_key
-        self._model = model
-        self._cache_path = cache_path or Path(".memex/embeddings.json")
+        self._provider = provider
+        self._query_cache = query_cache
+        self._pipeline = pipeline or EmbeddingPipeline(provider)
+        self._checkpoint_seconds = checkpoint_seconds
+        cache_path = cache_path or Path(".memex/embeddings.npy")
+        self._store = EmbeddingStore(cache_path, provider.model, cache_dtype)
+        self._make_ann = partial(
+            make_ann_index, index, cache_path, nprobe=nprobe, ef_search=ef_search
+        )
+        self._ann = self._make_ann()
         self._entries: list[Entry] = []
-        self._embeddings: dict[str, list[float]] = {}
-        self._hashes: dict[str, str] = {}
+        self._by_path: dict[str, Entry] = {}
+        self._rows: dict[str, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._row_entries: list[Entry | None] = []
+        self._valid = np.zeros(0, dtype=bool)
         self._backlink_counts: dict[str, int] = {}
-        self._client: object | None = None
+        self._prior: dict[str, float] = {}
+        self._row_prior: np.ndarray | None = None
+        self._lock = _ReadWriteLock()
 
-        self._load_cache()
+        self._store.load()
+        self._load_ann()
 
     def set_backlink_counts(self, counts: dict[str, int]) -> None:
         self._backlink_counts = counts
 
-    def _load_cache(self) -> None:
-        if self._cache_path.exists():
-            try:
-                data = json.loads(self._cache_path.read_text())
-                self._embeddings = data.get("embeddings", {})
-                self._hashes = data.get("hashes", {})
-            except Exception:
-                logger.warning("Failed to load embeddings cache, starting fresh")
-
-    def _save_cache(self) -> None:
-        self._cache_path.parent.mkdir(parents=True, exist_ok=True)
-        data = {
-            "embeddings": self._embeddings,
-            "hashes": self._hashes,
-        }
-        self._cache_path.write_text(json.dumps(data))
-
-    def _get_openai_client(self):
-        if self._client is None:
-            try:
-                from openai import OpenAI
-                self._client = OpenAI(api_key=self._api_key)
-            except ImportError:
-                raise RuntimeError("openai package not installed. Install with: uv pip install openai")
-        return self._client
-
-    def _embed_texts(self, texts: list[str]) -> list[list[float]]:
-        client = self._get_openai_client()
-        response = client.embeddings.create(input=texts, model=self._model)
-        return [item.embedding for item in response.data]
-
-    def _embed_single(self, text: str) -> list[float]:
-        return self._embed_texts([text])[0]
+    def set_rank_prior(self, prior: dict[str, float]) -> None:
+        self._prior = prior
+        self._row_prior = None
+
+    def _prior_weights(self) -> np.ndarray | None:
+        if not self._prior:
+            return None
+        if self._row_prior is None or len(self._row_prior) != len(self._row_entries):
+            prior = self._prior
+            self._row_prior = np.array(
+                [prior.get(e.path, 1.0) if e else 1.0 for e in self._row_entries],
+                dtype=np.float32,
+            )
+        return self._row_prior
+
+    def _load_ann(self) -> None:
+        if self._ann is None:
+            return
+        try:
+            if self._ann.load() and self._ann.version == self._store.version:
+                return
+        except Exception:
+            logger.warning("Failed to load ANN index, rebuilding")
+        self._update_ann([], rebuild=True)
+
+    def _update_ann(self, added: list[int], rebuild: bool) -> None:
+        if self._ann is None:
+            return
+        matrix = self._store.matrix
+        if rebuild:
+            self._ann = self._make_ann()
+            self._ann.build(matrix, sorted(self._store.rows.values()))
+        else:
+            self._ann.add(matrix, added)
+        self._ann.version = self._store.version
+        try:
+            self._ann.save()
+        except OSError as e:
+            logger.warning("Failed to save ANN index: %s", e)
+
+    def _embed_texts(self, texts: list[str]) -> np.ndarray:
+        return self._provider.embed(texts)
+
+    def _embed_queries(self, queries: list[str]) -> np.ndarray:
+        cache = self._query_cache
+        if cache is None:
+            return _normalize(self._embed_texts(queries))
+        model = self._provider.model
+        vectors: list[np.ndarray | None] = [cache.get(model, q) for q in queries]
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+        if missing:
+            embedded = _normalize(self._embed_texts([queries[i] for i in missing]))
+            for i, vec in zip(missing, embedded):
+                cache.put(model, queries[i], vec)
+                vectors[i] = vec
+        return np.stack(vectors)
+
+    def query_cache_stats(self) -> dict[str, int] | None:
+        if self._query_cache is None:
+            return None
+        return self._query_cache.stats()
+
+    def fork(self) -> SemanticBackend:
+        clone = copy.copy(self)
+        clone._by_path = dict(self._by_path)
+        return clone
 
     def index(self, entries: list[Entry]) -> None:
-        self._entries = entries
+        self._by_path = {e.path: e for e in entries}
+        self._entries = list(self._by_path.values())
+        stale = (self._store.rows.keys() | self._store.hashes.keys()) - self._by_path.keys()
+        self._embed_changed(stale)
 
-        to_embed: list[tuple[str, str]] = []
+    def update(self, entries: list[Entry], removed: list[str]) -> None:
+        for path in removed:
+            self._by_path.pop(path, None)
         for entry in entries:
+            self._by_path[entry.path] = entry
+        self._entries = list(self._by_path.values())
+        self._embed_changed(removed)
+
+    def _entry_hash(self, entry: Entry) -> str:
+        key = entry.content_hash
+        h = self._store.text_hashes.get(key) if key else None
+        if h is None:
             h = _entry_hash(entry)
-            if entry.path in self._hashes and self._hashes[entry.path] == h:
+            if key:
+                self._store.text_hashes[key] = h
+        return h
+
+    def _embed_changed(self, stale: Iterable[str]) -> None:
+        store = self._store
+        known = set(store.text_hashes)
+        to_embed: list[tuple[tuple[str, str], str]] = []
+        for entry in self._entries:
+            h = self._entry_hash(entry)
+            if store.hashes.get(entry.path) == h and entry.path in store.rows:
                 continue
-            to_embed.append((entry.path, _entry_text(entry)))
-            self._hashes[entry.path] = h
+            to_embed.append(((entry.path, h), _entry_text(entry)))
 
-        stale = set(self._embeddings.keys()) - {e.path for e in entries}
-        for path in stale:
-            del self._embeddings[path]
-            self._hashes.pop(path, None)
+        live = {e.content_hash for e in self._entries}
+        text_hashes = {k: v for k, v in store.text_hashes.items() if k in live}
+        learned = text_hashes.keys() != known
+
+        added_rows: list[int] = []
+        with self._lock.write():
+            store.text_hashes = text_hashes
+            for path in stale:
+                store.remove(path)
+
+        compacted = False
+        last_save = time.monotonic()
+
+        def on_batch(keys: list[tuple[str, str]], vectors: np.ndarray) -> None:
+            nonlocal compacted, last_save
+            with self._lock.write():
+                for (path, h), vec in zip(keys, _normalize(vectors)):
+                    store.put(path, vec)
+                    store.hashes[path] = h
+                    added_rows.append(store.rows[path])
+                if time.monotonic() - last_save > self._checkpoint_seconds:
+                    compacted |= self._save_store()
+                    last_save = time.monotonic()
 
         if to_embed:
             logger.info("Embedding %d new/changed entries...", len(to_embed))
-            batch_size = 100
-            for i in range(0, len(to_embed), batch_size):
-                batch = to_embed[i : i + batch_size]
-                paths = [p for p, _ in batch]
-                texts = [t for _, t in batch]
-                try:
-                    vectors = self._embed_texts(texts)
-                    for path, vec in zip(paths, vectors):
-                        self._embeddings[path] = vec
-                except Exception as e:
-                    logger.warning("Failed to embed batch: %s", e)
-
-            self._save_cache()
-
-    def search(self, query: str, limit: int = 20) -> list[SearchResult]:
-        if not self._entries or not self._embeddings:
-            return []
+            failed = self._pipeline.run(to_embed, on_batch, ProgressLogger())
+            if failed:
+                logger.warning(
+                    "%d entries failed to embed and will be retried on next refresh",
+                    len(failed),
+                )
+
+        with self._lock.write():
+            if to_embed or stale or learned:
+                compacted |= self._save_store()
+                self._update_ann(added_rows, rebuild=compacted)
+            self._build_matrix()
 
+    def _save_store(self) -> bool:
         try:
-            query_vec = self._embed_single(query)
+            return self._store.save()
+        except OSError as e:
+            logger.warning("Failed to save embeddings cache: %s", e)
+            return True
+
+    def _build_matrix(self) -> None:
+        matrix = self._store.matrix
+        if matrix.dtype != np.float32:
+            matrix = matrix.astype(np.float32)
+        self._rows = dict(self._store.rows)
+        row_entries: list[Entry | None] = [None] * len(matrix)
+        for path, row in self._rows.items():
+            row_entries[row] = self._by_path.get(path)
+        self._valid = np.array([e is not None for e in row_entries], dtype=bool)
+        self._row_entries = row_entries
+        self._row_prior = None
+        self._matrix = matrix
+
+    def search(
+        self, query: str, limit: int = 20, allowed: set[str] | None = None
+    ) -> list[SearchResult]:
+        return self.search_many([query], limit, allowed)[0]
+
+    def search_many(
+        self, queries: list[str], limit: int = 20, allowed: set[str] | None = None
+    ) -> list[list[SearchResult]]:
+        if not self._valid.any() or not queries:
+            return [[] for _ in queries]
+
+        rows = None
+        if allowed is not None:
+            own_rows = self._rows
+            rows = np.fromiter(
+                (own_rows[p] for p in allowed if p in own_rows), dtype=np.int64
+            )
+            rows = rows[rows < len(self._valid)]
+            rows = rows[self._valid[rows]]
+            if not len(rows):
+                return [[] for _ in queries]
+
+        try:
+            query_vecs = self._embed_queries(queries)
         except Exception as e:
             logger.warning("Failed to embed query: %s", e)
-            return []
+            return [[] for _ in queries]
 
-        scored: list[tuple[Entry, float]] = []
-        for entry in self._entries:
-            vec = self._embeddings.get(entry.path)
-            if vec is None:
-                continue
-            score = _cosine_similarity(query_vec, vec)
-            scored.append((entry, score))
+        with self._lock.read():
+            return self._score(query_vecs, limit, rows, allowed)
+
+    def _score(
+        self,
+        query_vecs: np.ndarray,
+        limit: int,
+        rows: np.ndarray | None,
+        allowed: set[str] | None,
+    ) -> list[list[SearchResult]]:
+        if rows is not None and (self._ann is None or 4 * len(rows) < self._valid.sum()):
+            rows.sort()
+            all_scores = query_vecs @ self._matrix[rows].T
+            weights = self._prior_weights()
+            if weights is not None:
+                all_scores *= weights[rows]
+            results = []
+            for scores in all_scores:
+                top = _top_k(scores, limit)
+                results.append(self._collect(rows[top], scores[top]))
+            return results
 
-        scored.sort(key=lambda x: x[1], reverse=True)
+        if self._ann is not None:
+            return [self._search_ann(vec, limit, allowed) for vec in query_vecs]
+
+        all_scores = query_vecs @ self._matrix.T
+        weights = self._prior_weights()
+        if weights is not None:
+            all_scores *= weights
+        all_scores[:, ~self._valid] = -np.inf
+        results = []
+        for scores in all_scores:
+            rows = _top_k(scores, limit)
+            results.append(self._collect(rows, scores[rows]))
+        return results
+
+    def _search_ann(
+        self, query_vec: np.ndarray, limit: int, allowed: set[str] | None = None
+    ) -> list[SearchResult]:
+        live = max(int(self._valid.sum()), 1)
+        depth = 2 * limit * len(self._valid) / live
+        if allowed is not None:
+            depth *= live / max(len(allowed), 1)
+        depth = int(depth) + 1
+        rows, scores = self._ann.search(self._matrix, query_vec, depth)
+        known = rows < len(self._valid)
+        rows, scores = rows[known], scores[known]
+        keep = self._valid[rows]
+        if allowed is not None:
+            row_entries = self._row_entries
+            keep &= np.fromiter(
+                (
+                    row_entries[r] is not None and row_entries[r].path in allowed
+                    for r in rows.tolist()
+                ),
+                dtype=bool,
+                count=len(rows),
+            )
+        rows, scores = rows[keep], scores[keep]
+        weights = self._prior_weights()
+        if weights is not None:
+            scores = scores * weights[rows]
+        order = np.argsort(-scores, kind="stable")[:limit]
+        return self._collect(rows[order], scores[order])
 
+    def _collect(self, rows: np.ndarray, scores: np.ndarray) -> list[SearchResult]:
         results = []
-        for entry, score in scored[:limit]:
+        for row, score in zip(rows.tolist(), scores.tolist()):
             if score < 0.1:
                 break
+            entry = self._row_entries[row]
             results.append(
                 SearchResult(
                     path=entry.path,
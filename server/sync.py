@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+from server.config import SyncConfig
+from server.kb import KnowledgeBase
+
+logger = logging.getLogger("memex.sync")
+
+
+class SyncWorker:
+    def __init__(
+        self,
+        kb: KnowledgeBase,
+        config: SyncConfig,
+        prepare: Callable[[], object] | None = None,
+    ) -> None:
+        self._kb = kb
+        self._config = config
+        self._prepare = prepare
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="memex-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        asyncio.run(self._main())
+
+    async def _wait(self, timeout: float) -> bool:
+        return await asyncio.to_thread(self._stop.wait, timeout)
+
+    async def _main(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._prepare:
+                    prepared = self._prepare()
+                    if inspect.isawaitable(prepared):
+                        await prepared
+                start = time.perf_counter()
+                await asyncio.to_thread(self._kb.refresh)
+                logger.info(
+                    "Index ready: %d entries in %.1fs",
+                    self._kb.entry_count(),
+                    time.perf_counter() - start,
+                )
+                break
+            except Exception:
+                logger.exception("Initial index build failed, retrying")
+                await self._wait(self._config.pull_interval_seconds)
+
+        if not self._config.auto_pull:
+            return
+        while not await self._wait(self._config.pull_interval_seconds):
+            try:
+                await self._kb.pull_async()
+            except Exception:
+                logger.exception("Background sync failed")
@@ -1,32 +1,148 @@
 from __future__ import annotations
 
-from pathlib import Path, PurePosixPath
+import asyncio
+from collections.abc import Callable
+from functools import partial
+from typing import Any, TypeVar
 
-import httpx
 from mcp.server.fastmcp import FastMCP
 
+from server.assets import describe_upload, load_assets, upload_assets
+from server.clients import ApiClients
 from server.config import Config
-from server.cursor_client import CursorClient, CursorClientError
-from server.github_client import GitHubClient, GitHubClientError, IMAGE_EXTENSIONS
+from server.cursor_client import CursorClientError
+from server.filters import EntryFilter, InvalidCursorError
+from server.github_client import GitHubClientError
 from server.kb import KnowledgeBase
 from server.prompt import build_prompt
 
 
-def register_tools(mcp: FastMCP, kb: KnowledgeBase, config: Config) -> None:
+_NOT_READY = "Knowledge base is still loading, try again shortly."
+
+T = TypeVar("T")
+
+
+def _format_facets(facets: dict[str, dict[str, int]]) -> str:
+    lines = ["Facets:"]
+    for name, counts in facets.items():
+        values = ", ".join(f"{value} ({count})" for value, count in counts.items())
+        lines.append(f"  {name}: {values}")
+    return "\n".join(lines)
+
+
+def register_tools(
+    mcp: FastMCP,
+    kb: KnowledgeBase,
+    config: Config,
+    clients: ApiClients | None = None,
+) -> None:
+    clients = clients or ApiClients(config)
+    executor = clients.tools
+
+    async def offload(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+    def render_entry(path: str) -> str:
+        entry = kb.read_entry(path)
+        if not entry:
+            return f"Entry not found: {path}"
+        backlinks = kb.get_backlinks(path)
+        parts = [
+            f"# {entry.title}",
+            f"type: {entry.type}",
+            f"summary: {entry.summary}",
+            f"tags: {', '.join(entry.tags)}",
+            f"created: {entry.created}",
+        ]
+        if entry.updated:
+            parts.append(f"updated: {entry.updated}")
+        if entry.edges:
+            parts.append("\nedges:")
+            for edge in entry.edges:
+                desc = f" — {edge.description}" if edge.description else ""
+                parts.append(f"  [{edge.label}] {edge.path}{desc}")
+        if entry.sources:
+            parts.append("\nsources:")
+            for s in entry.sources:
+                title = f" ({s.title})" if s.title else ""
+                parts.append(f"  {s.url}{title}")
+        if backlinks:
+            parts.append("\nbacklinks:")
+            for bl in backlinks:
+                desc = f" — {bl.description}" if bl.description else ""
+                parts.append(f"  [{bl.label}] {bl.path} ({bl.title}){desc}")
+        parts.append(f"\n---\n{entry.body}")
+        return "\n".join(parts)
+
+    def render_neighbors(
+        path: str,
+        depth: int,
+        labels: list[str] | None,
+        direction: str,
+        max_nodes: int,
+    ) -> str:
+        try:
+            sub = kb.neighbors(path, depth, labels, direction, max_nodes)
+        except ValueError as e:
+            return str(e)
+        if sub is None:
+            return f"Entry not found: {path}"
+        parts = [
+            f"Neighborhood of {path}: {len(sub.depths)} entries, "
+            f"{len(sub.edges)} edges within {depth} hops"
+        ]
+        parts.append("\nentries:")
+        for node, hop in sub.depths.items():
+            entry = kb.read_entry(node)
+            if entry:
+                parts.append(f"  [{hop}] {node} ({entry.type}) {entry.title}")
+            else:
+                parts.append(f"  [{hop}] {node} (missing)")
+        if sub.edges:
+            parts.append("\nedges:")
+            for edge in sub.edges:
+                parts.append(f"  {edge.source} -[{edge.label}]-> {edge.target}")
+        if sub.truncated:
+            parts.append(f"\nTruncated at {max_nodes} entries.")
+        return "\n".join(parts)
 
     @mcp.tool(
         description=(
             "Search the knowledge base. Returns matching entries with "
             "title, path, type, tags, summary, and backlink count. "
+            "Optionally restrict results by type, tags (all must match, "
+            "or any with match_any=true) and created date range "
+            "(YYYY-MM-DD, inclusive). Also returns type and tag counts "
+            "over all matching entries, not just the returned page. "
             "Entries are atomic knowledge units linked via typed edges."
         )
     )
-    def kb_search(query: str) -> str:
-        results = kb.search(query, limit=20)
-        if not results:
+    async def kb_search(
+        query: str,
+        type: str | None = None,
+        tags: list[str] | None = None,
+        match_any: bool = False,
+        created_from: str | None = None,
+        created_to: str | None = None,
+        limit: int | None = None,
+    ) -> str:
+        if not kb.ready:
+            return _NOT_READY
+        flt = EntryFilter(
+            type=type,
+            tags=tuple(tags or ()),
+            match_any=match_any,
+            created_from=created_from,
+            created_to=created_to,
+        )
+        page = await offload(
+            kb.search_page, query, limit=limit or config.search.limit, flt=flt
+        )
+        if not page.results:
             return "No results found."
         lines = []
-        for r in results:
+        for r in page.results:
             lines.append(
                 f"[{r.type}] {r.title}\n"
                 f"  path: {r.path}\n"
@@ -34,22 +150,49 @@ def register_tools(mcp: FastMCP, kb: KnowledgeBase, config: Config) -> None:
                 f"  summary: {r.summary}\n"
                 f"  backlinks: {r.backlink_count}"
             )
+        lines.append(_format_facets(page.facets))
         return "\n\n".join(lines)
 
     @mcp.tool(
         description=(
-            "List knowledge base entries. Filter by type "
-            "(concept, reference, insight, question, note) and/or tag. "
-            "Returns title, type, summary, tags, and connection density "
-            "for each entry."
+            "List knowledge base entries, newest first. Filter by type "
+            "(concept, reference, insight, question, note), by tags "
+            "(all must match, or any with match_any=true) and by created "
+            "date range (YYYY-MM-DD, inclusive). Returns title, type, "
+            "summary, tags, and connection density for each entry. "
+            "Results are paginated: pass the returned cursor to get the "
+            "next page."
         )
     )
-    def kb_list(type: str | None = None, tag: str | None = None) -> str:
-        entries = kb.list_entries(type_filter=type, tag_filter=tag)
-        if not entries:
+    async def kb_list(
+        type: str | None = None,
+        tag: str | None = None,
+        tags: list[str] | None = None,
+        match_any: bool = False,
+        created_from: str | None = None,
+        created_to: str | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> str:
+        if not kb.ready:
+            return _NOT_READY
+        flt = EntryFilter(
+            type=type,
+            tags=tuple(([tag] if tag else []) + (tags or [])),
+            match_any=match_any,
+            created_from=created_from,
+            created_to=created_to,
+        )
+        try:
+            page = await offload(
+                kb.list_page, flt, limit=limit or config.knowledge.list_limit, cursor=cursor
+            )
+        except InvalidCursorError as e:
+            return str(e)
+        if not page.entries:
             return "No entries found."
         lines = []
-        for e in entries:
+        for e in page.entries:
             bl = kb.get_backlink_count(e.path)
             lines.append(
                 f"[{e.type}] {e.title}\n"
@@ -58,6 +201,10 @@ def register_tools(mcp: FastMCP, kb: KnowledgeBase, config: Config) -> None:
                 f"  summary: {e.summary}\n"
                 f"  edges: {len(e.edges)}  backlinks: {bl}"
             )
+        footer = f"Showing {len(page.entries)} of {page.total} entries."
+        if page.next_cursor:
+            footer += f" Next page cursor: {page.next_cursor}"
+        lines.append(footer)
         return "\n\n".join(lines)
 
     @mcp.tool(
@@ -68,98 +215,82 @@ def register_tools(mcp: FastMCP, kb: KnowledgeBase, config: Config) -> None:
             "with cross-reference links. Also returns computed backlinks."
         )
     )
-    def kb_read(path: str) -> str:
-        entry = kb.read_entry(path)
-        if not entry:
-            return f"Entry not found: {path}"
-        backlinks = kb.get_backlinks(path)
-        parts = [
-            f"# {entry.title}",
-            f"type: {entry.type}",
-            f"summary: {entry.summary}",
-            f"tags: {', '.join(entry.tags)}",
-            f"created: {entry.created}",
-        ]
-        if entry.updated:
-            parts.append(f"updated: {entry.updated}")
-        if entry.edges:
-            parts.append("\nedges:")
-            for edge in entry.edges:
-                desc = f" — {edge.description}" if edge.description else ""
-                parts.append(f"  [{edge.label}] {edge.path}{desc}")
-        if entry.sources:
-            parts.append("\nsources:")
-            for s in entry.sources:
-                title = f" ({s.title})" if s.title else ""
-                parts.append(f"  {s.url}{title}")
-        if backlinks:
-            parts.append("\nbacklinks:")
-            for bl in backlinks:
-                desc = f" — {bl.description}" if bl.description else ""
-                parts.append(f"  [{bl.label}] {bl.path} ({bl.title}){desc}")
-        parts.append(f"\n---\n{entry.body}")
-        return "\n".join(parts)
+    async def kb_read(path: str) -> str:
+        if not kb.ready:
+            return _NOT_READY
+        return await offload(render_entry, path)
 
     @mcp.tool(
         description=(
-            "Upload an image to the knowledge base assets on GitHub. "
-            "Accepts a local file path or a URL as the source. "
+            "Explore the knowledge graph around an entry in one call. "
+            "Expands typed edges up to `depth` hops (direction: out, in "
+            "or both), optionally following only the given edge labels, "
+            "and returns the reached entries with their hop distance and "
+            "the edges between them."
+        )
+    )
+    async def kb_neighbors(
+        path: str,
+        depth: int = 1,
+        labels: list[str] | None = None,
+        direction: str = "both",
+        max_nodes: int = 100,
+    ) -> str:
+        if not kb.ready:
+            return _NOT_READY
+        return await offload(
+            render_neighbors, path, depth, labels, direction, max_nodes
+        )
+
+    @mcp.tool(
+        description=(
+            "Upload images to the knowledge base assets on GitHub. "
+            "Accepts a local file path or a URL as the source, or a list "
+            "of them as sources; several files are fetched concurrently "
+            "and pushed as a single commit. "
             "Local file paths require the MCP server to run on the same "
             "machine (local/stdio transport). URLs work regardless of "
             "server location. "
             "Optionally specify a branch — if omitted, pushes to the "
-            "default branch. Returns the repo-relative path for use in "
+            "default branch. Returns the repo-relative paths for use in "
             "markdown entries: ![alt](/knowledge/assets/filename.png)"
         )
     )
-    def kb_upload(source: str, branch: str | None = None) -> str:
+    async def kb_upload(
+        source: str | None = None,
+        sources: list[str] | None = None,
+        branch: str | None = None,
+    ) -> str:
         if not config.memex_git_token:
             return "Error: MEMEX_GIT_TOKEN not configured"
         if not config.github.owner or not config.github.repo:
             return "Error: GitHub repository not configured in config.yaml"
 
-        is_url = source.startswith("http://") or source.startswith("https://")
-
-        if is_url:
-            filename = PurePosixPath(source.split("?")[0]).name
-        else:
-            filename = Path(source).name
-
-        ext = PurePosixPath(filename).suffix.lower()
-        if ext not in IMAGE_EXTENSIONS:
-            return f"Error: Unsupported image type '{ext}'. Supported: {', '.join(sorted(IMAGE_EXTENSIONS))}"
-
-        if is_url:
-            try:
-                resp = httpx.get(source, timeout=30, follow_redirects=True)
-                resp.raise_for_status()
-                content = resp.content
-            except httpx.HTTPError as e:
-                return f"Error: Failed to fetch URL: {e}"
-        else:
-            p = Path(source).expanduser().resolve()
-            if not p.exists():
-                return f"Error: File not found: {source}"
-            content = p.read_bytes()
+        requested = ([source] if source else []) + (sources or [])
+        if not requested:
+            return "Error: No source given"
+        assets, errors = await load_assets(requested, clients.web)
+        if not assets:
+            return "\n".join(f"Error: {e}" for e in errors)
 
         target_branch = branch or config.github.default_branch
-        repo_path = f"{config.knowledge.assets_dir}/{filename}"
-
-        gh = GitHubClient(config.memex_git_token, config.github.owner, config.github.repo)
         try:
             if branch:
-                gh.ensure_branch(branch, config.github.default_branch)
-            result = gh.upload_file(repo_path, content, target_branch)
+                await clients.github.ensure_branch(branch, config.github.default_branch)
+            plan, result = await upload_assets(
+                clients.github,
+                assets,
+                config.knowledge.assets_dir,
+                target_branch,
+                dedupe=config.knowledge.dedupe_assets,
+            )
         except GitHubClientError as e:
             return f"Error: {e}"
-        finally:
-            gh.close()
 
-        return (
-            f"Uploaded: /{result.path}\n"
-            f"Branch: {result.branch}\n"
-            f"Use in entries: ![alt](/{result.path})"
-        )
+        lines = describe_upload(plan, result, target_branch)
+        lines.append(f"Use in entries: ![alt](/{next(iter(plan.links.values()))})")
+        lines.extend(f"Skipped: {e}" for e in errors)
+        return "\n".join(lines)
 
     @mcp.tool(
         description=(
@@ -171,7 +302,7 @@ def register_tools(mcp: FastMCP, kb: KnowledgeBase, config: Config) -> None:
             "where images were uploaded via kb_upload)."
         )
     )
-    def kb_add(summary: str, branch: str | None = None) -> str:
+    async def kb_add(summary: str, branch: str | None = None) -> str:
         if not summary or not summary.strip():
             return "Error: Summary cannot be empty"
         if not config.cursor_api_key:
@@ -183,30 +314,30 @@ def register_tools(mcp: FastMCP, kb: KnowledgeBase, config: Config) -> None:
 
         images: list[str] = []
         if target_branch and config.memex_git_token:
-            gh = GitHubClient(
-                config.memex_git_token, config.github.owner, config.github.repo
-            )
             try:
-                images = gh.list_directory(config.knowledge.assets_dir, target_branch)
+                images = await clients.github.list_directory(
+                    config.knowledge.assets_dir, target_branch
+                )
             except GitHubClientError:
                 pass
-            finally:
-                gh.close()
 
-        prompt_text = build_prompt(summary.strip(), kb, images=images)
+        prompt_text = await offload(
+            build_prompt,
+            summary.strip(),
+            kb,
+            images=images,
+            related=config.search.prompt_related,
+        )
         repo_url = f"https://github.com/{config.github.owner}/{config.github.repo}"
 
-        client = CursorClient(config.cursor_api_key)
         try:
-            result = client.launch_agent(
+            result = await clients.cursor.launch_agent(
                 prompt=prompt_text,
                 repository=repo_url,
                 ref=target_branch,
             )
         except CursorClientError as e:
             return f"Error: {e}"
-        finally:
-            client.close()
 
         return (
             f"Cloud agent launched.\n"
@@ -221,17 +352,14 @@ def register_tools(mcp: FastMCP, kb: KnowledgeBase, config: Config) -> None:
             "Returns state (running/completed/failed) and PR URL when ready."
         )
     )
-    def kb_status(agent_id: str) -> str:
+    async def kb_status(agent_id: str) -> str:
         if not config.cursor_api_key:
             return "Error: CURSOR_API_KEY not configured"
 
-        client = CursorClient(config.cursor_api_key)
         try:
-            status = client.get_status(agent_id)
+            status = await clients.cursor.get_status(agent_id)
         except CursorClientError as e:
             return f"Error: {e}"
-        finally:
-            client.close()
 
         parts = [
             f"Status: {status.status}",
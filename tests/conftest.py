@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from server.config import Config, load_config
+from server.kb import KnowledgeBase
+
+
+def write_entry(
+    root: Path,
+    slug: str,
+    body: str,
+    title: str | None = None,
+    tags: tuple[str, ...] = (),
+    edges: tuple[tuple[str, str], ...] = (),
+) -> Path:
+    kb_dir = root / "knowledge"
+    kb_dir.mkdir(parents=True, exist_ok=True)
+    lines = [
+        "---",
+        f'title: "{title or slug}"',
+        "type: note",
+        f"tags: [{', '.join(tags)}]",
+        'created: "2026-01-01"',
+    ]
+    if edges:
+        lines.append("edges:")
+        for path, label in edges:
+            lines.append(f"  - path: {path}\n    label: {label}")
+    lines.append("---")
+    path = kb_dir / f"{slug}.md"
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp.write_text("\n".join(lines) + "\n" + body + "\n")
+    os.replace(tmp, path)
+    return path
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Config:
+    config = load_config(tmp_path / "config.yaml", repo_root=tmp_path)
+    config.knowledge.snapshot = False
+    config.sync.auto_pull = False
+    config.search.semantic.provider = "local"
+    config.search.semantic.model = "hashing"
+    return config
+
+
+@pytest.fixture
+def make_kb(config: Config):
+    def make(backend: str = "bm25", **kwargs) -> KnowledgeBase:
+        config.search.backend = backend
+        return KnowledgeBase(config, **kwargs)
+
+    return make
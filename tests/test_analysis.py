@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pickle
+import threading
+
+from server import analysis
+from server.analysis import Analyzer
+from server.kb import Entry
+
+
+def _entry(i: int) -> Entry:
+    return Entry(
+        path=f"/knowledge/e{i}.md", slug=f"e{i}", title=f"title {i}", type="note",
+        summary="", tags=[], created="", updated="", edges=[], sources=[],
+        content_hash=f"h{i}",
+    )
+
+
+def test_terms_are_interned():
+    analyzer = Analyzer()
+    a = analyzer.terms("".join(["memory", " footprint"]))
+    b = analyzer.terms("memory FOOTPRINT")
+    assert all(x is y for x, y in zip(a, b))
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(analysis, "CACHE_SIZE", 4)
+    analyzer = Analyzer()
+    entries = [_entry(i) for i in range(10)]
+    for e in entries:
+        analyzer.analyze(e)
+    assert list(analyzer._cache) == ["h6", "h7", "h8", "h9"]
+    analyzer.analyze(entries[6])
+    analyzer.analyze(entries[0])
+    assert list(analyzer._cache) == ["h8", "h9", "h6", "h0"]
+    assert not pickle.loads(pickle.dumps(analyzer))._cache
+
+
+def test_cache_is_safe_under_concurrent_retain_and_analyze(monkeypatch):
+    monkeypatch.setattr(analysis, "CACHE_SIZE", 64)
+    analyzer = Analyzer()
+    entries = [_entry(i) for i in range(200)]
+    errors: list[BaseException] = []
+    done = threading.Event()
+
+    def reader() -> None:
+        try:
+            while not done.is_set():
+                for e in entries:
+                    analyzer.analyze(e)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(2000):
+            analyzer.retain(entries)
+            analyzer.forget("h1")
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+    assert not errors
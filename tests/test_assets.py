@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from server.assets import Asset, plan_upload
+from server.git import blob_sha
+
+
+def _asset(name: str, content: bytes) -> Asset:
+    return Asset(source=f"/tmp/{name}", filename=name, content=content)
+
+
+def test_plan_upload_skips_unchanged_files():
+    assets = [_asset("a.png", b"aaaa"), _asset("b.png", b"new")]
+    remote = {"assets/a.png": blob_sha(b"aaaa"), "assets/b.png": blob_sha(b"old")}
+    plan = plan_upload(assets, "assets", remote)
+    assert plan.unchanged == ["assets/a.png"]
+    assert plan.files == {"assets/b.png": b"new"}
+    assert plan.bytes_saved == 4
+    assert plan.links == {"assets/a.png": "assets/a.png", "assets/b.png": "assets/b.png"}
+
+
+def test_plan_upload_dedupes_identical_content_only_when_asked():
+    assets = [_asset("copy.png", b"same"), _asset("twin.png", b"same"), _asset("c.png", b"c")]
+    remote = {"assets/z.png": blob_sha(b"same"), "assets/orig.png": blob_sha(b"same")}
+
+    plan = plan_upload(assets, "assets", remote, dedupe=True)
+    assert plan.deduped == {
+        "assets/copy.png": "assets/orig.png",
+        "assets/twin.png": "assets/orig.png",
+    }
+    assert plan.files == {"assets/c.png": b"c"}
+    assert plan.links["assets/twin.png"] == "assets/orig.png"
+    assert plan.bytes_saved == 8
+
+    plan = plan_upload(assets, "assets", remote)
+    assert not plan.deduped
+    assert set(plan.files) == {"assets/copy.png", "assets/twin.png", "assets/c.png"}
+    assert plan.bytes_saved == 0
+
+
+def test_plan_upload_dedupes_within_one_batch():
+    assets = [_asset("a.png", b"same"), _asset("b.png", b"same")]
+    plan = plan_upload(assets, "assets", {}, dedupe=True)
+    assert plan.files == {"assets/a.png": b"same"}
+    assert plan.deduped == {"assets/b.png": "assets/a.png"}
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from server.bm25 import InvertedBM25Backend
+from tests.conftest import write_entry
+
+
+def test_fork_keeps_doc_terms(tmp_path, make_kb):
+    for i in range(5):
+        write_entry(tmp_path, f"e{i}", f"alpha beta{i}")
+    kb = make_kb("bm25-inverted")
+    backend = kb._snapshot.search_backend
+    assert isinstance(backend, InvertedBM25Backend)
+    clone = backend.fork()
+    assert clone._doc_terms is not None
+    assert clone._doc_terms == backend._doc_terms
+
+
+def test_incremental_update_matches_fresh_index(tmp_path, make_kb):
+    for i in range(20):
+        write_entry(tmp_path, f"e{i}", f"alpha beta{i % 3} gamma{i}")
+    kb = make_kb("bm25-inverted")
+    write_entry(tmp_path, "e3", "delta delta alpha")
+    (tmp_path / "knowledge" / "e4.md").unlink()
+    kb.refresh_changed()
+    fresh = InvertedBM25Backend()
+    fresh.index(kb.all_entries())
+    for query in ("alpha", "delta", "beta1 gamma7"):
+        got = sorted((r.path, round(r.score, 6)) for r in kb.search(query, limit=50))
+        want = sorted((r.path, round(r.score, 6)) for r in fresh.search(query, limit=50))
+        assert got == want
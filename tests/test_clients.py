@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from server import clients as clients_module
+from server import cursor_client, github_client
+from server.clients import ApiClients
+from server.http import async_client
+
+
+def test_api_clients_reuse_one_async_client_per_api(config, monkeypatch):
+    created: list[httpx.AsyncClient] = []
+    hosts: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "api.github.com":
+            return httpx.Response(200, json=[{"path": "a.png", "sha": "1", "type": "file"}])
+        if request.url.host == "api.cursor.com":
+            return httpx.Response(200, json={"status": "RUNNING"})
+        return httpx.Response(200, content=b"png")
+
+    def mock_client(http=None, headers=None, **kwargs):
+        client = async_client(http, headers, transport=httpx.MockTransport(handler), **kwargs)
+        created.append(client)
+        return client
+
+    for module in (clients_module, github_client, cursor_client):
+        monkeypatch.setattr(module, "async_client", mock_client)
+
+    async def run(clients: ApiClients) -> None:
+        await asyncio.gather(
+            *(clients.github.file_shas("assets", "main") for _ in range(5)),
+            *(clients.cursor.get_status("agent") for _ in range(3)),
+            *(clients.web.get("https://example.com/a.png") for _ in range(2)),
+        )
+        assert clients.github is clients.github
+        assert clients.web is clients.web
+        await clients.close()
+
+    clients = ApiClients(config)
+    asyncio.run(run(clients))
+    assert len(created) == 3
+    assert len(hosts) == 10
+    assert all(client.is_closed for client in created)
+
+
+def test_close_shuts_down_tool_executor(config):
+    clients = ApiClients(config)
+    executor = clients.tools
+    assert clients.tools is executor
+    assert executor.submit(sum, [1, 2]).result() == 3
+    asyncio.run(clients.close())
+    with pytest.raises(RuntimeError):
+        executor.submit(sum, [1, 2])
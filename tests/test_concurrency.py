@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from server import analysis
+from server import kb as kb_module
+from server.git import GitResult
+from tests.conftest import write_entry
+
+N_ENTRIES = 24
+N_WRITERS = 4
+
+
+@pytest.mark.parametrize("backend", ["bm25", "bm25-inverted", "substring"])
+def test_concurrent_refresh_paths_keeps_search_consistent(
+    tmp_path, make_kb, monkeypatch, backend
+):
+    monkeypatch.setattr(analysis, "CACHE_SIZE", 4)
+    for i in range(N_ENTRIES):
+        write_entry(tmp_path, f"e{i}", f"stable shared phrase gen0x{i}y")
+    kb = make_kb(backend)
+    errors: list[BaseException] = []
+    done = threading.Event()
+
+    def writer(w: int) -> None:
+        try:
+            for gen in range(1, 6):
+                paths = []
+                for i in range(w, N_ENTRIES, N_WRITERS):
+                    paths.append(
+                        write_entry(tmp_path, f"e{i}", f"stable shared phrase gen{gen}x{i}y")
+                    )
+                kb.refresh_paths(paths)
+        except BaseException as e:
+            errors.append(e)
+
+    def rebuilder() -> None:
+        try:
+            for _ in range(3):
+                kb.refresh()
+        except BaseException as e:
+            errors.append(e)
+
+    def reader() -> None:
+        try:
+            while not done.is_set():
+                results = kb.search("stable", limit=100)
+                assert len(results) == N_ENTRIES
+                assert len({r.path for r in results}) == N_ENTRIES
+                results = kb.search('"shared phrase" stable', limit=100)
+                assert len(results) == N_ENTRIES
+        except BaseException as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    writers = [threading.Thread(target=writer, args=(w,)) for w in range(N_WRITERS)]
+    writers.append(threading.Thread(target=rebuilder))
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+
+    assert not errors
+    for i in range(N_ENTRIES):
+        results = kb.search(f"gen5x{i}y", limit=5)
+        assert [r.path for r in results] == [f"/knowledge/e{i}.md"]
+        assert not kb.search(f"gen4x{i}y", limit=5)
+
+
+def test_concurrent_try_pull_runs_one_git_pull(tmp_path, config, make_kb, monkeypatch):
+    write_entry(tmp_path, "a", "alpha")
+    config.sync.auto_pull = True
+    config.sync.pull_interval_seconds = 60
+    kb = make_kb()
+    calls: list[tuple[str, ...]] = []
+
+    async def fake_git(*args, cwd=None, timeout=30):
+        calls.append(args)
+        if args[0] == "pull":
+            await asyncio.sleep(0.2)
+        return GitResult(0, "Already up to date.\n", "")
+
+    monkeypatch.setattr(kb_module, "run_git", fake_git)
+    threads = [threading.Thread(target=kb.try_pull) for _ in range(8)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - start < 1
+    assert [args for args in calls if args[0] == "pull"] == [("pull", "--ff-only")]
+    kb.try_pull()
+    assert len([args for args in calls if args[0] == "pull"]) == 1
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from server.embedding_pipeline import EmbeddingPipeline  # noqa: E402
+
+
+class LoopBoundClient:
+    def __init__(self) -> None:
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.closed = False
+
+    async def __aenter__(self) -> LoopBoundClient:
+        self.loop = asyncio.get_running_loop()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.closed = True
+
+
+class AsyncProvider:
+    model = "fake"
+
+    def __init__(self) -> None:
+        self.clients: list[LoopBoundClient] = []
+
+    def async_client(self) -> LoopBoundClient:
+        client = LoopBoundClient()
+        self.clients.append(client)
+        return client
+
+    async def aembed(self, client: LoopBoundClient, texts: list[str]) -> np.ndarray:
+        assert not client.closed
+        assert client.loop is asyncio.get_running_loop()
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_each_run_uses_and_closes_its_own_client():
+    provider = AsyncProvider()
+    pipeline = EmbeddingPipeline(provider, max_batch_items=2)
+    for run in range(5):
+        stored: list[str] = []
+        failed = pipeline.run(
+            [(f"k{i}", f"text {i}") for i in range(5)],
+            lambda keys, vectors: stored.extend(keys),
+        )
+        assert not failed
+        assert sorted(stored) == [f"k{i}" for i in range(5)]
+    assert len(provider.clients) == 5
+    assert all(client.closed for client in provider.clients)
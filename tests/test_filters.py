@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from types import SimpleNamespace
+
+from mcp.server.fastmcp import FastMCP
+
+from server.filters import EntryFilter, FilterIndex
+from server.tools import register_tools
+from tests.conftest import write_entry
+
+
+def _entry(i: int, type: str = "note", tags: tuple[str, ...] = ()) -> SimpleNamespace:
+    return SimpleNamespace(
+        path=f"/knowledge/e{i}.md", type=type, tags=list(tags), created=f"2026-01-{i + 1:02d}"
+    )
+
+
+def _entries() -> list[SimpleNamespace]:
+    return [
+        _entry(i, "concept" if i % 2 else "note", ("ml",) if i % 3 else ("ml", "rl"))
+        for i in range(12)
+    ]
+
+
+def _pages(index: FilterIndex, flt: EntryFilter, limit: int) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        paths, _, cursor = index.page(flt, limit, cursor)
+        pages.append(paths)
+        if cursor is None:
+            return pages
+
+
+def _names(paths) -> set[int]:
+    return {int(re.search(r"e(\d+)", p).group(1)) for p in paths}
+
+
+def test_filter_index_intersects_types_tags_and_dates():
+    index = FilterIndex()
+    index.index(_entries())
+    assert _names(index.paths(EntryFilter(type="concept", tags=("rl",)))) == {3, 9}
+    assert _names(index.paths(EntryFilter(tags=("ml", "rl")))) == {0, 3, 6, 9}
+    assert _names(index.paths(EntryFilter(tags=("rl", "none"), match_any=True))) == {0, 3, 6, 9}
+    flt = EntryFilter(tags=("rl",), created_from="2026-01-02", created_to="2026-01-07")
+    assert _names(index.paths(flt)) == {3, 6}
+    assert index.paths(EntryFilter()) is None
+
+
+def test_filter_index_pages_newest_first_with_cursor():
+    index = FilterIndex()
+    index.index(_entries())
+    for flt, expected in (
+        (EntryFilter(), list(range(11, -1, -1))),
+        (EntryFilter(tags=("rl",)), [9, 6, 3, 0]),
+        (EntryFilter(type="note", created_from="2026-01-03"), [10, 8, 6, 4, 2]),
+    ):
+        pages = _pages(index, flt, limit=2)
+        assert all(len(page) <= 2 for page in pages)
+        flat = [int(re.search(r"e(\d+)", p).group(1)) for page in pages for p in page]
+        assert flat == expected
+        assert index.page(flt)[1] == len(expected)
+
+
+def test_filter_index_fork_is_isolated_from_updates():
+    index = FilterIndex()
+    entries = _entries()
+    index.index(entries)
+    served = index.fork()
+    index.update([_entry(20, "concept", ("rl",))], [entries[3]])
+    assert _names(served.paths(EntryFilter(tags=("rl",)))) == {0, 3, 6, 9}
+    assert _names(index.paths(EntryFilter(tags=("rl",)))) == {0, 6, 9, 20}
+    assert _names(index.page(EntryFilter(type="concept"), 1)[0]) == {20}
+
+
+def test_kb_list_follows_cursor_across_pages(tmp_path, config, make_kb):
+    for i in range(5):
+        write_entry(tmp_path, f"e{i}", f"body {i}", tags=("ml",))
+    kb = make_kb()
+    mcp = FastMCP("test")
+    register_tools(mcp, kb, config)
+
+    async def run() -> list[str]:
+        pages, cursor = [], None
+        while True:
+            arguments = {"tags": ["ml"], "limit": 2}
+            if cursor:
+                arguments["cursor"] = cursor
+            content, _ = await mcp.call_tool("kb_list", arguments)
+            text = content[0].text
+            pages.append(text)
+            match = re.search(r"Next page cursor: ([\w=-]+)", text)
+            if not match:
+                return pages
+            cursor = match.group(1)
+
+    pages = asyncio.run(run())
+    assert len(pages) == 3
+    assert all("of 5 entries" in page for page in pages)
+    seen = [p for page in pages for p in re.findall(r"path: (\S+\.md)", page)]
+    assert sorted(seen) == [f"/knowledge/e{i}.md" for i in range(5)]
+    bad = asyncio.run(mcp.call_tool("kb_list", {"cursor": "not-a-cursor"}))
+    assert "Invalid cursor" in str(bad)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+
+from server import kb as kb_module
+from server.config import load_config
+from server.git import GitResult, blob_sha, run_git
+from server.kb import KnowledgeBase
+from tests.conftest import write_entry
+
+
+def _git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+def test_run_git_captures_output_and_failures(tmp_path):
+    _git(tmp_path, "init", "-q")
+    result = asyncio.run(run_git("rev-parse", "--is-inside-work-tree", cwd=tmp_path))
+    assert result.returncode == 0
+    assert result.stdout.strip() == "true"
+    result = asyncio.run(run_git("rev-parse", "HEAD", cwd=tmp_path))
+    assert result.returncode != 0
+    assert result.stderr
+
+
+def test_blob_sha_matches_git(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(b"hello\n")
+    expected = subprocess.run(
+        ["git", "hash-object", str(path)], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert blob_sha(b"hello\n") == expected
+
+
+def test_pull_async_refreshes_changed_entries(tmp_path):
+    origin, clone = tmp_path / "origin", tmp_path / "clone"
+    origin.mkdir()
+    _git(origin, "init", "-q", "-b", "main")
+    write_entry(origin, "a", "alpha")
+    _git(origin, "add", "-A")
+    _git(origin, "commit", "-qm", "a")
+    _git(tmp_path, "clone", "-q", str(origin), str(clone))
+
+    config = load_config(clone / "config.yaml", repo_root=clone)
+    config.knowledge.snapshot = False
+    kb = KnowledgeBase(config)
+    assert not kb.search("beta")
+
+    write_entry(origin, "b", "beta")
+    _git(origin, "add", "-A")
+    _git(origin, "commit", "-qm", "b")
+    asyncio.run(kb.pull_async())
+    assert [r.path for r in kb.search("beta")] == ["/knowledge/b.md"]
+
+
+def test_concurrent_pull_async_runs_one_pull(tmp_path, make_kb, monkeypatch):
+    write_entry(tmp_path, "a", "alpha")
+    kb = make_kb()
+    pulls = 0
+
+    async def fake_git(*args, cwd=None, timeout=30):
+        nonlocal pulls
+        if args[0] == "pull":
+            pulls += 1
+            await asyncio.sleep(0.1)
+        return GitResult(0, "Already up to date.\n", "")
+
+    async def burst():
+        await asyncio.gather(*(kb.pull_async() for _ in range(5)))
+
+    monkeypatch.setattr(kb_module, "run_git", fake_git)
+    asyncio.run(burst())
+    assert pulls == 1
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from server import github_client
+from server.git import blob_sha
+from server.github_client import GitHubClient, GitHubClientError
+from server.http import async_client
+
+
+class FakeGitHub:
+    def __init__(self) -> None:
+        self.head = "c0"
+        self.blobs: list[bytes] = []
+        self.commits: list[dict] = []
+        self.ref_updates: list[str] = []
+        self.contents: dict[str, bytes] = {}
+        self.puts: list[str] = []
+        self.conflicts = 1
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/repos/owner/repo")
+        body = json.loads(request.content) if request.content else {}
+        if request.method == "GET" and path == "/git/ref/heads/main":
+            return httpx.Response(200, json={"object": {"sha": self.head}})
+        if request.method == "GET" and path.startswith("/git/commits/"):
+            return httpx.Response(200, json={"tree": {"sha": f"tree-{path.rsplit('/', 1)[1]}"}})
+        if request.method == "POST" and path == "/git/blobs":
+            content = base64.b64decode(body["content"])
+            self.blobs.append(content)
+            return httpx.Response(201, json={"sha": blob_sha(content)})
+        if request.method == "POST" and path == "/git/trees":
+            return httpx.Response(201, json={"sha": f"tree{len(self.commits)}"})
+        if request.method == "POST" and path == "/git/commits":
+            self.commits.append(body)
+            return httpx.Response(201, json={"sha": f"c{len(self.commits)}x"})
+        if request.method == "PATCH" and path == "/git/refs/heads/main":
+            if self.conflicts:
+                self.conflicts -= 1
+                self.head = "pushed"
+                return httpx.Response(422, json={"message": "Update is not a fast forward"})
+            self.head = body["sha"]
+            self.ref_updates.append(body["sha"])
+            return httpx.Response(200, json={"object": {"sha": body["sha"]}})
+        if path.startswith("/contents/"):
+            repo_path = path.removeprefix("/contents/")
+            if request.method == "GET":
+                if repo_path not in self.contents:
+                    return httpx.Response(404)
+                return httpx.Response(200, json={"sha": blob_sha(self.contents[repo_path])})
+            content = base64.b64decode(body["content"])
+            self.contents[repo_path] = content
+            self.puts.append(repo_path)
+            return httpx.Response(
+                201, json={"content": {"sha": blob_sha(content)}, "commit": {"sha": "put"}}
+            )
+        return httpx.Response(404)
+
+
+def _client(fake: FakeGitHub, monkeypatch) -> GitHubClient:
+    def mock_client(http=None, headers=None, **kwargs):
+        return async_client(http, headers, transport=httpx.MockTransport(fake.handle), **kwargs)
+
+    monkeypatch.setattr(github_client, "async_client", mock_client)
+    return GitHubClient("token", "owner", "repo")
+
+
+def test_upload_files_makes_one_commit_and_retries_on_moved_ref(monkeypatch):
+    fake = FakeGitHub()
+    files = {f"assets/fig{i}.png": f"png{i}".encode() for i in range(3)}
+
+    async def run():
+        client = _client(fake, monkeypatch)
+        try:
+            return await client.upload_files(files, "main")
+        finally:
+            await client.close()
+
+    result = asyncio.run(run())
+    assert sorted(fake.blobs) == sorted(files.values())
+    assert [c["parents"] for c in fake.commits] == [["c0"], ["pushed"]]
+    assert fake.commits[-1]["message"] == "upload fig0.png, fig1.png, fig2.png"
+    assert fake.ref_updates == [result.sha] == ["c2x"]
+    assert result.paths == list(files)
+    assert not fake.puts
+
+
+
+def test_upload_files_gives_up_after_repeated_conflicts(monkeypatch):
+    fake = FakeGitHub()
+    fake.conflicts = 5
+
+    async def run():
+        client = _client(fake, monkeypatch)
+        try:
+            await client.upload_files({"a.png": b"a", "b.png": b"b"}, "main", max_attempts=2)
+        finally:
+            await client.close()
+
+    with pytest.raises(GitHubClientError, match="422"):
+        asyncio.run(run())
+    assert len(fake.commits) == 2
+    assert not fake.ref_updates
+
+
+def test_upload_file_skips_unchanged_content(monkeypatch):
+    fake = FakeGitHub()
+
+    async def run():
+        client = _client(fake, monkeypatch)
+        try:
+            first = await client.upload_file("assets/a.png", b"png", "main")
+            second = await client.upload_file("assets/a.png", b"png", "main")
+            return first, second
+        finally:
+            await client.close()
+
+    first, second = asyncio.run(run())
+    assert fake.puts == ["assets/a.png"]
+    assert first.sha == second.sha == blob_sha(b"png")
+    assert second.commit == ""
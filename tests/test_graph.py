@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import pytest
+
+from server.graph import GraphIndex
+from tests.conftest import write_entry
+
+
+def _edges(graph: GraphIndex) -> set[tuple[str, str, str]]:
+    edges = set()
+    for path in graph._paths:
+        sub = graph.neighbors(path, direction="out")
+        edges.update((e.source, e.target, e.label) for e in sub.edges)
+    return edges
+
+
+def _corpus(tmp_path):
+    write_entry(tmp_path, "a", "alpha", edges=(("/knowledge/b.md", "cites"),))
+    write_entry(tmp_path, "b", "beta", edges=(("/knowledge/c.md", "extends"),))
+    write_entry(tmp_path, "c", "gamma", edges=(("/knowledge/missing.md", "cites"),))
+    write_entry(tmp_path, "d", "delta")
+
+
+def test_incremental_graph_matches_rebuild(tmp_path, make_kb):
+    _corpus(tmp_path)
+    kb = make_kb()
+    write_entry(tmp_path, "a", "alpha", edges=(("/knowledge/d.md", "cites"),))
+    write_entry(tmp_path, "e", "eps", edges=(("/knowledge/a.md", "extends"),))
+    (tmp_path / "knowledge" / "c.md").unlink()
+    kb.refresh_changed()
+
+    snapshot = kb._snapshot
+    fresh = GraphIndex(snapshot.entries)
+    assert sorted(snapshot.graph._paths) == sorted(fresh._paths)
+    assert _edges(snapshot.graph) == _edges(fresh)
+    assert "/knowledge/missing.md" not in snapshot.graph._ids
+    expected = fresh.pagerank()
+    for path, rank in snapshot.ranks.items():
+        assert rank == pytest.approx(expected[path], abs=1e-4)
+
+
+def test_body_edit_reuses_graph_and_ranks(tmp_path, make_kb):
+    _corpus(tmp_path)
+    kb = make_kb()
+    graph, ranks = kb._snapshot.graph, kb._snapshot.ranks
+    write_entry(tmp_path, "b", "beta rewritten", edges=(("/knowledge/c.md", "extends"),))
+    kb.refresh_changed()
+    assert kb._snapshot.graph is graph
+    assert kb._snapshot.ranks is ranks
+    assert "rewritten" in kb.read_entry("/knowledge/b.md").body
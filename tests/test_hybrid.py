@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from tests.conftest import write_entry
+
+
+def test_hybrid_backends_share_one_executor(tmp_path, config, make_kb):
+    pytest.importorskip("numpy")
+    write_entry(tmp_path, "a", "alpha beta")
+    write_entry(tmp_path, "b", "beta gamma")
+    config.search.hybrid.lexical = "bm25"
+    for _ in range(3):
+        kb = make_kb("hybrid")
+        assert kb.search("beta")
+        kb.refresh()
+        assert kb.search("gamma")
+    workers = [t for t in threading.enumerate() if t.name.startswith("memex-hybrid")]
+    assert 0 < len(workers) <= 4
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from server.kb import _PARALLEL_PARSE_MIN, parse_entries
+from tests.conftest import write_entry
+
+
+@pytest.mark.parametrize("error", [BrokenProcessPool, OSError])
+def test_broken_pool_falls_back_to_serial_parse(tmp_path, monkeypatch, caplog, error):
+    paths = [write_entry(tmp_path, f"e{i}", f"body {i}") for i in range(_PARALLEL_PARSE_MIN)]
+
+    def broken(*args, **kwargs):
+        raise error("worker died")
+
+    monkeypatch.setattr("concurrent.futures.ProcessPoolExecutor", broken)
+    with caplog.at_level(logging.WARNING, logger="memex"):
+        entries, errors = parse_entries(paths, tmp_path, workers=2)
+    assert not errors
+    assert [e.path for e in entries] == [f"/knowledge/e{i}.md" for i in range(len(paths))]
+    assert "parsing serially" in caplog.text
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from server.embeddings import HashingProvider  # noqa: E402
+from server.kb import load_entry  # noqa: E402
+from server.semantic import SemanticBackend  # noqa: E402
+from tests.conftest import write_entry  # noqa: E402
+
+
+class Rejected(Exception):
+    status_code = 400
+
+
+class FlakyProvider(HashingProvider):
+    def __init__(self) -> None:
+        super().__init__(dim=64, workers=1)
+        self.fail: set[str] = set()
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        for word in self.fail:
+            if any(word in t for t in texts):
+                raise Rejected(word)
+        return super()._embed_batch(texts)
+
+
+def test_failed_embeddings_are_retried_on_next_update(tmp_path):
+    entries = [
+        load_entry(write_entry(tmp_path, slug, body), tmp_path)
+        for slug, body in (("a", "alpha"), ("b", "beta"))
+    ]
+    provider = FlakyProvider()
+    backend = SemanticBackend(provider, cache_path=tmp_path / ".memex" / "embeddings.npy")
+    store = backend._store
+
+    provider.fail = {"beta"}
+    backend.index(entries)
+    assert entries[0].path in store.rows
+    assert entries[1].path not in store.rows
+
+    provider.fail = set()
+    backend.update([], [])
+    assert entries[1].path in store.rows
+    assert backend.search("beta", limit=1)[0].path == entries[1].path
+
+    old_hash = store.hashes[entries[0].path]
+    changed = load_entry(write_entry(tmp_path, "a", "gamma"), tmp_path)
+    provider.fail = {"gamma"}
+    backend.update([changed], [])
+    assert store.hashes[changed.path] == old_hash
+
+    provider.fail = set()
+    backend.update([], [])
+    assert store.hashes[changed.path] != old_hash
+    assert backend.search("gamma", limit=1)[0].path == changed.path
+
+
+def _texts(tmp_path, word: str, n: int = 8):
+    return [
+        load_entry(write_entry(tmp_path, f"e{i}", f"{word}{i} {word}{i} {word}{i}"), tmp_path)
+        for i in range(n)
+    ]
+
+
+def _check(backend, word: str, n: int = 8) -> None:
+    for i in range(n):
+        results = backend.search(f"{word}{i} {word}{i} {word}{i}", limit=3)
+        assert results[0].path == f"/knowledge/e{i}.md"
+        assert results[0].score > 0.9
+        allowed = {f"/knowledge/e{i}.md", f"/knowledge/e{(i + 1) % n}.md"}
+        assert backend.search(f"{word}{i}", limit=1, allowed=allowed)[0].path == (
+            f"/knowledge/e{i}.md"
+        )
+
+
+@pytest.mark.parametrize("index", ["flat", "ivf", "hnsw"])
+def test_old_snapshot_is_unchanged_by_later_refreshes(tmp_path, index):
+    if index == "hnsw":
+        pytest.importorskip("hnswlib")
+    backend = SemanticBackend(
+        HashingProvider(dim=256, workers=1),
+        cache_path=tmp_path / ".memex" / "embeddings.npy",
+        index=index,
+        checkpoint_seconds=0,
+    )
+    backend.index(_texts(tmp_path, "zebra"))
+    old = backend
+    for word in ("yak", "gnu", "emu"):
+        backend = backend.fork()
+        backend.update(_texts(tmp_path, word), [])
+        _check(backend, word)
+    _check(old, "zebra")
+
+
+def test_restart_reuses_persisted_text_hashes(tmp_path, monkeypatch):
+    entries = _texts(tmp_path, "restart")
+    cache_path = tmp_path / ".memex" / "embeddings.npy"
+    SemanticBackend(HashingProvider(dim=64), cache_path=cache_path).index(entries)
+
+    def fail(entry):
+        raise AssertionError("entry text re-hashed on restart")
+
+    monkeypatch.setattr("server.semantic._entry_hash", fail)
+    backend = SemanticBackend(HashingProvider(dim=64), cache_path=cache_path)
+    backend.index(entries)
+    _check(backend, "restart")
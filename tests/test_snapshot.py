@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import subprocess
+
+from tests.conftest import write_entry
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def test_snapshot_dir_is_gitignored(tmp_path, config, make_kb):
+    _git(tmp_path, "init", "-q")
+    write_entry(tmp_path, "a", "alpha")
+    config.knowledge.snapshot = True
+    kb = make_kb()
+    assert kb.snapshot_path.exists()
+    status = subprocess.run(
+        ["git", "status", "--porcelain", "--untracked-files=all"],
+        cwd=tmp_path, capture_output=True, text=True, check=True,
+    ).stdout
+    assert ".memex" not in status
+
+
+def test_tracked_snapshot_is_not_loaded(tmp_path, config, make_kb):
+    _git(tmp_path, "init", "-q")
+    write_entry(tmp_path, "a", "alpha")
+    config.knowledge.snapshot = True
+    kb = make_kb()
+    assert kb._load_snapshot() is not None
+    _git(tmp_path, "add", "-f", str(kb.snapshot_path))
+    assert kb._load_snapshot() is None
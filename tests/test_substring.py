@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from tests.conftest import write_entry
+
+
+def _paths(kb, query):
+    return {r.path.rsplit("/", 1)[-1] for r in kb.search(query, limit=50)}
+
+
+def test_punctuation_in_query_is_matched_literally(tmp_path, make_kb):
+    write_entry(tmp_path, "cpp", "Templates in C++ are Turing complete.")
+    write_entry(tmp_path, "c", "The C language has no templates.")
+    write_entry(tmp_path, "csharp", "C# generics differ from templates.")
+    kb = make_kb("substring")
+    assert _paths(kb, "c++") == {"cpp.md"}
+    assert _paths(kb, '"c++"') == {"cpp.md"}
+    assert _paths(kb, '"c++ are"') == {"cpp.md"}
+    assert _paths(kb, "templates") == {"cpp.md", "c.md", "csharp.md"}
+
+
+def test_arxiv_id_requires_exact_match(tmp_path, make_kb):
+    write_entry(tmp_path, "exact", "See arXiv:2401.12345 for details.")
+    write_entry(tmp_path, "prefix", "Published in 2401, nothing else.")
+    write_entry(tmp_path, "split", "Ids 2401 and 12345 are unrelated.")
+    kb = make_kb("substring")
+    results = kb.search("2401.12345", limit=50)
+    assert [r.path.rsplit("/", 1)[-1] for r in results] == ["exact.md"]
+    assert _paths(kb, "2401") == {"exact.md", "prefix.md", "split.md"}
+
+
+def test_punctuated_and_phrase_queries_do_not_read_bodies(tmp_path, make_kb, monkeypatch):
+    write_entry(tmp_path, "cpp", "Templates in C++ are Turing complete.")
+    write_entry(tmp_path, "order", "Turing complete templates are in C++ too.")
+    kb = make_kb("substring")
+
+    def fail(*args):
+        raise AssertionError("body read at query time")
+
+    monkeypatch.setattr("server.kb.entry_text_cache.get", fail)
+    assert _paths(kb, "c++") == {"cpp.md", "order.md"}
+    assert _paths(kb, '"c++ are"') == {"cpp.md"}
+    assert _paths(kb, '"turing complete templates"') == {"order.md"}
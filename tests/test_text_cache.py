@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import logging
+
+from server.kb import _content_hash, _TextCache
+
+
+def test_get_logs_when_file_changed_since_indexing(tmp_path, caplog):
+    path = tmp_path / "a.md"
+    path.write_text("old")
+    cache = _TextCache()
+    indexed = _content_hash("old")
+    with caplog.at_level(logging.INFO, logger="memex"):
+        assert cache.get(str(path), indexed) == "old"
+        assert not caplog.records
+        path.write_text("new")
+        cache.clear()
+        assert cache.get(str(path), indexed) == "new"
+    assert "changed on disk" in caplog.text
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+from server.tools import register_tools
+from tests.conftest import write_entry
+
+
+def test_slow_tool_does_not_block_event_loop(tmp_path, config, make_kb, monkeypatch):
+    write_entry(tmp_path, "a", "alpha")
+    kb = make_kb()
+    search = kb.search
+
+    def slow_search(*args, **kwargs):
+        time.sleep(0.3)
+        return search(*args, **kwargs)
+
+    monkeypatch.setattr(kb, "search", slow_search)
+    mcp = FastMCP("test")
+    register_tools(mcp, kb, config)
+
+    async def run() -> tuple[str, int]:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await mcp.call_tool("kb_search", {"query": "alpha"})
+        task.cancel()
+        return str(result), ticks
+
+    result, ticks = asyncio.run(run())
+    assert "/knowledge/a.md" in result
+    assert ticks >= 10
+
+
+def test_search_facets_cover_matches_beyond_limit(tmp_path, config, make_kb):
+    for i in range(5):
+        write_entry(tmp_path, f"e{i}", f"alpha {i}", tags=("ml",) if i % 2 else ("rl",))
+    write_entry(tmp_path, "other", "beta", tags=("ml",))
+    kb = make_kb()
+    page = kb.search_page("alpha", limit=2)
+    assert len(page.results) == 2
+    assert page.facets["tags"] == {"rl": 3, "ml": 2}
+
+    mcp = FastMCP("test")
+    register_tools(mcp, kb, config)
+    result = str(asyncio.run(mcp.call_tool("kb_search", {"query": "alpha", "limit": 2})))
+    assert "rl (3), ml (2)" in result
@@ -9,7 +9,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from server.kb import parse_entry
+from server.kb import parse_entries
 
 try:
     import mistune
@@ -29,11 +29,11 @@ def build(repo_root: Path, output: Path) -> None:
     graph_edges = []
     backlinks: dict[str, list[dict]] = defaultdict(list)
 
-    entries = []
-    for md_path in sorted(kb_dir.glob("*.md")):
-        entry = parse_entry(md_path, repo_root)
-        if entry:
-            entries.append(entry)
+    paths = sorted(kb_dir.glob("*.md"))
+    parsed, errors = parse_entries(paths, repo_root)
+    for path, error in errors.items():
+        print(f"Skipping {path.relative_to(repo_root)}: {error}", file=sys.stderr)
+    entries = [entry for entry in parsed if entry]
 
     for entry in entries:
         for edge in entry.edges: